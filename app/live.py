@@ -0,0 +1,194 @@
+"""
+Live evaluation behind the playground's WebSocket channel (/ws/live).
+
+Each connection owns a LiveSession. Edits are debounced; a newer edit
+cancels the running version (between engine nodes, via the evaluator's
+checkpoint hook) and nothing from a superseded version is sent. Results
+stream in stages, each tagged with the edit's version:
+
+  parse          fields / windows / functions / lookback
+  cross_section  the latest date, evaluated on the last lookback+1 rows only
+  series         heatmap tiles of the full signal
+  backtest       downsampled equity / pnl / turnover plus summary stats
+  done
+
+Text that did not change is not reparsed, an unchanged expression is not
+re-evaluated, and subexpression results carry over from the previous
+version (engine.liveness.CarryCache), so editing one branch recomputes only
+that branch. Each version fills a cache of its own, adopted by the session
+once its evaluation has returned; it holds the subexpressions nearest the
+root, as many panels as the memory budget leaves over the evaluation's
+estimate.
+
+Evaluations go through engine.planner within the session's budget (default
+Budget.from_env()); an error message carries the status the HTTP endpoints
+would answer with: 422 for a budget overrun, 400 otherwise.
+"""
+import asyncio
+from typing import Awaitable, Callable, Optional
+
+DEBOUNCE_S = 0.15
+PARAMS = {"top_q": 0.2, "bot_q": 0.2, "cost_bps": 0.0, "neutralize": True}
+
+
+class Superseded(Exception):
+    """Raised inside work whose edit has been replaced by a newer one."""
+
+
+def _num(x):
+    x = float(x)
+    return x if x == x and abs(x) != float("inf") else None
+
+
+class LiveSession:
+    def __init__(self, send: Callable[[dict], Awaitable[None]], load_fields: Callable[[], dict],
+                 debounce: float = DEBOUNCE_S, budget=None):
+        self.send = send
+        self.load_fields = load_fields
+        self.debounce = debounce
+        self.budget = budget
+        self.version = 0
+        self._task: Optional[asyncio.Task] = None
+        self._fields = None
+        self._text = None        # last parsed text
+        self._parsed = None      # (ast, analysis) of _text
+        self._key = None         # node_key of the last evaluated expression
+        self._sig = None
+        self._params = None
+        self._cache = {}         # node_key -> panel over the full fields (CarryCache)
+        self._tail = (0, None, {})   # (rows, tail fields, node cache)
+
+    async def edit(self, msg: dict):
+        """Start a new version; the running one is cancelled."""
+        self.version += 1
+        if self._task is not None:
+            self._task.cancel()
+        self._task = asyncio.create_task(self._run(self.version, msg))
+
+    def close(self):
+        self.version += 1
+        if self._task is not None:
+            self._task.cancel()
+
+    async def wait(self):
+        """Wait for the current version to finish (tests, shutdown)."""
+        if self._task is not None:
+            await asyncio.gather(self._task, return_exceptions=True)
+
+    # ---- pipeline --------------------------------------------------------
+    def _check(self, v: int):
+        def check():
+            if v != self.version:
+                raise Superseded()
+        return check
+
+    async def _emit(self, v: int, kind: str, **payload):
+        self._check(v)()
+        await self.send(dict(type=kind, version=v, **payload))
+
+    async def _run(self, v: int, msg: dict):
+        stage = "debounce"
+        try:
+            await asyncio.sleep(self.debounce)
+            stage = "load"
+            fields = await asyncio.to_thread(self.load_fields)
+            if fields is not self._fields:
+                self._reset(fields)
+            async for stage in self._stages(v, msg, fields):
+                pass
+            await self._emit(v, "done")
+        except (asyncio.CancelledError, Superseded):
+            pass   # a newer edit took over
+        except Exception as e:
+            from engine.planner import BudgetExceeded
+            if v == self.version:
+                await self.send({"type": "error", "version": v, "stage": stage, "detail": str(e),
+                                 "status": 422 if isinstance(e, BudgetExceeded) else 400})
+
+    def _reset(self, fields):
+        self._fields = fields
+        self._key = self._sig = self._params = None
+        self._cache = {}
+        self._tail = (0, None, {})
+
+    async def _stages(self, v, msg, fields):
+        from dsl.parser import parse_alpha
+        from dsl.analyzer import analyze
+        from dsl.shapes import infer
+        from dsl.ast_utils import node_key
+        from engine.planner import evaluate
+        from engine.backtest import run_backtest, summarize
+        from engine.downsample import downsample_view
+
+        check = self._check(v)
+        text = str(msg.get("alpha", ""))
+        vp = msg.get("viewport") or {}
+        width, height = int(vp.get("width", 800)), int(vp.get("height", 200))
+
+        yield "parse"
+        if text != self._text:
+            ast = parse_alpha(text)
+            infer(ast)   # arity / window / operand errors surface at the parse stage
+            self._text, self._parsed = text, (ast, analyze(ast))
+        ast, an = self._parsed
+        await self._emit(v, "parse", fields=sorted(an.fields), functions=sorted(an.functions),
+                         windows={k: sorted(w) for k, w in an.windows.items()},
+                         lookback=an.lookback)
+
+        key = node_key(ast)
+        if key != self._key:
+            yield "cross_section"
+            latest, tail = await asyncio.to_thread(self._cross_section, text, ast, an.lookback, fields, check)
+            check()
+            self._tail = tail
+            await self._emit(v, "cross_section", date=latest.name.strftime("%Y-%m-%d"),
+                             values={str(c): _num(x) for c, x in latest.items()})
+
+            yield "series"
+            cache = self._carry(ast, fields, self._cache)
+            sig, _ = await asyncio.to_thread(evaluate, text, fields, self.budget, None, cache, check)
+            check()
+            self._cache = cache
+            self._key, self._sig, self._params = key, sig, None
+            view = downsample_view(sig.index, sig.columns.tolist(), {}, sig.to_numpy(dtype=float),
+                                   width=width, height=height)
+            await self._emit(v, "series", viewport=view["viewport"], heatmap=view["heatmap"])
+
+        params = {k: type(d)(msg.get(k, d)) for k, d in PARAMS.items()}
+        if params != self._params:
+            yield "backtest"
+            sig, rets = self._sig, fields["returns"]
+            bt = await asyncio.to_thread(run_backtest, sig, rets, **params)
+            check()
+            stats = summarize(bt, sig, rets)
+            view = downsample_view(sig.index, sig.columns.tolist(),
+                                   {k: bt[k].to_numpy() for k in ("equity", "pnl", "turnover")},
+                                   width=width)
+            await self._emit(v, "backtest", stats={k: _num(x) for k, x in stats.items()},
+                             **{k: view[k] for k in ("equity", "pnl", "turnover")})
+            self._params = params
+
+    def _carry(self, ast, fields, carried):
+        # this version's cache: room for as many panels as the budget leaves over its estimate
+        from engine.planner import Budget, plan
+        from engine.liveness import CarryCache
+        budget = self.budget or Budget.from_env()
+        panels = None
+        if budget.bytes is not None:
+            p = plan(ast, fields, budget)
+            T, S = next(iter(fields.values())).shape
+            panels = (budget.bytes - p.bytes[p.engine]) // max(T * S * 8, 1)
+        return CarryCache(ast, carried, panels)
+
+    def _cross_section(self, text, ast, lookback, fields, check):
+        # the last row only reads the last lookback+1 rows of every field;
+        # returns it and the (rows, tail fields, cache) to adopt
+        from engine.planner import evaluate
+        n = len(next(iter(fields.values())).index)
+        rows = min(lookback + 1, n)
+        _, tail, carried = self._tail
+        if self._tail[0] != rows:
+            tail, carried = {k: f.iloc[-rows:] for k, f in fields.items()}, None
+        cache = self._carry(ast, tail, carried)
+        latest = evaluate(text, tail, self.budget, None, cache, check)[0].iloc[-1]
+        return latest, (rows, tail, cache)
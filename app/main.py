@@ -1,26 +1,39 @@
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, WebSocket, WebSocketDisconnect
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
 from typing import List, Dict, Optional
 from functools import lru_cache
-import pandas as pd, numpy as np
-from dsl.registry import list_functions
+from contextlib import asynccontextmanager
+import os, threading
 from dsl.parser import parse_alpha
-from dsl.eval import EvaluationContext, eval_node
-from dsl.analyzer import analyze
 from dsl.ast_utils import ast_to_dict, ast_to_pretty
-import dsl.functions  # register all
 
-# add imports at top
+# pandas/numpy, the function registry and the engines are imported on first use
+# (and by the warm-up thread below), so the server accepts connections before
+# they have loaded; see scripts/bench_startup.py.
+
 from fastapi.staticfiles import StaticFiles
 from fastapi.responses import HTMLResponse
-import pandas as pd, os
 
-# after app = FastAPI(...)
 WEB_DIR = os.path.join(os.path.dirname(__file__), "..", "web")
 STATIC_DIR = os.path.join(WEB_DIR)  # we’ll mount the same dir for simplicity
 
-app = FastAPI(title="Desmos-for-Alphas DSL")
+
+def _warm():
+    # heavy imports, parser tables and fields, off the request path
+    import dsl.functions  # noqa: F401  (register all)
+    import engine.vectorized  # noqa: F401
+    parse_alpha("x")
+    load_fields()
+
+
+@asynccontextmanager
+async def lifespan(app):
+    if os.environ.get("DSL_WARM_START", "1") != "0":
+        threading.Thread(target=_warm, name="warm-start", daemon=True).start()
+    yield
+
+app = FastAPI(title="Desmos-for-Alphas DSL", lifespan=lifespan)
 
 origins = [
     "https://desmos-for-alphas.onrender.com",  # replace with your actual frontend Render UR
@@ -45,36 +58,139 @@ class EvalBody(BaseModel):
     date: Optional[str] = None
     fields: List[str] = []  # names required (for validation later)
 
-class BacktestBody(BaseModel):
-    alpha: str
+class BacktestParams(BaseModel):
     top_q: float = 0.2     # top 20% long
     bot_q: float = 0.2     # bottom 20% short
     cost_bps: float = 0.0  # per-side turnover cost in basis points (e.g., 5 = 5bps)
     neutralize: bool = True  # dollar-neutral long-short
 
+class Viewport(BaseModel):
+    start: Optional[str] = None   # first date shown (inclusive)
+    end: Optional[str] = None     # last date shown (inclusive)
+    sym_start: int = 0            # symbols [sym_start, sym_end) in column order
+    sym_end: Optional[int] = None
+    width: int = 800              # target pixels: series points / heatmap width
+    height: int = 200             # heatmap height in pixels
+    cell_px: int = 4              # minimum pixels per heatmap tile
 
-@lru_cache(maxsize=64)
-def _cached_signal(alpha: str):
+class BacktestBody(BacktestParams):
+    alpha: str
+    viewport: Optional[Viewport] = None   # downsampled series + heatmap tiles instead of full matrices
+    similar: int = 0                      # most correlated library alphas to list (0: none)
+
+class PortfolioBody(BacktestParams):
+    alphas: List[str]
+    weights: Optional[List[float]] = None   # fixed combination weights (one per alpha)
+    rule: str = "equal"                     # or "inverse_vol" when weights are not given
+    normalize: str = "zscore"               # per-date normalization before blending: zscore|rank|none
+    lookback: int = 60                      # trailing window for inverse_vol
+
+class SweepBody(BacktestParams):
+    template: str                        # e.g. "rank(ts_mean(returns,{a}) - ts_mean(returns,{b}))"
+    grid: Dict[str, List[float]] = {}    # values per placeholder (or inline {a=3..20})
+
+class LibraryBody(BaseModel):
+    alpha: str
+    k: int = 5
+
+class AnalyticsBody(BacktestParams):
+    alpha: str
+    horizons: int = 20      # forward-return horizons 1..horizons
+    quantiles: int = 5      # signal buckets for quantile returns
+    series: bool = False    # include the per-date IC / rank IC panels
+
+class HorizonsBody(BacktestParams):
+    alpha: str
+    holds: List[int] = [1, 5, 10, 20]   # holding periods in days
+    delay: int = 0          # trade the signal this many days later
+    overlap: bool = True    # staggered daily tranches; False: one book rebalanced every k days
+    offset: int = 0         # first rebalance day when overlap is False
+    series: bool = False    # include per-date equity / pnl / turnover per hold
+
+
+_SIGNALS = {"cache": None}
+_SIGNALS_LOCK = threading.Lock()
+
+
+def signal_cache():
+    """
+    Signals that outlive a data change: on an append only the new dates are
+    evaluated (engine/signal_cache.py). Stored under $DSL_SIGNAL_CACHE_DIR if set.
+    """
+    with _SIGNALS_LOCK:
+        if _SIGNALS["cache"] is None:
+            from engine.signal_cache import SignalCache
+            _SIGNALS["cache"] = SignalCache(os.environ.get("DSL_SIGNAL_CACHE_DIR") or None)
+        return _SIGNALS["cache"]
+
+
+def _signal_frame(alpha: str):
+    """The alpha's signal over the current fields: the snapshot's, else signal_cache()'s."""
     fields = load_fields()
-    try:
-        from engine.vectorized import evaluate_series_vectorized
-        sig = evaluate_series_vectorized(alpha, fields)
-    except Exception:
-        from engine.backtest_loop import evaluate_series
-        sig = evaluate_series(alpha, fields)
-    # Return immutable (values) and index/cols, because DataFrames aren't hashable
-    return (tuple(sig.index.astype(str)), tuple(sig.columns), sig.values.copy())
+    snap = _FIELDS["signals"].get(alpha)
+    return snap if snap is not None else signal_cache().get(alpha, fields)
+
+
+_LIBRARY = {"lib": None}
+_LIBRARY_LOCK = threading.Lock()
+
+
+def library():
+    """The alpha library under $DSL_LIBRARY_DIR (default data/library); see engine/library.py."""
+    with _LIBRARY_LOCK:
+        if _LIBRARY["lib"] is None:
+            from engine.library import Library
+            from engine.snapshot import DATA_DIR
+            _LIBRARY["lib"] = Library(os.environ.get("DSL_LIBRARY_DIR", os.path.join(DATA_DIR, "library")))
+        return _LIBRARY["lib"]
+
+
+def _similar(alpha: str, sig, k: int) -> list:
+    if k <= 0:
+        return []
+    out = library().similar(sig, k, signal=_signal_frame, exclude=alpha)
+    return [{key: m[key] for key in ("id", "alpha", "corr", "approx")} for m in out]
+
+
+def _plan_errors(fn):
+    """Planner errors as HTTP errors: invalid alphas 400, budget overruns 422."""
+    from functools import wraps
+
+    @wraps(fn)
+    def wrapper(*args, **kwargs):
+        from engine.planner import PlanError, BudgetExceeded
+        try:
+            return fn(*args, **kwargs)
+        except PlanError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        except BudgetExceeded as e:
+            raise HTTPException(status_code=422, detail=str(e))
+    return wrapper
+
+
+_FIELDS = {"key": None, "fields": None, "signals": {}}
+_FIELDS_LOCK = threading.Lock()
 
 
 def load_fields():
-    data_dir = os.path.join(os.path.dirname(__file__), "..", "data")
-    def read(name): 
-        return pd.read_csv(os.path.join(data_dir, f"{name}.csv"), index_col=0, parse_dates=True)
-    return {
-        "returns": read("returns"),
-        "close":   read("close"),
-        "volume":  read("volume"),
-    }
+    """
+    The field panels, from the warm-start snapshot when it matches the CSVs
+    (see engine/snapshot.py), else from the CSVs. Memoized until a CSV changes;
+    then the result caches are dropped and signal_cache() extends its signals.
+    """
+    from engine import snapshot
+    sources = {n: snapshot.csv_path(n) for n in snapshot.FIELDS}
+    key = tuple(tuple(snapshot.source_stamp(p)) for p in sources.values())
+    with _FIELDS_LOCK:
+        if _FIELDS["key"] != key:
+            manifest = snapshot.read_manifest()
+            if manifest is not None and snapshot.is_fresh(manifest, sources):
+                fields, signals = snapshot.read_snapshot(manifest=manifest)
+            else:
+                fields, signals = snapshot.load_csv_fields(), {}
+            _FIELDS.update(key=key, fields=fields, signals=signals)
+            _cached_backtest.cache_clear()
+        return _FIELDS["fields"]
 
 
 @app.get("/healthz")
@@ -90,78 +206,180 @@ def playground():
 
 
 
-@app.post("/backtest")
-def backtest(body: BacktestBody):
+@lru_cache(maxsize=64)
+def _cached_backtest(alpha: str, top_q: float, bot_q: float, cost_bps: float, neutralize: bool):
+    # zooming re-requests the same backtest with a new viewport; the signal is signal_cache()'s
+    from engine.backtest import run_backtest
     fields = load_fields()
+    return run_backtest(_signal_frame(alpha), fields["returns"], top_q, bot_q, cost_bps, neutralize)
+
 
-    idx, cols, vals = _cached_signal(body.alpha)
-    sig = pd.DataFrame(list(vals), index=pd.to_datetime(list(idx)), columns=list(cols))
-
-    rets = fields["returns"].reindex(sig.index).reindex(columns=sig.columns)
-
-    # 2) Build long/short weights each day by quantiles
-    def make_weights(row):
-        s = row.dropna()
-        if s.empty:
-            return pd.Series(0.0, index=row.index)
-        lo = s.quantile(body.bot_q)
-        hi = s.quantile(1.0 - body.top_q)
-        long  = (row >= hi).astype(float)
-        short = (row <= lo).astype(float) * -1.0
-        w = long + short
-        # neutralize & normalize (equal weight within long/short)
-        if body.neutralize:
-            n_long = (w > 0).sum()
-            n_short = (w < 0).sum()
-            if n_long > 0:  w[w > 0]  =  1.0 / n_long
-            if n_short > 0: w[w < 0]  = -1.0 / n_short
-        else:
-            # scale to unit L1
-            ssum = w.abs().sum()
-            if ssum > 0: w = w / ssum
-        return w.fillna(0.0)
-
-    W = sig.apply(make_weights, axis=1)   # DataFrame of weights aligned to sig
-
-    # 3) Turnover & costs
-    turnover = (W.diff().abs().sum(axis=1)).fillna(0.0)  # per-day L1 change
-    cost = (body.cost_bps / 1e4) * turnover              # cost fraction
-
-    # 4) Daily P&L
-    pnl = (W * rets).sum(axis=1).fillna(0.0)
-    pnl_net = pnl - cost
-    equity = (1.0 + pnl_net).cumprod()
+@app.post("/backtest")
+@_plan_errors
+def backtest(body: BacktestBody):
+    import numpy as np
+    load_fields()   # drops cached results if the data changed
+    bt = _cached_backtest(body.alpha, body.top_q, body.bot_q, body.cost_bps, body.neutralize)
+    sig = _signal_frame(body.alpha)
+    equity, pnl_net, turnover = bt["equity"], bt["pnl"], bt["turnover"]
+
+    if body.viewport is not None:
+        from engine.downsample import downsample_view
+        vp = body.viewport
+        view = downsample_view(
+            sig.index, sig.columns.tolist(),
+            {"equity": equity.values, "pnl": pnl_net.values, "turnover": turnover.values},
+            sig.values, vp.start, vp.end, vp.sym_start, vp.sym_end, vp.width, vp.height, vp.cell_px)
+        return dict(view, similar=_similar(body.alpha, sig, body.similar))
 
     return {
         "dates": sig.index.strftime("%Y-%m-%d").tolist(),
         "equity": equity.values.tolist(),
         "pnl": pnl_net.values.tolist(),
         "columns": sig.columns.tolist(),
-        "signals": sig.values.tolist(),       # for heatmap
+        "signals": np.where(np.isfinite(sig.values), sig.values, None).tolist(),  # for heatmap (NaN -> null)
         "turnover": turnover.values.tolist(),
+        "similar": _similar(body.alpha, sig, body.similar),
     }
 
 
+@app.post("/library/add")
+@_plan_errors
+def library_add(body: LibraryBody):
+    """Store an alpha; `similar` lists what was already there and correlates with it."""
+    load_fields()
+    sig = _signal_frame(body.alpha)
+    similar = _similar(body.alpha, sig, body.k)
+    return {**library().add(body.alpha, sig), "similar": similar}
+
+
+@app.post("/library/similar")
+@_plan_errors
+def library_similar(body: LibraryBody):
+    load_fields()
+    return {"size": len(library()), "similar": _similar(body.alpha, _signal_frame(body.alpha), body.k)}
+
+
+@app.post("/backtest_portfolio")
+@_plan_errors
+def backtest_portfolio(body: PortfolioBody):
+    from engine.portfolio import run_portfolio
+    fields = load_fields()
+    try:
+        return run_portfolio(body.alphas, fields, weights=body.weights, rule=body.rule,
+                             normalize=body.normalize, lookback=body.lookback,
+                             top_q=body.top_q, bot_q=body.bot_q, cost_bps=body.cost_bps,
+                             neutralize=body.neutralize)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+@app.post("/sweep")
+@_plan_errors
+def sweep(body: SweepBody):
+    from engine.sweep import run_sweep
+    fields = load_fields()
+    try:
+        return run_sweep(body.template, fields, grid=body.grid, top_q=body.top_q,
+                         bot_q=body.bot_q, cost_bps=body.cost_bps, neutralize=body.neutralize)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+@app.post("/analytics")
+@_plan_errors
+def analytics(body: AnalyticsBody):
+    import numpy as np
+    from engine.analytics import signal_analytics
+    if not 1 <= body.horizons <= 250 or body.quantiles < 2:
+        raise HTTPException(status_code=400, detail="Expected 1 <= horizons <= 250 and quantiles >= 2")
+    fields = load_fields()
+    sig = _signal_frame(body.alpha)
+
+    res = signal_analytics(sig, fields["returns"], body.horizons, body.quantiles,
+                           body.top_q, body.bot_q)
+    keep = ["horizons", "ic_mean", "ic_ir", "rank_ic_mean", "autocorr",
+            "quantile_returns", "spread", "turnover"]
+    if body.series:
+        keep += ["ic", "rank_ic"]
+    # JSON has no NaN
+    out = {k: np.where(np.isfinite(res[k]), res[k], None).tolist() for k in keep}
+    if body.series:
+        out["dates"] = sig.index.strftime("%Y-%m-%d").tolist()
+    return out
+
+
+@app.post("/horizons")
+@_plan_errors
+def horizons(body: HorizonsBody):
+    import numpy as np
+    from engine.backtest import run_horizons
+    if not body.holds or not all(1 <= k <= 250 for k in body.holds) or not 0 <= body.delay <= 20:
+        raise HTTPException(status_code=400, detail="Expected holds in 1..250 and 0 <= delay <= 20")
+    fields = load_fields()
+    sig = _signal_frame(body.alpha)
+
+    res = run_horizons(sig, fields["returns"], body.holds, body.delay, body.overlap, body.offset,
+                       body.top_q, body.bot_q, body.cost_bps, body.neutralize)
+    out = {"holds": res["holds"],
+           "stats": [{k: (v if np.isfinite(v) else None) for k, v in res["stats"][h].items()}
+                     for h in res["holds"]]}
+    if body.series:
+        out["dates"] = sig.index.strftime("%Y-%m-%d").tolist()
+        for k in ("equity", "pnl", "turnover"):
+            a = res[k].to_numpy().T
+            out[k] = np.where(np.isfinite(a), a, None).tolist()
+    return out
+
+
+@app.websocket("/ws/live")
+async def live(ws: WebSocket):
+    """
+    Live editing: send {"alpha", "top_q", "bot_q", "cost_bps", "neutralize",
+    "viewport"} on every edit; receive parse / cross_section / series /
+    backtest / done messages tagged with the edit's version (see app/live.py).
+    """
+    from app.live import LiveSession
+    await ws.accept()
+    session = LiveSession(ws.send_json, load_fields)
+    try:
+        while True:
+            await session.edit(await ws.receive_json())
+    except WebSocketDisconnect:
+        pass
+    finally:
+        session.close()
+
+
 @app.get("/functions")
 def functions():
+    from dsl.registry import list_functions
+    import dsl.functions  # noqa: F401  (register all)
     return {"functions": list_functions()}
 
 @app.post("/parse")
 def parse(body: ParseBody):
+    from dsl.analyzer import analyze
+    from dsl.shapes import infer
     try:
         ast = parse_alpha(body.alpha)
+        shape = infer(ast).label(ast)
         meta = analyze(ast)
         return {
             "ok": True,
+            "shape": shape,
             "fields": sorted(meta.fields),
             "windows": {k: sorted(v) for k,v in meta.windows.items()},
             "functions": sorted(meta.functions),
+            "lookback": meta.lookback,
         }
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
 
 @app.post("/evaluate")
 def evaluate(body: EvalBody):
+    import pandas as pd
+    from dsl.eval import EvaluationContext, eval_node
     fields = load_fields()
     dates = next(iter(fields.values())).index
     t = pd.Timestamp(body.date) if body.date else dates[-1]
@@ -188,21 +406,27 @@ def evaluate_series_api(body: EvalBody):
 
 
 @app.post("/evaluate_series_fast")
+@_plan_errors
 def evaluate_series_fast(body: EvalBody):
+    from engine.planner import evaluate as evaluate_planned
     fields = load_fields()
-    try:
-        from engine.vectorized import evaluate_series_vectorized
-        out = evaluate_series_vectorized(body.alpha, fields)
-    except Exception:
-        from engine.backtest_loop import evaluate_series
-        out = evaluate_series(body.alpha, fields)
+    out, plan = evaluate_planned(body.alpha, fields)
     return {
         "dates": out.index.strftime("%Y-%m-%d").tolist(),
         "columns": out.columns.tolist(),
         "values": out.values.tolist(),
+        "plan": plan.to_dict(),
     }
 
 
+@app.post("/plan")
+@_plan_errors
+def plan_alpha(body: ParseBody):
+    """Which engine would evaluate this alpha, and the cost estimates behind the choice."""
+    from engine.planner import plan, Budget
+    return plan(body.alpha, load_fields(), Budget.from_env()).to_dict()
+
+
 @app.post("/ast")
 def ast_view(body: ParseBody):
     try:
@@ -1,40 +1,68 @@
 from dataclasses import dataclass, field
-from typing import Set, Dict
+from typing import Set, Dict, Tuple
 from .parser import Number, Name, BinOp, UnaryOp, Call
+from .registry import REGISTRY, UNBOUNDED, lookback as spec_lookback
+from . import functions  # noqa: F401  (window metadata lives on the specs)
 
 @dataclass
 class Analysis:
     fields: Set[str] = field(default_factory=set)
     windows: Dict[str, Set[int]] = field(default_factory=dict)
     functions: Set[str] = field(default_factory=set)
+    pairs: Set[Tuple[str, str, int]] = field(default_factory=set)   # (x, y, window) windowed together
+    lookback: int = 0   # rows of history before t the whole expression reads (UNBOUNDED: all)
 
 def _add_window(an: Analysis, field_name: str, n: int):
     an.windows.setdefault(field_name, set()).add(int(n))
 
+def _consts(node) -> Dict[int, float]:
+    # folded constants (windows like 2+3); an ill-formed alpha keeps only literals
+    from .shapes import infer, ShapeError
+    try:
+        return infer(node).consts
+    except ShapeError:
+        return {}
+
 def analyze(node) -> Analysis:
     an = Analysis()
+    consts = _consts(node)
+
+    def window_of(a):
+        if isinstance(a, Number):
+            return a.value
+        return consts.get(id(a))
 
-    def walk(n):
+    def walk(n) -> int:
+        # returns the lookback (rows before t) of the subtree
         if isinstance(n, Name):
             an.fields.add(n.name)
+            return 0
 
-        elif isinstance(n, Call):
+        if isinstance(n, Call):
             an.functions.add(n.name)
+            own = 0
+
+            spec = REGISTRY.get(n.name)
+            w = spec.window_arg if spec is not None else None
+            if spec is not None and spec.stateful:
+                own = UNBOUNDED
+            window = window_of(n.args[w]) if w is not None and len(n.args) > w else None
+            if window is not None:
+                window = int(window)
+                own = spec_lookback(spec, window)
+                names = [a.name for i, a in enumerate(n.args) if i != w and isinstance(a, Name)]
+                for name in names:
+                    _add_window(an, name, window)
+                if len(names) == 2:
+                    an.pairs.add((names[0], names[1], window))
 
-            # crude heuristic: functions with window args
-            if n.name in {"ts_mean", "ts_std", "ts_sum", "ts_rank", "delay", "ts_corr", "decay_linear"}:
-                if n.args and isinstance(n.args[-1], Number):
-                    window = int(n.args[-1].value)
-                    if n.args and isinstance(n.args[0], Name):
-                        _add_window(an, n.args[0].name, window)
+            return own + max((walk(a) for a in n.args), default=0)
 
-            for a in n.args:
-                walk(a)
+        if isinstance(n, (BinOp, UnaryOp)):
+            return max((walk(val) for val in vars(n).values() if hasattr(val, "__dict__")),
+                       default=0)
 
-        elif isinstance(n, (BinOp, UnaryOp)):
-            for val in vars(n).values():
-                if hasattr(val, "__dict__"):
-                    walk(val)
+        return 0
 
-    walk(node)
+    an.lookback = min(walk(node), UNBOUNDED)
     return an
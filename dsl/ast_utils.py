@@ -2,6 +2,73 @@
 from typing import Any, Dict
 from .parser import Number, Name, UnaryOp, BinOp, Call
 
+def node_key(node):
+    """Hashable structural key of an AST node (equal subtrees share a key)."""
+    if isinstance(node, Number): return ("num", node.value)
+    if isinstance(node, Name): return ("name", node.name)
+    if isinstance(node, UnaryOp): return ("un", node.op, node_key(node.operand))
+    if isinstance(node, BinOp): return ("bin", node.op, node_key(node.left), node_key(node.right))
+    if isinstance(node, Call): return ("call", node.name, tuple(node_key(a) for a in node.args))
+    raise TypeError
+
+def subtree_keys(node) -> set:
+    """node_key of every node in the tree (what a node cache holds for it)."""
+    keys = {node_key(node)}
+    for child in ([node.operand] if isinstance(node, UnaryOp) else
+                  [node.left, node.right] if isinstance(node, BinOp) else
+                  node.args if isinstance(node, Call) else []):
+        keys |= subtree_keys(child)
+    return keys
+
+def ast_to_source(node) -> str:
+    """Parseable source of `node`, fully parenthesized, operands in their original order."""
+    if isinstance(node, Number):
+        return repr(float(node.value))
+    if isinstance(node, Name):
+        return node.name
+    if isinstance(node, UnaryOp):
+        return f"{node.op}{ast_to_source(node.operand)}"
+    if isinstance(node, BinOp):
+        return f"({ast_to_source(node.left)}{node.op}{ast_to_source(node.right)})"
+    if isinstance(node, Call):
+        return f"{node.name}({','.join(ast_to_source(a) for a in node.args)})"
+    raise TypeError
+
+_COMMUTATIVE = {"+", "*", "==", "!=", "&&", "||"}
+_FLIPPED = {">": "<", ">=": "<="}
+
+def canonical(node) -> str:
+    """
+    Source text that is equal for equivalent spellings of an alpha: function
+    names lower-cased, integral numbers without ".0", a > b written b < a, and
+    chains of commutative operators flattened with sorted operands. Fully
+    parenthesized, so it parses back to the same alpha.
+    """
+    if isinstance(node, Number):
+        v = float(node.value)
+        return str(int(v)) if v.is_integer() else repr(v)
+    if isinstance(node, Name):
+        return node.name
+    if isinstance(node, UnaryOp):
+        return f"{node.op}{canonical(node.operand)}"
+    if isinstance(node, Call):
+        return f"{node.name.lower()}({','.join(canonical(a) for a in node.args)})"
+    if isinstance(node, BinOp):
+        op, left, right = node.op, node.left, node.right
+        if op in _FLIPPED:
+            op, left, right = _FLIPPED[op], right, left
+        if op not in _COMMUTATIVE:
+            return f"({canonical(left)}{op}{canonical(right)})"
+        terms, stack = [], [left, right]
+        while stack:
+            n = stack.pop()
+            if isinstance(n, BinOp) and n.op == op:
+                stack += [n.left, n.right]
+            else:
+                terms.append(canonical(n))
+        return "(" + op.join(sorted(terms)) + ")"
+    raise TypeError
+
 def ast_to_dict(node) -> Dict[str, Any]:
     if isinstance(node, Number):
         return {"type": "Number", "value": node.value}
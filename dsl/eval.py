@@ -1,7 +1,8 @@
 
 import numpy as np, pandas as pd
-from .registry import get_fn
+from .registry import get_fn, check_arity
 from .parser import Number, Name, BinOp, UnaryOp, Call
+from .ast_utils import node_key as _node_key
 
 def _as_series_like(a, ref_index):
     if isinstance(a, pd.Series):
@@ -31,36 +32,53 @@ def truthy(x):
     return bool(x)
 
 class EvaluationContext:
-    def __init__(self, fields: dict[str, pd.DataFrame], t):
+    """
+    Point-in-time view of `fields` at date `t`. One context can be moved along
+    the dates with at(); it keeps its per-field row lookups and only drops the
+    previous date's results.
+    """
+    def __init__(self, fields: dict[str, pd.DataFrame], t, shapes=None):
         self.fields = fields
-        self.t = t
+        self.shapes = shapes  # dsl.shapes.Shapes of the evaluated AST, if known
+        self._rows = {}   # field -> (index, values, columns)
         self._cache = {}
+        self.t = t
+
+    def at(self, t) -> "EvaluationContext":
+        self.t = t
+        self._cache.clear()
+        return self
 
     def series(self, field_name: str) -> pd.Series:
-        if field_name not in self.fields:
-            raise KeyError(f"Unknown identifier '{field_name}'")
-        df = self.fields[field_name]
+        rows = self._rows.get(field_name)
+        if rows is None:
+            if field_name not in self.fields:
+                raise KeyError(f"Unknown identifier '{field_name}'")
+            df = self.fields[field_name]
+            rows = self._rows[field_name] = (df.index, df.to_numpy(), df.columns)
+        index, values, columns = rows
         try:
-            s = df.loc[self.t].copy()
+            i = index.get_loc(self.t)
         except KeyError:
             raise KeyError(f"Date {self.t} not found in field '{field_name}' index")
+        s = pd.Series(values[i].copy(), index=columns, name=self.t)
         # Attach field reference so functions can find DF:
         setattr(s, "_field_name", field_name)
         return s
 
 
-def _node_key(node):
-    from .parser import Number, Name, BinOp, UnaryOp, Call
-    if isinstance(node, Number): return ("num", node.value)
-    if isinstance(node, Name): return ("name", node.name)
-    if isinstance(node, UnaryOp): return ("un", node.op, _node_key(node.operand))
-    if isinstance(node, BinOp): return ("bin", node.op, _node_key(node.left), _node_key(node.right))
-    if isinstance(node, Call): return ("call", node.name, tuple(_node_key(a) for a in node.args))
-    raise TypeError
+def whole_history_error(name: str) -> str:
+    return (f"'{name}' depends on the whole history and is not evaluated one date at a time; "
+            f"use /evaluate_series_fast or /backtest (the vectorized engine)")
 
 
 def eval_node(ctx: EvaluationContext, node):
-    k = _node_key(node)
+    sh = ctx.shapes
+    if sh is not None:
+        c = sh.const(node)
+        if c is not None:
+            return c
+    k = sh.key(node) if sh is not None else _node_key(node)
     if k in ctx._cache:
         return ctx._cache[k]
     import pandas as pd
@@ -80,8 +98,10 @@ def eval_node(ctx: EvaluationContext, node):
     if isinstance(node, BinOp):
         a = eval_node(ctx, node.left)
         b = eval_node(ctx, node.right)
-        # align series if needed
-        if hasattr(a, "index") and hasattr(b, "index"):
+        # align series if needed; a known scalar side is broadcast by pandas
+        if sh is not None and (sh.is_scalar(node.left) or sh.is_scalar(node.right)):
+            pass
+        elif hasattr(a, "index") and hasattr(b, "index"):
             a, b = a.align(b, join="outer")
         elif hasattr(a, "index"):
             b = _as_series_like(b, a.index)
@@ -90,12 +110,12 @@ def eval_node(ctx: EvaluationContext, node):
         return OPS[node.op](a, b)
     if isinstance(node, Call):
         spec = get_fn(node.name)
-        argc = len(node.args)
-        allowed = list(spec.arity) if not isinstance(spec.arity, range) else list(range(spec.arity.start, spec.arity.stop))
-        if argc not in allowed:
-            raise AssertionError(f"{node.name} expects {allowed}, got {argc}")
+        check_arity(spec, len(node.args))
+        if spec.stateful:
+            raise ValueError(whole_history_error(spec.name))
         args = [eval_node(ctx, arg) for arg in node.args]
         out = spec.impl(ctx, *args)
-    ctx._cache[k] = out
+    if sh is None or sh.uses.get(k, 0) > 1:
+        ctx._cache[k] = out   # only results read again later in the tree
     return out
     # raise TypeError(f"Unknown node {type(node)}")
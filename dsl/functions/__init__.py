@@ -1,3 +1,4 @@
 from .time_series import *
 from .cross_sectional import *
 from .safe_math import *
+from .stateful import *
@@ -2,7 +2,7 @@
 import numpy as np, pandas as pd
 from ..registry import register
 
-@register("sdiv", arity=[2], kind="scalar", doc="safe divide; returns 0 where denom==0 or NaN")
+@register("sdiv", arity=[2], kind="scalar", nan="zero", doc="safe divide; returns 0 where denom==0 or NaN")
 def sdiv(ctx, a, b):
     if isinstance(a, pd.Series) or isinstance(b, pd.Series):
         a = a if isinstance(a, pd.Series) else pd.Series(float(a), index=b.index)
@@ -0,0 +1,75 @@
+import numpy as np, pandas as pd
+from ..registry import declare, register
+from .time_series import _get_df_from_series, _row_slice
+
+# Scans over (dates × symbols) arrays behind the whole-panel kernels in
+# engine/vectorized.py. Each is one pass over the dates: O(dates × symbols).
+
+def last_index(event: np.ndarray) -> np.ndarray:
+    """Row of the latest True at or before each row, per column (-1 before the first)."""
+    rows = np.arange(event.shape[0]).reshape((-1,) + (1,) * (event.ndim - 1))
+    return np.maximum.accumulate(np.where(event, rows, -1), axis=0)
+
+def take_rows(vals: np.ndarray, idx: np.ndarray) -> np.ndarray:
+    out = np.take_along_axis(vals, np.maximum(idx, 0), axis=0)
+    return np.where(idx >= 0, out, np.nan)
+
+def trade_when_scan(cond: np.ndarray, x: np.ndarray, exit: np.ndarray) -> np.ndarray:
+    """x where cond > 0, NaN where exit > 0 (exit wins), otherwise the previous output."""
+    with np.errstate(invalid="ignore"):
+        leave, enter = exit > 0, cond > 0
+    return take_rows(np.where(leave, np.nan, x), last_index(leave | enter))
+
+def backfill_scan(x: np.ndarray, n: int) -> np.ndarray:
+    """NaNs replaced by the latest valid value of the last n rows (inclusive)."""
+    idx = last_index(~np.isnan(x))
+    rows = np.arange(x.shape[0]).reshape((-1,) + (1,) * (x.ndim - 1))
+    return np.where(rows - idx < n, take_rows(x, idx), np.nan)
+
+def hump_scan(x: np.ndarray, h: float, totals: np.ndarray = None) -> np.ndarray:
+    """
+    Keep the previous output unless x moved from it by more than h × the
+    date's cross-sectional sum of |x| (`totals`, when x holds only some of
+    the symbols). Path dependent, so a loop over dates with each date's
+    cross-section done at once.
+    """
+    if totals is None:
+        totals = np.nansum(np.abs(x), axis=1)
+    out = np.empty_like(x)
+    prev = np.full(x.shape[1:], np.nan)
+    with np.errstate(invalid="ignore"):
+        for t in range(x.shape[0]):
+            row = x[t]
+            limit = h * totals[t]
+            move = np.isnan(prev) | (np.abs(row - prev) > limit)
+            prev = np.where(move, row, prev)
+            out[t] = prev
+    return out
+
+# trade_when and hump exist only as whole-panel kernels (engine/vectorized.py);
+# dsl.eval.eval_node rejects them in the per-date engine.
+
+declare("trade_when", arity=[3], kind="ts", stateful=True, nan="propagate",
+        doc="trade_when(cond,x,exit): x when cond>0, NaN when exit>0, else hold the last value")
+declare("hump", arity=range(1,3), kind="ts", stateful=True, independent=False,
+        doc="hump(x,h=0.01): change only where x moves by more than h × sum|x| of the date")
+
+@register("ts_backfill", arity=[2], kind="ts", window_arg=1,
+          doc="ts_backfill(x,n): NaN replaced by the latest valid value of the last n days")
+def ts_backfill(ctx, x, n):
+    n = int(n)
+    df = _get_df_from_series(ctx, x)
+    window = _row_slice(df, ctx.t, n)
+    out = window.ffill().iloc[-1]
+    setattr(out, "_field_name", getattr(x, "_field_name", None))
+    return out
+
+@register("if_else", arity=[3], kind="scalar",
+          doc="if_else(c,a,b): a where c is true (non-zero), else b")
+def if_else(ctx, c, a, b):
+    if not any(isinstance(v, pd.Series) for v in (c, a, b)):
+        return a if (c == c and c != 0) else b
+    ref = next(v for v in (c, a, b) if isinstance(v, pd.Series)).index
+    c, a, b = (v.reindex(ref) if isinstance(v, pd.Series) else pd.Series(float(v), index=ref)
+               for v in (c, a, b))
+    return a.where(c.fillna(0.0) != 0.0, b)
@@ -14,7 +14,8 @@ def _row_slice(df: pd.DataFrame, t, n: int) -> pd.DataFrame:
     start = max(0, end - n)
     return df.iloc[start:end]
 
-@register("delay", arity=range(2,3), kind="ts", doc="delay(x,n): return x(t-n)")
+@register("delay", arity=range(2,3), kind="ts", window_arg=1, lag=1, nan="propagate",
+          doc="delay(x,n): return x(t-n)")
 def delay(ctx, x, n):
     n = int(n)
     df = _get_df_from_series(ctx, x)
@@ -25,7 +26,8 @@ def delay(ctx, x, n):
     setattr(out, "_field_name", getattr(x, "_field_name", None))
     return out
 
-@register("ts_mean", arity=range(2,3), kind="ts", doc="rolling mean over last n (inclusive)")
+@register("ts_mean", arity=range(2,3), kind="ts", window_arg=1,
+          doc="rolling mean over last n (inclusive)")
 def ts_mean(ctx, x, n):
     n = int(n)
     df = _get_df_from_series(ctx, x)
@@ -34,7 +36,8 @@ def ts_mean(ctx, x, n):
     setattr(out, "_field_name", getattr(x, "_field_name", None))
     return out
 
-@register("ts_std", arity=range(2,3), kind="ts", doc="rolling std over last n (inclusive)")
+@register("ts_std", arity=range(2,3), kind="ts", window_arg=1,
+          doc="rolling std over last n (inclusive)")
 def ts_std(ctx, x, n):
     n = int(n)
     df = _get_df_from_series(ctx, x)
@@ -43,7 +46,8 @@ def ts_std(ctx, x, n):
     setattr(out, "_field_name", getattr(x, "_field_name", None))
     return out
 
-@register("ts_sum", arity=range(2,3), kind="ts", doc="rolling sum over last n (inclusive)")
+@register("ts_sum", arity=range(2,3), kind="ts", window_arg=1,
+          doc="rolling sum over last n (inclusive)")
 def ts_sum(ctx, x, n):
     n = int(n)
     df = _get_df_from_series(ctx, x)
@@ -52,7 +56,8 @@ def ts_sum(ctx, x, n):
     setattr(out, "_field_name", getattr(x, "_field_name", None))
     return out
 
-@register("ts_rank", arity=range(2,3), kind="ts", doc="rank of last value within past n, per symbol")
+@register("ts_rank", arity=range(2,3), kind="ts", window_arg=1,
+          doc="rank of last value within past n, per symbol")
 def ts_rank(ctx, x, n):
     n = int(n)
     df = _get_df_from_series(ctx, x)
@@ -65,7 +70,8 @@ def ts_rank(ctx, x, n):
     return out
 
 
-@register("ts_corr", arity=range(3,4), kind="ts", doc="rolling Pearson correlation of x,y over n")
+@register("ts_corr", arity=range(3,4), kind="ts", window_arg=2,
+          doc="rolling Pearson correlation of x,y over n")
 def ts_corr(ctx, x, y, n):
     n = int(n)
     dfx = _get_df_from_series(ctx, x)
@@ -73,14 +79,14 @@ def ts_corr(ctx, x, y, n):
     dfx, dfy = dfx.align(dfy, join="inner", axis=1)
     window_x = _row_slice(dfx, ctx.t, n)
     window_y = _row_slice(dfy, ctx.t, n)
-    cov = ((window_x - window_x.mean()) * (window_y - window_y.mean())).sum() / (len(window_x) - 1)
-    sx = window_x.std(ddof=1)
-    sy = window_y.std(ddof=1)
-    out = cov / (sx * sy)
-    return out
+    dx = window_x - window_x.mean()
+    dy = window_y - window_y.mean()
+    # centered sums in one ratio; clip the last-ulp overshoot past +/-1
+    out = (dx * dy).sum() / np.sqrt((dx * dx).sum() * (dy * dy).sum())
+    return out.clip(-1.0, 1.0)
 
 
-@register("decay_linear", arity=range(2,3), kind="ts",
+@register("decay_linear", arity=range(2,3), kind="ts", window_arg=1,
           doc="linearly decayed weighted average over n days")
 def decay_linear(ctx, x, n):
     n = int(n)
@@ -91,3 +97,127 @@ def decay_linear(ctx, x, n):
     out = (window.mul(w[:, None], axis=0)).sum(axis=0)
     setattr(out, "_field_name", getattr(x, "_field_name", None))
     return out
+
+
+@register("ts_min", arity=range(2,3), kind="ts", window_arg=1,
+          doc="rolling min over last n (inclusive)")
+def ts_min(ctx, x, n):
+    n = int(n)
+    df = _get_df_from_series(ctx, x)
+    window = _row_slice(df, ctx.t, n)
+    out = window.min()
+    setattr(out, "_field_name", getattr(x, "_field_name", None))
+    return out
+
+@register("ts_max", arity=range(2,3), kind="ts", window_arg=1,
+          doc="rolling max over last n (inclusive)")
+def ts_max(ctx, x, n):
+    n = int(n)
+    df = _get_df_from_series(ctx, x)
+    window = _row_slice(df, ctx.t, n)
+    out = window.max()
+    setattr(out, "_field_name", getattr(x, "_field_name", None))
+    return out
+
+def _days_since_extremum(window: pd.DataFrame, largest: bool) -> pd.Series:
+    # Walk the window newest-first so ties resolve to the most recent row.
+    vals = window.to_numpy(dtype=float)[::-1]
+    out = np.full(vals.shape[1], np.nan)
+    valid = ~np.isnan(vals).all(axis=0)
+    if valid.any():
+        v = vals[:, valid]
+        fill = -np.inf if largest else np.inf
+        v = np.where(np.isnan(v), fill, v)
+        out[valid] = v.argmax(axis=0) if largest else v.argmin(axis=0)
+    return pd.Series(out, index=window.columns)
+
+@register("ts_argmin", arity=range(2,3), kind="ts", window_arg=1,
+          doc="days since the min of the last n (0 = today)")
+def ts_argmin(ctx, x, n):
+    n = int(n)
+    df = _get_df_from_series(ctx, x)
+    window = _row_slice(df, ctx.t, n)
+    out = _days_since_extremum(window, largest=False)
+    setattr(out, "_field_name", getattr(x, "_field_name", None))
+    return out
+
+@register("ts_argmax", arity=range(2,3), kind="ts", window_arg=1,
+          doc="days since the max of the last n (0 = today)")
+def ts_argmax(ctx, x, n):
+    n = int(n)
+    df = _get_df_from_series(ctx, x)
+    window = _row_slice(df, ctx.t, n)
+    out = _days_since_extremum(window, largest=True)
+    setattr(out, "_field_name", getattr(x, "_field_name", None))
+    return out
+
+@register("ts_delta", arity=range(2,3), kind="ts", window_arg=1, lag=1, nan="propagate",
+          doc="ts_delta(x,n): x(t) - x(t-n)")
+def ts_delta(ctx, x, n):
+    n = int(n)
+    df = _get_df_from_series(ctx, x)
+    row = df.index.get_loc(ctx.t)
+    if row - n < 0:
+        return pd.Series(index=df.columns, dtype=float)
+    out = df.iloc[row] - df.iloc[row - n]
+    setattr(out, "_field_name", getattr(x, "_field_name", None))
+    return out
+
+def _pair_moments(wx: pd.DataFrame, wy: pd.DataFrame):
+    # (pair count, Cxy, Cyy) per column over the rows where both x and y are valid
+    both = wx.notna() & wy.notna()
+    x, y = wx.where(both), wy.where(both)
+    m = both.sum()
+    dx, dy = x - x.mean(), y - y.mean()
+    return m, (dx * dy).sum(), (dy * dy).sum()
+
+@register("ts_cov", arity=range(3,4), kind="ts", window_arg=2,
+          doc="rolling sample covariance of x,y over n")
+def ts_cov(ctx, x, y, n):
+    n = int(n)
+    dfx = _get_df_from_series(ctx, x)
+    dfy = _get_df_from_series(ctx, y)
+    dfx, dfy = dfx.align(dfy, join="inner", axis=1)
+    m, cxy, _ = _pair_moments(_row_slice(dfx, ctx.t, n), _row_slice(dfy, ctx.t, n))
+    return (cxy / (m - 1)).where(m >= 2)
+
+@register("ts_skew", arity=range(2,3), kind="ts", window_arg=1,
+          doc="rolling sample skewness over last n (needs 3 obs)")
+def ts_skew(ctx, x, n):
+    n = int(n)
+    df = _get_df_from_series(ctx, x)
+    window = _row_slice(df, ctx.t, n)
+    out = window.skew()
+    setattr(out, "_field_name", getattr(x, "_field_name", None))
+    return out
+
+@register("ts_kurt", arity=range(2,3), kind="ts", window_arg=1,
+          doc="rolling sample excess kurtosis over last n (needs 4 obs)")
+def ts_kurt(ctx, x, n):
+    n = int(n)
+    df = _get_df_from_series(ctx, x)
+    window = _row_slice(df, ctx.t, n)
+    out = window.kurt()
+    setattr(out, "_field_name", getattr(x, "_field_name", None))
+    return out
+
+@register("ts_zscore", arity=range(2,3), kind="ts", window_arg=1,
+          doc="(x - ts_mean(x,n)) / ts_std(x,n)")
+def ts_zscore(ctx, x, n):
+    n = int(n)
+    df = _get_df_from_series(ctx, x)
+    window = _row_slice(df, ctx.t, n)
+    sd = window.std(ddof=1).replace(0, np.nan)
+    out = (window.iloc[-1] - window.mean()) / sd
+    setattr(out, "_field_name", getattr(x, "_field_name", None))
+    return out
+
+@register("ts_beta", arity=range(3,4), kind="ts", window_arg=2,
+          doc="rolling OLS slope of x on y over n: cov(x,y) / var(y)")
+def ts_beta(ctx, x, y, n):
+    n = int(n)
+    dfx = _get_df_from_series(ctx, x)
+    dfy = _get_df_from_series(ctx, y)
+    dfx, dfy = dfx.align(dfy, join="inner", axis=1)
+    m, cxy, cyy = _pair_moments(_row_slice(dfx, ctx.t, n), _row_slice(dfy, ctx.t, n))
+    return (cxy / cyy).where((m >= 2) & (cyy > 0))
@@ -1,4 +1,5 @@
 
+import itertools, math, os, re
 from lark import Lark, Transformer, v_args
 
 GRAMMAR = r"""
@@ -6,11 +7,11 @@ GRAMMAR = r"""
 ?expr: or_expr
 ?or_expr: and_expr ("||" and_expr)*
 ?and_expr: cmp_expr ("&&" cmp_expr)*
-?cmp_expr: add_expr (("=="|"!="|">"|">="|"<"|"<=") add_expr)*
-?add_expr: mul_expr (("+"|"-") mul_expr)*
-?mul_expr: pow_expr (("*"|"/"|"%") pow_expr)*
+?cmp_expr: add_expr (CMP_OP add_expr)*
+?add_expr: mul_expr (ADD_OP mul_expr)*
+?mul_expr: pow_expr (MUL_OP pow_expr)*
 ?pow_expr: unary_expr ("^" unary_expr)*
-?unary_expr: ("+"|"-"|"!") unary_expr
+?unary_expr: UNARY_OP unary_expr
            | atom
 ?atom: NUMBER        -> number
      | NAME          -> name
@@ -18,12 +19,29 @@ GRAMMAR = r"""
      | "(" expr ")"
 func_call: NAME "(" [args] ")"
 args: expr ("," expr)*
+// operators are named terminals so Lark keeps them in the tree
+CMP_OP: "==" | "!=" | ">=" | "<=" | ">" | "<"
+ADD_OP: "+" | "-"
+MUL_OP: "*" | "/" | "%"
+UNARY_OP: "+" | "-" | "!"
 NAME: /[a-zA-Z_][a-zA-Z0-9_]*/
 NUMBER: /(\d+(\.\d*)?|\.\d+)([eE][+-]?\d+)?/
 %ignore /[ \t\r\n]+/
 """
 
-parser = Lark(GRAMMAR, start="start", parser="lalr")
+# The LALR tables are built on first parse and serialized next to this module
+# (or to $DSL_PARSER_CACHE; set it to 0 to disable). Lark keys the cache on the
+# grammar, options and versions, so a stale file is simply rebuilt.
+PARSER_CACHE = os.path.join(os.path.dirname(__file__), ".grammar.lark.cache")
+_parser = None
+
+def get_parser() -> Lark:
+    global _parser
+    if _parser is None:
+        cache = os.environ.get("DSL_PARSER_CACHE", PARSER_CACHE)
+        _parser = Lark(GRAMMAR, start="start", parser="lalr",
+                       cache=False if cache in ("", "0") else cache)
+    return _parser
 
 class Node: ...
 class Number(Node):
@@ -93,5 +111,82 @@ class ASTBuilder(Transformer):
         return UnaryOp(str(op), operand)
 
 def parse_alpha(src: str) -> Node:
-    tree = parser.parse(src)
+    tree = get_parser().parse(src)
     return ASTBuilder().transform(tree)
+
+
+# ---------------------------------------------------------------------------
+# Alpha templates: "rank(ts_mean(returns,{a}) - ts_mean(returns,{b}))"
+#
+# A placeholder is {name}, with an optional inline grid:
+#   {a=3..20}      inclusive integer range
+#   {a=10..120:10} range with step
+#   {a=5,10,20}    explicit values
+# Values for placeholders without an inline grid come from the `grid` argument.
+# A range holds at most MAX_RANGE values.
+# ---------------------------------------------------------------------------
+MAX_RANGE = 10000
+_PLACEHOLDER = re.compile(r"\{\s*([A-Za-z_][A-Za-z0-9_]*)\s*(?:=\s*([^}]*))?\}")
+
+def _num(tok: str):
+    v = float(tok)
+    return int(v) if v.is_integer() else v
+
+def _parse_values(spec: str) -> list:
+    spec = spec.strip()
+    m = re.fullmatch(r"(-?[\d.]+)\s*\.\.\s*(-?[\d.]+)(?:\s*:\s*([\d.]+))?", spec)
+    if m:
+        lo, hi = _num(m.group(1)), _num(m.group(2))
+        step = _num(m.group(3)) if m.group(3) else 1
+        if step <= 0:
+            raise ValueError(f"Template range step must be positive: '{spec}'")
+        if (hi - lo) / step >= MAX_RANGE:
+            raise ValueError(f"Template range '{spec}' has more than {MAX_RANGE} values")
+        out, v = [], lo
+        while v <= hi + 1e-12:
+            out.append(_num(repr(round(v, 10))))
+            v += step
+        return out
+    return [_num(t) for t in spec.split(",") if t.strip()]
+
+def template_params(src: str) -> dict:
+    """Placeholders in order of first use -> inline values (None if not given)."""
+    params = {}
+    for m in _PLACEHOLDER.finditer(src):
+        name, spec = m.group(1), m.group(2)
+        if spec is not None:
+            params[name] = _parse_values(spec)
+        else:
+            params.setdefault(name, None)
+    return params
+
+def expand_template(src: str, grid: dict = None, max_combos: int = None) -> list:
+    """
+    Expand a template over the cartesian product of its placeholder values.
+    Returns [(params, alpha_src), ...]; a source without placeholders expands
+    to itself. With `max_combos`, a larger product raises ValueError before
+    anything is expanded.
+    """
+    grid = grid or {}
+    params = template_params(src)
+    values = {}
+    for name, inline in params.items():
+        vals = grid.get(name, inline)
+        if vals is None:
+            raise ValueError(f"No values given for template parameter '{name}'")
+        values[name] = [_num(str(v)) for v in vals]
+    names = list(values)
+    total = math.prod(len(v) for v in values.values())
+    if max_combos is not None and total > max_combos:
+        raise ValueError(f"Template expands to {total} combinations (max {max_combos})")
+    out = []
+    for combo in itertools.product(*(values[n] for n in names)):
+        p = dict(zip(names, combo))
+        out.append((p, _PLACEHOLDER.sub(lambda m: str(p[m.group(1)]), src)))
+    return out
+
+
+if __name__ == "__main__":
+    # prebuild the parser cache at deploy time: python -m dsl.parser
+    get_parser()
+    print(f"parser cache: {os.environ.get('DSL_PARSER_CACHE', PARSER_CACHE)}")
@@ -1,18 +1,43 @@
+__all__ = []
 
-from typing import Callable, Dict, NamedTuple, Iterable, Union, List
+from typing import Callable, Dict, NamedTuple, Iterable, Optional, Union, List
 
 class FuncSpec(NamedTuple):
     name: str
     arity: Union[range, List[int]]
-    impl: Callable
-    kind: str       # "ts" | "cs" | "scalar"
+    impl: Optional[Callable]   # point-in-time: impl(ctx, *args) -> Series at ctx.t (None: panel only)
+    kind: str                  # "ts" | "cs" | "scalar" (elementwise)
     doc: str
+    panel: Optional[Callable] = None     # whole-panel: panel(*args) -> dates×symbols
+    window_arg: Optional[int] = None     # index of the integer window argument
+    lag: int = 0                         # rows looked back beyond the window (delay-like)
+    independent: bool = True             # symbols computed independently of each other
+    nan: str = "skip"                    # "skip" | "propagate" | "zero"
+    stateful: bool = False               # value at t depends on the whole history
+
+UNBOUNDED = 2**31 - 1   # lookback of stateful functions: every row before t
 
 REGISTRY: Dict[str, FuncSpec] = {}
 
-def register(name, arity, kind, doc=""):
+def register(name, arity, kind, doc="", window_arg=None, lag=0, independent=None, nan="skip",
+             stateful=False):
+    if independent is None:
+        independent = kind != "cs"
     def deco(fn):
-        REGISTRY[name] = FuncSpec(name, arity, fn, kind, doc)
+        REGISTRY[name] = FuncSpec(name, arity, fn, kind, doc,
+                                  window_arg=window_arg, lag=lag,
+                                  independent=independent, nan=nan, stateful=stateful)
+        return fn
+    return deco
+
+def declare(name, arity, kind, doc="", **opts):
+    """Register a function with no point-in-time implementation; attach its panel with register_panel."""
+    register(name, arity, kind, doc, **opts)(None)
+
+def register_panel(name):
+    """Attach a whole-panel implementation to an already registered function."""
+    def deco(fn):
+        REGISTRY[name] = get_fn(name)._replace(panel=fn)
         return fn
     return deco
 
@@ -21,9 +46,34 @@ def get_fn(name: str) -> FuncSpec:
         raise KeyError(f"Unknown function '{name}'")
     return REGISTRY[name]
 
+def allowed_arity(spec: FuncSpec) -> List[int]:
+    return list(spec.arity) if isinstance(spec.arity, range) else list(spec.arity)
+
+def check_arity(spec: FuncSpec, argc: int):
+    allowed = allowed_arity(spec)
+    if argc not in allowed:
+        raise AssertionError(f"{spec.name} expects {allowed}, got {argc}")
+
+def lookback(spec: FuncSpec, window: int) -> int:
+    """Rows of history before t that one application with this window reads."""
+    if spec.stateful:
+        return UNBOUNDED
+    if spec.window_arg is None:
+        return 0
+    return max(0, int(window) - 1 + spec.lag)
+
 def list_functions():
     out = []
     for k, spec in sorted(REGISTRY.items()):
-        arity = list(spec.arity) if isinstance(spec.arity, range) else spec.arity
-        out.append({"name": k, "arity": arity, "kind": spec.kind, "doc": spec.doc})
+        out.append({
+            "name": k,
+            "arity": allowed_arity(spec),
+            "kind": spec.kind,
+            "doc": spec.doc,
+            "window_arg": spec.window_arg,
+            "independent": spec.independent,
+            "nan": spec.nan,
+            "stateful": spec.stateful,
+            "vectorized": spec.panel is not None,
+        })
     return out
@@ -0,0 +1,126 @@
+"""
+Static shape inference over an alpha's AST, run before any data is touched.
+
+Every node gets one of three labels:
+
+  scalar         a compile-time constant (numbers and arithmetic on them);
+                 its value is folded here
+  cross_section  one value per symbol that only needs the current date
+  panel          reads history (a ts function somewhere below)
+
+Engines use the labels to skip broadcasting: a scalar operand is applied as
+a plain number and never materialized as a Series/DataFrame, and folded
+constants (window arguments included) are not evaluated at all. The pass
+also rejects unknown functions, wrong arity, windows that are not positive
+compile-time integers and scalars where a field is expected.
+"""
+from dataclasses import dataclass, field
+from typing import Dict, Optional
+import numpy as np
+from .parser import Node, Number, Name, UnaryOp, BinOp, Call
+from .registry import REGISTRY, check_arity
+from .ast_utils import node_key
+from . import functions  # noqa: F401
+
+SCALAR, CROSS_SECTION, PANEL = "scalar", "cross_section", "panel"
+_ORDER = {SCALAR: 0, CROSS_SECTION: 1, PANEL: 2}
+
+
+class ShapeError(ValueError):
+    """The alpha is ill-formed: unknown function, arity, window or operand kind."""
+
+
+@dataclass
+class Shapes:
+    root: Node
+    labels: Dict[int, str] = field(default_factory=dict)     # id(node) -> label
+    consts: Dict[int, float] = field(default_factory=dict)   # id(node) -> folded value
+    keys: Dict[int, tuple] = field(default_factory=dict)     # id(node) -> node_key
+    uses: Dict[tuple, int] = field(default_factory=dict)     # node_key -> occurrences in the tree
+
+    def label(self, node: Node) -> str:
+        return self.labels[id(node)]
+
+    def is_scalar(self, node: Node) -> bool:
+        return self.labels.get(id(node)) == SCALAR
+
+    def const(self, node: Node) -> Optional[float]:
+        return self.consts.get(id(node))
+
+    def key(self, node: Node) -> tuple:
+        return self.keys[id(node)]
+
+
+def _join(*labels: str) -> str:
+    return max(labels, key=_ORDER.get, default=SCALAR)
+
+
+def infer(node: Node) -> Shapes:
+    """Label every node of `node`; raises ShapeError for ill-formed alphas."""
+    from .eval import OPS
+    sh = Shapes(node)
+
+    def fold(n, fn):
+        try:
+            with np.errstate(all="ignore"):
+                sh.consts[id(n)] = np.float64(fn())
+        except (ArithmeticError, TypeError, ValueError):
+            pass   # left to the engines
+
+    def walk(n) -> str:
+        if isinstance(n, Number):
+            sh.consts[id(n)] = np.float64(n.value)
+            out = SCALAR
+        elif isinstance(n, Name):
+            out = CROSS_SECTION
+        elif isinstance(n, UnaryOp):
+            out = walk(n.operand)
+            v = sh.const(n.operand)
+            if v is not None:
+                fold(n, lambda: {"+": v, "-": -v, "!": float(v == 0)}[n.op])
+        elif isinstance(n, BinOp):
+            out = _join(walk(n.left), walk(n.right))
+            a, b = sh.const(n.left), sh.const(n.right)
+            if a is not None and b is not None and n.op in ("&&", "||"):
+                fold(n, lambda: float(bool(a) and bool(b)) if n.op == "&&" else float(bool(a) or bool(b)))
+            elif a is not None and b is not None and n.op in OPS:
+                fold(n, lambda: OPS[n.op](a, b))
+        elif isinstance(n, Call):
+            spec = REGISTRY.get(n.name.lower())
+            if spec is None:
+                raise ShapeError(f"Unknown function '{n.name}'")
+            try:
+                check_arity(spec, len(n.args))
+            except AssertionError as e:
+                raise ShapeError(str(e)) from e
+            args = [walk(a) for a in n.args]
+            w = spec.window_arg
+            if w is not None and w < len(n.args):
+                v = sh.const(n.args[w])
+                if v is None or not np.isfinite(v) or v != int(v) or v < 1 - spec.lag:
+                    raise ShapeError(f"{spec.name}: window must be a positive integer constant")
+            data = [i for i in range(len(args)) if i != w] if spec.kind == "ts" else \
+                [0] if spec.kind == "cs" else []
+            if spec.stateful:
+                # trade_when(cond, x, -1): constants allowed as long as something varies
+                data = data if all(args[i] == SCALAR for i in data) else []
+            for i in data:
+                if args[i] == SCALAR:
+                    raise ShapeError(f"{spec.name}: argument {i + 1} must be a field or expression, "
+                                     "not a constant")
+            out = _join(*(args[i] for i in range(len(args)) if i != w))
+            if spec.kind == "ts":
+                out = PANEL
+            elif out == SCALAR and spec.kind == "scalar":
+                vals = [sh.const(a) for a in n.args]
+                if all(v is not None for v in vals):
+                    fold(n, lambda: spec.impl(None, *vals))
+        else:
+            raise ShapeError(f"Unknown node {type(n).__name__}")
+        sh.labels[id(n)] = out
+        k = sh.keys[id(n)] = node_key(n)
+        sh.uses[k] = sh.uses.get(k, 0) + 1
+        return out
+
+    walk(node)
+    return sh
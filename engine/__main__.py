@@ -0,0 +1,6 @@
+"""python -m engine: the offline batch runner (see engine/batch.py)."""
+import sys
+from engine.batch import main
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,141 @@
+import time
+from typing import Dict, List, Optional, Sequence
+import numpy as np
+import pandas as pd
+from engine.backtest import cs_corr, weights_from_array
+
+
+def forward_returns(rets: np.ndarray, horizons: int) -> np.ndarray:
+    """
+    Compounded forward returns for h = 1..horizons as an (H, dates, symbols)
+    array: F[h-1, t] = prod(1 + r[t+1..t+h]) - 1. Built from one cumulative
+    log-return pass; paths running past the end or through a NaN are NaN.
+    """
+    T, S = rets.shape
+    nan = np.isnan(rets)
+    C = np.zeros((T + 1, S)); np.cumsum(np.log1p(np.where(nan, 0.0, rets)), axis=0, out=C[1:])
+    K = np.zeros((T + 1, S)); np.cumsum(nan, axis=0, out=K[1:])
+    F = np.full((horizons, T, S), np.nan)
+    for h in range(1, horizons + 1):
+        if h >= T:
+            break
+        # rows t = 0..T-1-h: returns t+1..t+h are prefix rows t+2..t+h+1
+        lo, hi = slice(1, T - h + 1), slice(h + 1, T + 1)
+        ok = (K[hi] - K[lo]) == 0
+        F[h - 1, :T - h] = np.where(ok, np.expm1(C[hi] - C[lo]), np.nan)
+    return F
+
+
+def cs_rank(a: np.ndarray) -> np.ndarray:
+    """Percentile rank across the last axis for every leading row at once (ties averaged)."""
+    flat = pd.DataFrame(a.reshape(-1, a.shape[-1]))
+    return flat.rank(axis=1, pct=True).to_numpy().reshape(a.shape)
+
+
+def _time_mean(x: np.ndarray) -> np.ndarray:
+    n = (~np.isnan(x)).sum(axis=-1)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return np.where(n > 0, np.nansum(x, axis=-1) / n, np.nan)
+
+
+def _time_std(x: np.ndarray) -> np.ndarray:
+    n = (~np.isnan(x)).sum(axis=-1)
+    mu = _time_mean(x)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return np.where(n > 1, np.sqrt(np.nansum((x - mu[..., None]) ** 2, axis=-1) / (n - 1)), np.nan)
+
+
+def signal_analytics(sig: pd.DataFrame, rets: Optional[pd.DataFrame] = None, horizons: int = 20,
+                     quantiles: int = 5, top_q: float = 0.2, bot_q: float = 0.2,
+                     fwd: Optional[np.ndarray] = None) -> Dict[str, np.ndarray]:
+    """
+    Signal-quality panels for every horizon h = 1..horizons in one pass over
+    the (dates × symbols) signal:
+
+      ic, rank_ic       (H, dates)  Pearson / Spearman vs h-day forward returns
+      ic_mean, ic_ir,
+      rank_ic_mean      (H,)        IC decay curve and its information ratio
+      autocorr          (H,)        mean rank autocorrelation of the signal at lag h
+      quantile_returns  (H, Q)      mean h-day forward return per signal quantile
+      spread            (H,)        top minus bottom quantile
+      turnover          (H,)        mean L1 change of quantile weights over h days
+
+    Cross-sectional ranks use one vectorized rank over all (horizon, date) rows.
+    Pass `fwd` (from forward_returns) to reuse forward returns across alphas.
+    """
+    S = sig.to_numpy(dtype=float)
+    if fwd is None:
+        R = rets.reindex(index=sig.index, columns=sig.columns).to_numpy(dtype=float)
+        fwd = forward_returns(R, horizons)
+    H, T, N = fwd.shape
+
+    # Pearson IC: the signal broadcasts against every horizon
+    ic = cs_corr(S[None], fwd)
+
+    # Spearman IC over pairwise-valid entries
+    valid = ~np.isnan(S)[None] & ~np.isnan(fwd)
+    rs = cs_rank(np.where(valid, S[None], np.nan))
+    rf = cs_rank(np.where(valid, fwd, np.nan))
+    rank_ic = cs_corr(rs, rf)
+
+    # rank autocorrelation of the signal at lags 1..H
+    r0 = cs_rank(S)
+    lagged = np.full((H, T, N), np.nan)
+    for h in range(1, H + 1):
+        if h < T:
+            lagged[h - 1, h:] = r0[:T - h]
+    autocorr = _time_mean(cs_corr(r0[None], lagged))
+
+    # quantile buckets: 1..Q from the signal's percentile rank
+    bucket = np.where(np.isnan(r0), 0, np.clip(np.ceil(r0 * quantiles), 1, quantiles)).astype(int)
+    onehot = (bucket[None] == np.arange(1, quantiles + 1)[:, None, None])      # (Q, T, N)
+    f0 = np.where(np.isnan(fwd), 0.0, fwd)
+    cnt = np.einsum("qtn,htn->hqt", onehot.astype(float), (~np.isnan(fwd)).astype(float))
+    tot = np.einsum("qtn,htn->hqt", onehot.astype(float), f0)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        qret = _time_mean(np.where(cnt > 0, tot / cnt, np.nan))                 # (H, Q)
+
+    # weight turnover over h days for the /backtest quantile portfolio
+    W = weights_from_array(S, top_q, bot_q, True)
+    turnover = np.array([np.abs(W[h:] - W[:-h]).sum(axis=1).mean() if h < T else np.nan
+                         for h in range(1, H + 1)])
+
+    ic_mean = _time_mean(ic)
+    ic_sd = _time_std(ic)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        ic_ir = np.where(ic_sd > 0, ic_mean / ic_sd, np.nan)
+    return {
+        "horizons": np.arange(1, H + 1),
+        "ic": ic, "rank_ic": rank_ic,
+        "ic_mean": ic_mean, "ic_ir": ic_ir, "rank_ic_mean": _time_mean(rank_ic),
+        "autocorr": autocorr,
+        "quantile_returns": qret,
+        "spread": qret[:, -1] - qret[:, 0],
+        "turnover": turnover,
+    }
+
+
+def screen(alphas: Sequence[str], fields: Dict[str, pd.DataFrame], horizons: int = 20,
+           quantiles: int = 5, budget=None) -> List[dict]:
+    """
+    IC decay summary for many alphas, sharing forward returns and subexpressions.
+    Alphas go through the planner within one `budget` (default
+    Budget.from_env()) for all of them: PlanError for an invalid alpha,
+    BudgetExceeded once the budget is spent.
+    """
+    from engine.liveness import SharedCache
+    from engine.planner import Budget, evaluate
+    budget = budget or Budget.from_env()
+    t0 = time.perf_counter()
+    rets = fields["returns"]
+    fwd = forward_returns(rets.to_numpy(dtype=float), horizons)
+    cache = SharedCache(alphas)   # only subexpressions several alphas contain
+    out = []
+    for a in alphas:
+        sig, _ = evaluate(a, fields, budget.remaining(t0), cache=cache)
+        cache.done(a)
+        sig = sig.reindex(index=rets.index, columns=rets.columns)
+        res = signal_analytics(sig, horizons=horizons, quantiles=quantiles, fwd=fwd)
+        out.append({"alpha": a, **{k: res[k] for k in ("ic_mean", "rank_ic_mean", "ic_ir",
+                                                       "autocorr", "spread", "turnover")}})
+    return out
@@ -0,0 +1,171 @@
+import numpy as np
+import pandas as pd
+
+TRADING_DAYS = 252
+
+
+def row_quantiles(arr: np.ndarray, qs) -> list:
+    """
+    NaN-skipping quantiles along the last axis (linear interpolation, as
+    Series.quantile), for any number of leading axes. One sort serves every q;
+    all-NaN rows give NaN. Returns one keepdims array per q.
+    """
+    srt = np.sort(arr, axis=-1)                      # NaNs sort last
+    n = (~np.isnan(arr)).sum(axis=-1, keepdims=True)
+    out = []
+    for q in qs:
+        pos = q * np.maximum(n - 1, 0)
+        lo = np.floor(pos).astype(int)
+        hi = np.minimum(lo + 1, np.maximum(n - 1, 0))
+        frac = pos - lo
+        a = np.take_along_axis(srt, lo, axis=-1)
+        b = np.take_along_axis(srt, hi, axis=-1)
+        out.append(np.where(n > 0, a + (b - a) * frac, np.nan))
+    return out
+
+
+def quantile_weights(sig: pd.DataFrame, top_q: float = 0.2, bot_q: float = 0.2,
+                     neutralize: bool = True) -> pd.DataFrame:
+    """
+    Long the top `top_q` and short the bottom `bot_q` of each date's cross-section.
+    neutralize: equal weight within each leg (+1 long / -1 short, dollar-neutral);
+    otherwise the long/short indicator is scaled to unit L1.
+    """
+    w = weights_from_array(sig.to_numpy(dtype=float), top_q, bot_q, neutralize)
+    return pd.DataFrame(w, index=sig.index, columns=sig.columns)
+
+
+def weights_from_array(arr: np.ndarray, top_q: float = 0.2, bot_q: float = 0.2,
+                       neutralize: bool = True) -> np.ndarray:
+    """quantile_weights on a raw array; the last axis is the cross-section."""
+    lo, hi = row_quantiles(arr, (bot_q, 1.0 - top_q))
+    with np.errstate(invalid="ignore"):
+        w = (arr >= hi).astype(float) - (arr <= lo).astype(float)
+    if neutralize:
+        n_long = (w > 0).sum(axis=-1, keepdims=True)
+        n_short = (w < 0).sum(axis=-1, keepdims=True)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            w = np.where(w > 0, 1.0 / n_long, np.where(w < 0, -1.0 / n_short, 0.0))
+    else:
+        l1 = np.abs(w).sum(axis=-1, keepdims=True)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            w = np.where(l1 > 0, w / l1, w)
+    return w
+
+
+def run_backtest(sig: pd.DataFrame, rets: pd.DataFrame, top_q: float = 0.2, bot_q: float = 0.2,
+                 cost_bps: float = 0.0, neutralize: bool = True) -> dict:
+    """
+    Daily-rebalanced quantile long/short backtest of a (dates×symbols) signal.
+    Returns weights, turnover, net pnl and equity (all indexed by date).
+    """
+    rets = rets.reindex(sig.index).reindex(columns=sig.columns)
+    W = quantile_weights(sig, top_q, bot_q, neutralize)
+
+    turnover = (W.diff().abs().sum(axis=1)).fillna(0.0)   # per-day L1 change
+    cost = (cost_bps / 1e4) * turnover                    # cost fraction
+
+    pnl = (W * rets).sum(axis=1).fillna(0.0)
+    pnl_net = pnl - cost
+    equity = (1.0 + pnl_net).cumprod()
+    return {"weights": W, "turnover": turnover, "pnl": pnl_net, "equity": equity}
+
+
+def holding_weights(w: np.ndarray, holds, delay: int = 0, overlap: bool = True,
+                    offset: int = 0) -> np.ndarray:
+    """
+    Book weights when each day's target `w` (dates × symbols) is traded
+    `delay` days later and held for k days, for every k in `holds`; returns an
+    (H, dates, symbols) array.
+    overlap: k staggered tranches, one launched per day, each 1/k of capital
+    (the rolling mean of the last k targets; tranches not yet launched are cash).
+    Otherwise one book rebalanced every k days, on days offset, offset+k, ...
+    """
+    w = np.nan_to_num(np.asarray(w, dtype=float))
+    T = w.shape[0]
+    if delay:
+        w = np.concatenate([np.zeros((min(delay, T),) + w.shape[1:]), w[:T - delay]])
+    out = np.empty((len(holds),) + w.shape)
+    if overlap:
+        cs = np.concatenate([np.zeros((1,) + w.shape[1:]), np.cumsum(w, axis=0)])
+    t = np.arange(T)
+    for i, k in enumerate(holds):
+        k = int(k)
+        if k < 1:
+            raise ValueError("holding periods must be >= 1 day")
+        if overlap:
+            out[i] = (cs[1:] - cs[np.maximum(t + 1 - k, 0)]) / k
+        else:
+            src = (t - offset) // k * k + offset
+            out[i] = np.where((src >= 0)[:, None], w[np.maximum(src, 0)], 0.0)
+    return out
+
+
+def run_horizons(sig: pd.DataFrame, rets: pd.DataFrame, holds=(1, 5, 10, 20), delay: int = 0,
+                 overlap: bool = True, offset: int = 0, top_q: float = 0.2, bot_q: float = 0.2,
+                 cost_bps: float = 0.0, neutralize: bool = True) -> dict:
+    """
+    The quantile long/short backtest for several holding periods at once (see
+    holding_weights). hold=1, delay=0 is run_backtest. Returns turnover, net
+    pnl and equity as (dates × holds) frames plus summarize() stats per hold.
+    """
+    holds = [int(k) for k in holds]
+    rets = rets.reindex(sig.index).reindex(columns=sig.columns).to_numpy(dtype=float)
+    w = weights_from_array(sig.to_numpy(dtype=float), top_q, bot_q, neutralize)
+    W = holding_weights(w, holds, delay, overlap, offset)
+
+    turnover = np.abs(np.diff(W, axis=1, prepend=W[:, :1])).sum(axis=-1)   # (H, T)
+    pnl = np.nansum(W * rets, axis=-1) - (cost_bps / 1e4) * turnover
+
+    def frame(a):
+        return pd.DataFrame(a.T, index=sig.index, columns=holds)
+
+    out = {"holds": holds, "turnover": frame(turnover), "pnl": frame(pnl),
+           "equity": frame(np.cumprod(1.0 + pnl, axis=-1))}
+    out["stats"] = {k: summarize({c: out[c][k] for c in ("turnover", "pnl", "equity")})
+                    for k in holds}
+    return out
+
+
+def cs_corr(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    """
+    Pearson correlation across the last axis (the cross-section) per date,
+    over pairwise-valid entries; any leading axes. Dates with fewer than two
+    valid pairs or zero variance give NaN.
+    """
+    ok = ~np.isnan(a) & ~np.isnan(b)
+    n = ok.sum(axis=-1, keepdims=True)
+    a = np.where(ok, a, 0.0); b = np.where(ok, b, 0.0)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        da = np.where(ok, a - a.sum(axis=-1, keepdims=True) / n, 0.0)
+        db = np.where(ok, b - b.sum(axis=-1, keepdims=True) / n, 0.0)
+        out = (da * db).sum(axis=-1) / np.sqrt((da * da).sum(axis=-1) * (db * db).sum(axis=-1))
+    return np.where((n[..., 0] >= 2) & np.isfinite(out), out, np.nan)
+
+
+def information_coefficient(sig: pd.DataFrame, rets: pd.DataFrame) -> float:
+    """Mean cross-sectional Pearson correlation of the signal with next-day returns."""
+    fwd = rets.reindex(sig.index).reindex(columns=sig.columns).shift(-1).to_numpy(dtype=float)
+    ic = cs_corr(sig.to_numpy(dtype=float), fwd)
+    ic = ic[~np.isnan(ic)]
+    return float(ic.mean()) if ic.size else float("nan")
+
+
+def json_number(x):
+    """x, or None for NaN/inf (JSON has neither)."""
+    return None if isinstance(x, float) and not np.isfinite(x) else x
+
+
+def summarize(bt: dict, sig: pd.DataFrame = None, rets: pd.DataFrame = None) -> dict:
+    """Compact per-alpha statistics: annualized Sharpe/return, mean turnover, IC."""
+    pnl = bt["pnl"]
+    sd = pnl.std(ddof=1)
+    out = {
+        "sharpe": float(pnl.mean() / sd * np.sqrt(TRADING_DAYS)) if sd and sd > 0 else float("nan"),
+        "ann_return": float(pnl.mean() * TRADING_DAYS),
+        "turnover": float(bt["turnover"].mean()),
+        "final_equity": float(bt["equity"].iloc[-1]) if len(bt["equity"]) else float("nan"),
+    }
+    if sig is not None and rets is not None:
+        out["ic"] = information_coefficient(sig, rets)
+    return out
@@ -1,18 +1,175 @@
+"""
+Per-date engine: eval_node on one EvaluationContext moved along the dates.
+
+With workers > 1 the dates are split into contiguous shards evaluated on a
+process pool. The fields are written once as a memory-mapped snapshot
+(engine.snapshot) that every worker maps on start-up, so tasks carry only
+(alpha, start, stop) and the shards come back in date order. The pool and
+its snapshot are kept for later calls on the same fields (by content hash)
+and replaced when the fields change.
+"""
+import atexit
+import os
+import shutil
+import tempfile
+import threading
+import weakref
+import multiprocessing as mp
+from concurrent.futures import FIRST_EXCEPTION, ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+from typing import Callable, Optional
 import pandas as pd
 from dsl.parser import parse_alpha
 from dsl.eval import EvaluationContext, eval_node
+from dsl.shapes import infer
 
-def evaluate_series(alpha_src: str, fields: dict[str, pd.DataFrame]) -> pd.DataFrame:
-    """
-    Compute alpha value per date × symbol using current eval_node.
-    (v0: simple date-loop; v1 will use vectorized rolling.)
-    """
-    ast = parse_alpha(alpha_src)
-    dates = next(iter(fields.values())).index
+WORKERS = int(os.environ.get("DSL_LOOP_WORKERS", "1"))
+SHARDS_PER_WORKER = 4      # finer shards: better balance and quicker cancellation
+MIN_SHARD_DATES = 32       # below this a shard is not worth a task
+_TMP = "/dev/shm" if os.path.isdir("/dev/shm") else None
+
+_worker_fields = None
+_POOL = {"key": None, "pool": None, "path": None, "workers": 0, "refs": ()}
+_POOL_LOCK = threading.Lock()
+
+
+def _eval_dates(ast, fields, dates, checkpoint=None) -> pd.DataFrame:
+    ctx = EvaluationContext(fields, None, infer(ast))
     results = []
     for t in dates:
-        ctx = EvaluationContext(fields, t)
-        s = eval_node(ctx, ast)
+        if checkpoint is not None:
+            checkpoint()
+        s = eval_node(ctx.at(t), ast)
         s.name = t
         results.append(s)
     return pd.DataFrame(results, index=dates)
+
+
+def effective_workers(n_dates: int, workers: Optional[int] = None) -> int:
+    """Processes actually used for `n_dates` dates (1 means the serial loop)."""
+    workers = WORKERS if workers is None else int(workers)
+    return max(1, min(workers, n_dates // MIN_SHARD_DATES))
+
+
+def _init_worker(path: str):
+    global _worker_fields
+    from engine.snapshot import read_snapshot
+    import dsl.functions  # noqa: F401
+    _worker_fields, _ = read_snapshot(path)
+
+
+def _eval_shard(alpha_src: str, start: int, stop: int) -> pd.DataFrame:
+    dates = next(iter(_worker_fields.values())).index[start:stop]
+    return _eval_dates(parse_alpha(alpha_src), _worker_fields, dates)
+
+
+def _mp_context():
+    # never fork: the server process has threads (warm-up, live sessions)
+    methods = mp.get_all_start_methods()
+    return mp.get_context("forkserver" if "forkserver" in methods else "spawn")
+
+
+def _fields_key(fields) -> tuple:
+    from engine.moments import fingerprint
+    return tuple((name, fingerprint(df)) for name, df in fields.items())
+
+
+def _retire(pool, path):
+    # queued shards of other requests still finish; the snapshot goes once no worker can need it
+    pool.shutdown(wait=True)
+    shutil.rmtree(path, ignore_errors=True)
+
+
+def pool_warm(fields, workers: int) -> bool:
+    """True when a pool of `workers` already serves these very field objects."""
+    p = _POOL
+    return p["pool"] is not None and p["workers"] == workers and len(p["refs"]) == len(fields) and \
+        all(r() is f for r, f in zip(p["refs"], fields.values()))
+
+
+def _shared_pool(fields, workers: int) -> ProcessPoolExecutor:
+    # one pool and snapshot per process, replaced when the fields' content or the worker count changes
+    with _POOL_LOCK:
+        if pool_warm(fields, workers):
+            return _POOL["pool"]
+        key = (_fields_key(fields), workers)
+        if _POOL["pool"] is None or _POOL["key"] != key:
+            if _POOL["pool"] is not None:
+                threading.Thread(target=_retire, args=(_POOL["pool"], _POOL["path"]), daemon=True).start()
+            from engine.snapshot import write_snapshot
+            path = tempfile.mkdtemp(prefix="dsl-loop-", dir=_TMP)
+            try:
+                write_snapshot(fields, path)
+                pool = ProcessPoolExecutor(workers, mp_context=_mp_context(),
+                                           initializer=_init_worker, initargs=(path,))
+            except BaseException:
+                shutil.rmtree(path, ignore_errors=True)
+                _POOL.update(key=None, pool=None, path=None, workers=0, refs=())
+                raise
+            _POOL.update(key=key, pool=pool, path=path, workers=workers)
+        _POOL["refs"] = tuple(weakref.ref(f) for f in fields.values())
+        return _POOL["pool"]
+
+
+def _drop_pool(pool):
+    with _POOL_LOCK:
+        if _POOL["pool"] is pool:
+            threading.Thread(target=_retire, args=(pool, _POOL["path"]), daemon=True).start()
+            _POOL.update(key=None, pool=None, path=None, workers=0, refs=())
+
+
+@atexit.register
+def shutdown_pool():
+    """Stop the shared worker pool and remove its snapshot."""
+    with _POOL_LOCK:
+        pool, path = _POOL["pool"], _POOL["path"]
+        _POOL.update(key=None, pool=None, path=None, workers=0, refs=())
+    if pool is not None:
+        pool.shutdown(wait=False, cancel_futures=True)
+        shutil.rmtree(path, ignore_errors=True)
+
+
+def _evaluate_parallel(alpha_src, fields, dates, workers, checkpoint) -> pd.DataFrame:
+    n = len(dates)
+    k = min(workers * SHARDS_PER_WORKER, max(n // MIN_SHARD_DATES, workers))
+    bounds = [n * i // k for i in range(k + 1)]
+    pool = _shared_pool(fields, workers)
+    futures = [pool.submit(_eval_shard, alpha_src, a, b) for a, b in zip(bounds, bounds[1:])]
+    try:
+        pending = set(futures)
+        while pending:
+            if checkpoint is not None:
+                checkpoint()
+            done, pending = wait(pending, timeout=0.05, return_when=FIRST_EXCEPTION)
+            for f in done:
+                f.result()
+        out = pd.concat([f.result() for f in futures])
+    except BrokenProcessPool:
+        _drop_pool(pool)   # a worker died: the next call starts a new pool
+        raise
+    finally:
+        for f in futures:
+            f.cancel()
+    # the snapshot stores column labels as strings
+    cols = {str(c): c for f in fields.values() for c in f.columns}
+    out.columns = [cols.get(c, c) for c in out.columns]
+    out.index = dates
+    return out
+
+
+def evaluate_series(alpha_src: str, fields: dict[str, pd.DataFrame],
+                    checkpoint: Optional[Callable[[], None]] = None,
+                    workers: Optional[int] = None) -> pd.DataFrame:
+    """
+    Compute alpha value per date × symbol using current eval_node.
+    `checkpoint` is called before each date (between shards when parallel);
+    raising from it stops the loop. `workers` defaults to DSL_LOOP_WORKERS;
+    short panels always run serially.
+    """
+    ast = parse_alpha(alpha_src)
+    infer(ast)   # ill-formed alphas fail before any data is read
+    dates = next(iter(fields.values())).index
+    workers = effective_workers(len(dates), workers)
+    if workers > 1 and isinstance(dates, pd.DatetimeIndex) and all(f.index.equals(dates) for f in fields.values()):
+        return _evaluate_parallel(alpha_src, fields, dates, workers, checkpoint)
+    return _eval_dates(ast, fields, dates, checkpoint)
@@ -0,0 +1,259 @@
+"""
+Offline batch runs: evaluate (and optionally backtest) a file of alphas on a
+process pool, without the HTTP service.
+
+    python -m engine alphas.txt --out runs/nightly --backtest
+    cat alphas.txt | python -m engine - --out runs/nightly --workers 8 --signals
+
+The fields are loaded once: from the warm-start snapshot when it is fresh
+(or --snapshot), else from the CSVs, which are then written to a temporary
+snapshot. Workers memory-map it on start-up, so tasks carry only the alpha.
+Every alpha is planned once up front in the parent; alphas with the same
+canonical form share the plan and are evaluated once.
+
+    <out>/run.json          arguments and data source of the run
+    <out>/results.jsonl     one line per finished alpha, appended as jobs complete
+    <out>/signals/<id>.npy  the signal (dates × symbols), with --signals
+
+Runs are resumable: alphas already in results.jsonl are skipped (failed ones
+too, unless --retry-errors), so an interrupted run continues where it stopped.
+"""
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from typing import Dict, Iterable, List, Optional
+import numpy as np
+import pandas as pd
+from dsl.parser import parse_alpha
+from dsl.ast_utils import canonical
+from engine.export import alpha_id
+from engine import snapshot
+
+_worker = {}   # per-process state: fields, run options
+
+
+def read_alphas(lines: Iterable[str]) -> List[str]:
+    """Non-empty, non-comment lines, first occurrence of each."""
+    seen, out = set(), []
+    for ln in lines:
+        a = ln.strip()
+        if a and not a.startswith("#") and a not in seen:
+            seen.add(a)
+            out.append(a)
+    return out
+
+
+def load_fields(data_dir: str = snapshot.DATA_DIR, snapshot_dir: Optional[str] = None):
+    """(fields, snapshot path or None): a fresh snapshot is memory-mapped, else the CSVs are read."""
+    path = snapshot_dir or os.path.join(data_dir, "snapshot")
+    m = snapshot.read_manifest(path)
+    sources = {n: snapshot.csv_path(n, data_dir) for n in snapshot.FIELDS}
+    if m is not None and (snapshot_dir is not None or snapshot.is_fresh(m, sources)):
+        return snapshot.read_snapshot(path, m)[0], path
+    return snapshot.load_csv_fields(data_dir), None
+
+
+def read_results(out: str) -> Dict[str, dict]:
+    """id -> result of the alphas finished by earlier runs into `out`."""
+    path = os.path.join(out, "results.jsonl")
+    try:
+        with open(path, "rb+") as f:
+            data = f.read()
+            # a line torn by a crash: drop it so the next append starts clean
+            keep = data.rfind(b"\n") + 1
+            if keep < len(data):
+                f.truncate(keep)
+    except FileNotFoundError:
+        return {}
+    done = {}
+    for ln in data[:keep].splitlines():
+        try:
+            r = json.loads(ln)
+        except ValueError:
+            continue
+        done[r["id"]] = r
+    return done
+
+
+def run_alpha(alpha: str, engine: str, fields: Dict[str, pd.DataFrame], opts: dict) -> dict:
+    """Evaluate one planned alpha (and backtest it); the result row written to results.jsonl."""
+    from engine.planner import Budget, evaluate
+    from engine.backtest import run_backtest, summarize, json_number
+    row = {"engine": engine}
+    t0 = time.perf_counter()
+    sig, p = evaluate(alpha, fields, Budget(opts["timeout"], opts["max_bytes"]), engine=engine)
+    row["seconds"] = time.perf_counter() - t0
+    row["peak_bytes"] = p.peak_bytes
+    if opts["backtest"]:
+        t1 = time.perf_counter()
+        bt = run_backtest(sig, fields["returns"], opts["top_q"], opts["bot_q"], opts["cost_bps"],
+                          opts["neutralize"])
+        row["stats"] = {k: json_number(v) for k, v in summarize(bt, sig, fields["returns"]).items()}
+        row["backtest_seconds"] = time.perf_counter() - t1
+    if opts["signals"]:
+        path = os.path.join(opts["out"], "signals", alpha_id(alpha) + ".npy")
+        np.save(path + ".tmp.npy", np.ascontiguousarray(sig.to_numpy(dtype=float)))
+        os.replace(path + ".tmp.npy", path)
+        row["signal"] = os.path.relpath(path, opts["out"])
+    return row
+
+
+def _init_worker(path: str, opts: dict):
+    import engine.backtest_loop as loop
+    import dsl.functions  # noqa: F401
+    loop.WORKERS = 1   # the pool is the parallelism; no nested pools
+    _worker.update(fields=snapshot.read_snapshot(path)[0], opts=opts)
+
+
+def _run_task(alpha: str, engine: str) -> dict:
+    return run_alpha(alpha, engine, _worker["fields"], _worker["opts"])
+
+
+def run_batch(alphas: List[str], out: str, fields: Dict[str, pd.DataFrame], snapshot_path: Optional[str] = None,
+              workers: int = 1, backtest: bool = False, signals: bool = False, retry_errors: bool = False,
+              timeout: Optional[float] = None, max_bytes: Optional[int] = None, top_q: float = 0.2,
+              bot_q: float = 0.2, cost_bps: float = 0.0, neutralize: bool = True,
+              progress=None) -> dict:
+    """
+    Run every alpha not already finished in `out`. Returns counts of done,
+    skipped and failed alphas. `progress(row, done, total)` is called per alpha.
+    """
+    from engine.planner import Budget, plan
+    os.makedirs(os.path.join(out, "signals") if signals else out, exist_ok=True)
+    opts = dict(out=out, backtest=backtest, signals=signals, timeout=timeout, max_bytes=max_bytes,
+                top_q=top_q, bot_q=bot_q, cost_bps=cost_bps, neutralize=neutralize)
+    finished = read_results(out)
+    todo = [a for a in alphas if alpha_id(a) not in finished or
+            (retry_errors and finished[alpha_id(a)].get("error"))]
+    counts = {"total": len(alphas), "skipped": len(alphas) - len(todo), "done": 0, "failed": 0}
+    results = open(os.path.join(out, "results.jsonl"), "a")
+
+    def record(alpha, row):
+        row = {"id": alpha_id(alpha), "alpha": alpha, **row}
+        results.write(json.dumps(row) + "\n")
+        results.flush()
+        counts["failed" if row.get("error") else "done"] += 1
+        if progress is not None:
+            progress(row, counts["done"] + counts["failed"], len(todo))
+
+    # plan once per canonical form; equivalent spellings reuse the first one's run
+    budget = Budget(timeout, max_bytes)
+    jobs: Dict[str, List[str]] = {}     # canonical -> alphas
+    engines: Dict[str, str] = {}
+    for a in todo:
+        try:
+            key = canonical(parse_alpha(a))
+            if key not in jobs:
+                engines[key] = plan(a, fields, budget).engine
+            jobs.setdefault(key, []).append(a)
+        except Exception as e:   # parse errors, PlanError, BudgetExceeded
+            record(a, {"error": str(e), "stage": "plan"})
+
+    def finish(key, row):
+        for a in jobs[key]:
+            if row.get("signal") and a != jobs[key][0]:
+                src = os.path.join(out, row["signal"])
+                row = dict(row, signal=os.path.relpath(os.path.join(out, "signals", alpha_id(a) + ".npy"), out))
+                shutil.copyfile(src, os.path.join(out, row["signal"]))
+            record(a, dict(row))
+
+    tmp = None
+    try:
+        if workers <= 1 or len(jobs) <= 1:
+            for key, group in jobs.items():
+                try:
+                    row = run_alpha(group[0], engines[key], fields, opts)
+                except Exception as e:
+                    row = {"engine": engines[key], "error": str(e), "stage": "evaluate"}
+                finish(key, row)
+        else:
+            from engine.backtest_loop import _mp_context, _TMP
+            if snapshot_path is None:
+                tmp = snapshot_path = tempfile.mkdtemp(prefix="dsl-batch-", dir=_TMP)
+                snapshot.write_snapshot(fields, tmp)
+            pool = ProcessPoolExecutor(workers, mp_context=_mp_context(),
+                                       initializer=_init_worker, initargs=(snapshot_path, opts))
+            try:
+                pending = {pool.submit(_run_task, group[0], engines[key]): key for key, group in jobs.items()}
+                while pending:
+                    done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                    for f in done:
+                        key = pending.pop(f)
+                        try:
+                            row = f.result()
+                        except Exception as e:
+                            row = {"engine": engines[key], "error": str(e), "stage": "evaluate"}
+                        finish(key, row)
+            finally:
+                pool.shutdown(wait=False, cancel_futures=True)
+    finally:
+        results.close()
+        if tmp is not None:
+            shutil.rmtree(tmp, ignore_errors=True)
+    return counts
+
+
+def main(argv=None):
+    import argparse
+    ap = argparse.ArgumentParser(prog="python -m engine", description=__doc__,
+                                 formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("alphas", help="file with one alpha per line, or - for stdin")
+    ap.add_argument("--out", required=True, help="output directory (reused runs are resumed)")
+    ap.add_argument("--data", default=snapshot.DATA_DIR, help="directory of the field CSVs")
+    ap.add_argument("--snapshot", help="read the fields from this snapshot (engine.snapshot) instead")
+    ap.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    ap.add_argument("--backtest", action="store_true", help="also backtest and record summary stats")
+    ap.add_argument("--signals", action="store_true", help="save each signal as signals/<id>.npy")
+    ap.add_argument("--retry-errors", action="store_true", help="rerun alphas that failed before")
+    ap.add_argument("--timeout", type=float, default=0, help="seconds per alpha (0: no limit)")
+    ap.add_argument("--max-mb", type=float, default=0, help="estimated memory per alpha (0: no limit)")
+    ap.add_argument("--top-q", type=float, default=0.2)
+    ap.add_argument("--bot-q", type=float, default=0.2)
+    ap.add_argument("--cost-bps", type=float, default=0.0)
+    ap.add_argument("--no-neutralize", action="store_true")
+    ap.add_argument("--quiet", action="store_true")
+    args = ap.parse_args(argv)
+
+    if args.alphas == "-":
+        alphas = read_alphas(sys.stdin)
+    else:
+        with open(args.alphas) as f:
+            alphas = read_alphas(f)
+    t0 = time.perf_counter()
+    fields, snap = load_fields(args.data, args.snapshot)
+    first = next(iter(fields.values()))
+    os.makedirs(args.out, exist_ok=True)
+    with open(os.path.join(args.out, "run.json"), "w") as f:
+        json.dump({"argv": sys.argv[1:] if argv is None else list(argv), "source": snap or args.data,
+                   "dates": [str(first.index[0]), str(first.index[-1])], "shape": list(first.shape),
+                   "alphas": len(alphas)}, f, indent=1)
+    if not args.quiet:
+        print(f"{len(alphas)} alphas, fields {first.shape[0]}×{first.shape[1]} from {snap or args.data} "
+              f"({time.perf_counter() - t0:.1f}s)", file=sys.stderr)
+
+    def progress(row, n, total):
+        if args.quiet:
+            return
+        took = sum(row.get(k) or 0 for k in ("seconds", "backtest_seconds"))
+        eta = (time.perf_counter() - t0) / n * (total - n)
+        status = f"error ({row['stage']}): {row['error']}" if row.get("error") else row["engine"]
+        sharpe = (row.get("stats") or {}).get("sharpe")
+        extra = f" sharpe {sharpe:+.2f}" if sharpe is not None else ""
+        print(f"[{n:>{len(str(total))}}/{total}] {took:7.2f}s  eta {eta:6.0f}s  {status}{extra}  {row['alpha']}",
+              file=sys.stderr)
+
+    counts = run_batch(alphas, args.out, fields, snap, workers=args.workers, backtest=args.backtest,
+                       signals=args.signals, retry_errors=args.retry_errors,
+                       timeout=args.timeout or None,
+                       max_bytes=int(args.max_mb * 2**20) if args.max_mb else None,
+                       top_q=args.top_q, bot_q=args.bot_q, cost_bps=args.cost_bps,
+                       neutralize=not args.no_neutralize, progress=progress)
+    if not args.quiet:
+        print(f"done {counts['done']}, failed {counts['failed']}, skipped {counts['skipped']} "
+              f"in {time.perf_counter() - t0:.1f}s -> {os.path.join(args.out, 'results.jsonl')}",
+              file=sys.stderr)
+    return 1 if counts["failed"] else 0
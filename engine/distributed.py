@@ -0,0 +1,485 @@
+"""
+Scatter/gather evaluation over worker processes that each own a contiguous
+slice of the symbols.
+
+Everything but the cross-sectional functions (ts_*, operators, if_else, ...)
+is independent per symbol, so each worker runs the vectorized engine on its
+own columns. A function that mixes symbols (FuncSpec.independent False:
+rank, zscore, scale, hump) is a barrier: workers evaluate its argument
+locally, send the coordinator a few numbers per date, get the combined
+numbers back and finish the function on their own columns. The result
+replaces the call as a local field and evaluation continues above it.
+
+    zscore      count, mean and M2 per date (merged with Chan's formula)
+    scale/hump  sum of |x| per date
+    rank        each worker's sorted values per date; above RANK_SAMPLE
+                symbols per worker, RANK_SAMPLE evenly spaced order
+                statistics stand in for them (ranks then approximate)
+
+The backtest runs the same way: quantile thresholds from the sorted samples,
+leg sizes as summed counts, and pnl / turnover as per-date sums, so only
+(dates,) vectors and per-date samples cross the wire, never a panel.
+
+Workers listen on TCP ("host:port") or Unix socket paths and speak
+multiprocessing.connection (length-prefixed pickles behind an HMAC
+handshake keyed by DSL_CLUSTER_KEY). Pickles execute code on load: run
+workers on trusted networks only. A worker listening on anything but
+loopback or a Unix socket refuses to start without its own key:
+
+    export DSL_CLUSTER_KEY=$(python -c "import secrets; print(secrets.token_hex(32))")
+    python -m engine.distributed worker --listen 0.0.0.0:7101
+    python -m engine.distributed run --workers h1:7101,h2:7101 --snapshot /shared/snapshot \\
+        --alpha "rank(ts_mean(returns,5))" --backtest
+
+spawn_local(n) starts n local worker processes for tests and single-host
+use, keyed with a fresh random key.
+"""
+import ipaddress
+import os
+import secrets
+import tempfile
+import shutil
+from multiprocessing.connection import Client, Listener
+from typing import Dict, List, Optional, Sequence
+import numpy as np
+import pandas as pd
+from dsl.parser import parse_alpha, Node, Number, Name, UnaryOp, BinOp, Call
+from dsl.ast_utils import ast_to_source
+from dsl.registry import get_fn
+from dsl.shapes import infer
+from engine.liveness import children
+
+DEFAULT_AUTHKEY = b"dsl-cluster"   # public: loopback and Unix sockets only
+AUTHKEY = os.environ.get("DSL_CLUSTER_KEY", "").encode() or DEFAULT_AUTHKEY
+RANK_SAMPLE = 1024
+
+
+class RemoteError(RuntimeError):
+    """A worker failed to run a step; the message carries its exception."""
+
+
+def parse_address(addr: str):
+    """"host:port" -> (host, port); anything else is a Unix socket path."""
+    host, sep, port = addr.rpartition(":")
+    return (host, int(port)) if sep and port.isdigit() and "/" not in addr else addr
+
+
+def is_local(address) -> bool:
+    """True for Unix socket paths and loopback TCP addresses."""
+    if isinstance(address, str):
+        return True
+    host = address[0]
+    if host == "localhost":
+        return True
+    try:
+        return ipaddress.ip_address(host).is_loopback
+    except ValueError:
+        return False
+
+
+# -- per-date statistics a worker sends at a barrier -----------------------------
+
+def sorted_sample(x: np.ndarray, m: int = RANK_SAMPLE):
+    """
+    (values, weights) per row: the sorted non-NaN values padded with NaN, at
+    most m per row (evenly spaced order statistics), and how many values each
+    sampled one stands for.
+    """
+    srt = np.sort(x, axis=1)
+    n = (~np.isnan(x)).sum(axis=1)
+    if srt.shape[1] <= m:
+        return srt, np.ones(len(x))
+    j = np.arange(m)[None, :]
+    pos = np.where(n[:, None] <= m, j, np.round(j / (m - 1) * (n[:, None] - 1))).astype(int)
+    out = np.take_along_axis(srt, pos, axis=1)
+    out[j >= n[:, None]] = np.nan
+    return out, np.where(n <= m, 1.0, n / m)
+
+
+def _counts(samples, x: np.ndarray):
+    # (# values < x, # values <= x) per cell over every worker's sample
+    less = np.zeros(x.shape)
+    leq = np.zeros(x.shape)
+    for vals, weights in samples:
+        for t in range(x.shape[0]):
+            row = vals[t][~np.isnan(vals[t])]
+            less[t] += weights[t] * np.searchsorted(row, x[t], "left")
+            leq[t] += weights[t] * np.searchsorted(row, x[t], "right")
+    return less, leq
+
+
+def sample_quantiles(samples, qs) -> List[np.ndarray]:
+    """Per-date quantiles (linear interpolation, as engine.backtest.row_quantiles) of the merged samples."""
+    T = len(samples[0][0])
+    out = [np.full(T, np.nan) for _ in qs]
+    for t in range(T):
+        v = np.concatenate([vals[t] for vals, _ in samples])
+        w = np.concatenate([np.full(len(vals[t]), weights[t]) for vals, weights in samples])
+        ok = ~np.isnan(v)
+        if not ok.any():
+            continue
+        order = np.argsort(v[ok], kind="stable")
+        v, w = v[ok][order], w[ok][order]
+        pos = np.cumsum(w) - w + (w - 1) / 2     # position each value stands at (its centre)
+        n = w.sum()
+        for o, q in zip(out, qs):
+            o[t] = np.interp(q * (n - 1), pos, v)
+    return out
+
+
+def _moments(x: np.ndarray):
+    n = (~np.isnan(x)).sum(axis=1).astype(float)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        mean = np.nansum(x, axis=1) / n
+        m2 = np.nansum((x - mean[:, None]) ** 2, axis=1)
+    return np.nan_to_num(np.stack([n, mean, m2]))
+
+
+def _merge_moments(parts):
+    n, mean, m2 = parts[0]
+    for nb, mb, m2b in parts[1:]:
+        tot = n + nb
+        with np.errstate(invalid="ignore", divide="ignore"):
+            d = np.where(tot > 0, mb - mean, 0.0)
+            mean = np.where(tot > 0, mean + d * nb / tot, 0.0)
+            m2 = m2 + m2b + np.where(tot > 0, d * d * n * nb / tot, 0.0)
+        n = tot
+    return np.stack([n, mean, m2])
+
+
+def _abs_sum(x: np.ndarray):
+    return np.nansum(np.abs(x), axis=1)
+
+
+def _sum(parts):
+    return np.sum(parts, axis=0)
+
+
+def _finish_rank(x, samples):
+    less, leq = _counts(samples, x)
+    n = sum(np.round((~np.isnan(v)).sum(axis=1) * w) for v, w in samples)[:, None]
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return np.where(np.isnan(x), np.nan, (less + (leq - less + 1) / 2) / n)
+
+
+def _finish_zscore(x, g):
+    n, mean, m2 = g
+    with np.errstate(invalid="ignore", divide="ignore"):
+        sd = np.sqrt(m2 / (n - 1))
+    sd = np.where(sd == 0, np.nan, sd)
+    return (x - mean[:, None]) / sd[:, None]
+
+
+def _finish_scale(x, g, a=1.0):
+    denom = np.where(g == 0, np.nan, g)
+    return x * float(a) / denom[:, None]
+
+
+def _finish_hump(x, g, h=0.01):
+    from dsl.functions.stateful import hump_scan
+    return hump_scan(x, float(h), g)
+
+
+# name -> (local statistics, combine the workers' statistics, finish locally)
+BARRIERS = {
+    "rank": (sorted_sample, list, _finish_rank),
+    "zscore": (_moments, _merge_moments, _finish_zscore),
+    "scale": (_abs_sum, _sum, _finish_scale),
+    "hump": (_abs_sum, _sum, _finish_hump),
+}
+
+
+# -- worker -----------------------------------------------------------------------
+
+class Worker:
+    """Holds one symbol partition and the panels computed on it; one method per message."""
+    OPS = ("load", "load_snapshot", "eval", "stats", "finish", "fetch", "reset", "bt_sample",
+           "bt_legs", "bt_sums")
+
+    def __init__(self):
+        self.fields: Dict[str, pd.DataFrame] = {}
+        self.panels: Dict[str, pd.DataFrame] = {}
+        self.bt = None
+
+    def load(self, fields):
+        self.fields, self.panels = dict(fields), {}
+        return {k: f.shape for k, f in self.fields.items()}
+
+    def load_snapshot(self, path, lo, hi):
+        from engine.snapshot import read_snapshot
+        fields, _ = read_snapshot(path)
+        return self.load({k: f.iloc[:, lo:hi] for k, f in fields.items()})
+
+    def reset(self):
+        self.panels, self.bt = {}, None
+
+    def eval(self, name, src):
+        from engine.vectorized import evaluate_series_vectorized
+        self.panels[name] = evaluate_series_vectorized(src, {**self.fields, **self.panels})
+        return self.panels[name].shape
+
+    def stats(self, name, fn):
+        return BARRIERS[fn][0](self.panels[name].to_numpy(dtype=float))
+
+    def finish(self, name, out, fn, g, params):
+        x = self.panels.pop(name)
+        self.panels[out] = pd.DataFrame(BARRIERS[fn][2](x.to_numpy(dtype=float), g, *params),
+                                        index=x.index, columns=x.columns)
+        return self.panels[out].shape
+
+    def fetch(self, name):
+        return self.panels[name]
+
+    def bt_sample(self, name):
+        return sorted_sample(self.panels[name].to_numpy(dtype=float))
+
+    def bt_legs(self, name, lo, hi, neutralize):
+        x = self.panels[name].to_numpy(dtype=float)
+        with np.errstate(invalid="ignore"):
+            w = (x >= hi[:, None]).astype(float) - (x <= lo[:, None]).astype(float)
+        self.bt = w
+        if neutralize:
+            return np.stack([(w > 0).sum(axis=1), (w < 0).sum(axis=1)]).astype(float)
+        return np.abs(w).sum(axis=1)[None]
+
+    def bt_sums(self, name, g, neutralize):
+        w, sig = self.bt, self.panels[name]
+        with np.errstate(divide="ignore", invalid="ignore"):
+            if neutralize:
+                w = np.where(w > 0, 1.0 / g[0][:, None], np.where(w < 0, -1.0 / g[1][:, None], 0.0))
+            else:
+                w = np.where(g[0][:, None] > 0, w / g[0][:, None], w)
+        rets = self.fields["returns"].reindex(index=sig.index, columns=sig.columns).to_numpy(dtype=float)
+        pnl = np.nansum(w * rets, axis=1)
+        turnover = np.nansum(np.abs(np.diff(w, axis=0)), axis=1)
+        self.bt = None
+        return np.stack([pnl, np.r_[0.0, turnover]])
+
+
+def serve(address, authkey: bytes = AUTHKEY, ready=None, once: bool = False):
+    """
+    Answer coordinators on `address` until killed (or after one, with once=True).
+    Raises ValueError for a network address with the public default key.
+    """
+    import dsl.functions  # noqa: F401
+    if not authkey or (authkey == DEFAULT_AUTHKEY and not is_local(address)):
+        raise ValueError(f"Refusing to listen on {address!r} with the default key: "
+                         "set DSL_CLUSTER_KEY (or --authkey) on workers and coordinator")
+    with Listener(address, authkey=authkey) as listener:
+        if ready is not None:
+            ready.send(listener.address)
+            ready.close()
+        while True:
+            worker = Worker()
+            with listener.accept() as conn:
+                while True:
+                    try:
+                        msg = conn.recv()
+                    except EOFError:
+                        break
+                    op, args = msg[0], msg[1:]
+                    if op == "close":
+                        break
+                    try:
+                        if op not in Worker.OPS:
+                            raise ValueError(f"unknown op {op!r}")
+                        conn.send(("ok", getattr(worker, op)(*args)))
+                    except Exception as e:
+                        conn.send(("error", f"{type(e).__name__}: {e}"))
+            if once:
+                return
+
+
+# -- coordinator ------------------------------------------------------------------
+
+def _substitute(node: Node, names: Dict[tuple, str], shapes) -> Node:
+    # copy of node with already computed barrier calls replaced by their local fields
+    k = shapes.keys.get(id(node))
+    if k in names:
+        return Name(names[k])
+    if isinstance(node, UnaryOp):
+        return UnaryOp(node.op, _substitute(node.operand, names, shapes))
+    if isinstance(node, BinOp):
+        return BinOp(node.op, _substitute(node.left, names, shapes), _substitute(node.right, names, shapes))
+    if isinstance(node, Call):
+        return Call(node.name, [_substitute(a, names, shapes) for a in node.args])
+    return node
+
+
+def barriers(ast: Node, shapes) -> List[Call]:
+    """The symbol-mixing calls of `ast`, innermost first, one per distinct subexpression."""
+    out, seen = [], set()
+
+    def walk(n):
+        for c in children(n):
+            walk(c)
+        if isinstance(n, Call) and not get_fn(n.name.lower()).independent:
+            k = shapes.key(n)
+            if k not in seen:
+                seen.add(k)
+                out.append(n)
+    walk(ast)
+    return out
+
+
+class Cluster:
+    """Coordinator side: one connection per worker, in symbol order."""
+
+    def __init__(self, addresses: Sequence, authkey: bytes = AUTHKEY):
+        self.conns = [Client(parse_address(a) if isinstance(a, str) else a, authkey=authkey)
+                      for a in addresses]
+        self.processes = []
+        self._tmp = None
+        self.columns = None
+        self.index = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        for c in self.conns:
+            try:
+                c.send(("close",))
+                c.close()
+            except OSError:
+                pass
+        for p in self.processes:
+            p.terminate()
+            p.join()
+        if self._tmp is not None:
+            shutil.rmtree(self._tmp, ignore_errors=True)
+        self.conns, self.processes, self._tmp = [], [], None
+
+    def _call(self, op, per_worker: List[tuple]) -> list:
+        # send every request first so the workers compute concurrently, then collect
+        for c, args in zip(self.conns, per_worker):
+            c.send((op, *args))
+        replies = [c.recv() for c in self.conns]
+        errors = [r[1] for r in replies if r[0] == "error"]
+        if errors:
+            raise RemoteError(f"{op}: {errors[0]}")
+        return [r[1] for r in replies]
+
+    def _all(self, op, *args) -> list:
+        return self._call(op, [args] * len(self.conns))
+
+    def partitions(self, n_symbols: int) -> List[tuple]:
+        bounds = np.linspace(0, n_symbols, len(self.conns) + 1).round().astype(int)
+        return list(zip(bounds[:-1].tolist(), bounds[1:].tolist()))
+
+    def load(self, fields: Dict[str, pd.DataFrame]):
+        """Ship each worker its columns of `fields` (for data the coordinator already holds)."""
+        first = next(iter(fields.values()))
+        self.index, self.columns = first.index, first.columns
+        self._call("load", [({k: f.iloc[:, lo:hi] for k, f in fields.items()},)
+                            for lo, hi in self.partitions(first.shape[1])])
+
+    def load_snapshot(self, path: str):
+        """Have each worker map its columns of an engine.snapshot on a shared path."""
+        from engine.snapshot import read_manifest
+        m = read_manifest(path)
+        if m is None:
+            raise FileNotFoundError(f"No snapshot at {path}")
+        self.index = pd.DatetimeIndex(np.load(os.path.join(path, "dates.npy")), name=m["index_name"])
+        self.columns = pd.Index(next(iter(m["fields"].values()))["columns"])
+        self._call("load_snapshot", [(path, lo, hi) for lo, hi in self.partitions(len(self.columns))])
+
+    def _run(self, alpha: str) -> str:
+        # evaluate on the workers; returns the name of the local result panel
+        ast = parse_alpha(alpha)
+        shapes = infer(ast)
+        if shapes.is_scalar(ast):
+            raise ValueError("distributed evaluation needs a field in the alpha")
+        self._all("reset")
+        names: Dict[tuple, str] = {}
+        for i, call in enumerate(barriers(ast, shapes)):
+            fn = call.name.lower()
+            params = [shapes.const(a) for a in call.args[1:]]
+            if fn not in BARRIERS or any(p is None for p in params):
+                raise ValueError(f"'{fn}' cannot be evaluated across partitions")
+            arg = f"_arg{i}"
+            self._all("eval", arg, ast_to_source(_substitute(call.args[0], names, shapes)))
+            g = BARRIERS[fn][1](self._all("stats", arg, fn))
+            names[shapes.key(call)] = f"_cs{i}"
+            self._all("finish", arg, f"_cs{i}", fn, g, params)
+        self._all("eval", "_out", ast_to_source(_substitute(ast, names, shapes)))
+        return "_out"
+
+    def evaluate(self, alpha: str) -> pd.DataFrame:
+        """The alpha's (dates × symbols) signal, gathered from the workers."""
+        out = pd.concat(self._all("fetch", self._run(alpha)), axis=1)
+        return out.reindex(columns=self.columns) if self.columns is not None else out
+
+    def backtest(self, alpha: str, top_q: float = 0.2, bot_q: float = 0.2, cost_bps: float = 0.0,
+                 neutralize: bool = True) -> dict:
+        """engine.backtest.run_backtest on the distributed signal; only per-date series come back."""
+        name = self._run(alpha)
+        lo, hi = sample_quantiles(self._all("bt_sample", name), (bot_q, 1.0 - top_q))
+        legs = _sum(self._all("bt_legs", name, lo, hi, neutralize))
+        pnl, turnover = _sum(self._all("bt_sums", name, legs, neutralize))
+        idx = self.index
+        pnl = pd.Series(pnl - (cost_bps / 1e4) * turnover, index=idx)
+        return {"pnl": pnl, "turnover": pd.Series(turnover, index=idx), "equity": (1.0 + pnl).cumprod()}
+
+
+def spawn_local(n: int, transport: str = "unix", authkey: Optional[bytes] = None) -> Cluster:
+    """n worker processes on this host (Unix sockets or 127.0.0.1 TCP) and a Cluster on them."""
+    from engine.backtest_loop import _mp_context
+    ctx = _mp_context()
+    authkey = authkey or secrets.token_bytes(32)
+    tmp = tempfile.mkdtemp(prefix="dsl-cluster-") if transport == "unix" else None
+    procs, addresses = [], []
+    try:
+        for i in range(n):
+            addr = os.path.join(tmp, f"w{i}.sock") if tmp else ("127.0.0.1", 0)
+            recv, send = ctx.Pipe(duplex=False)
+            p = ctx.Process(target=serve, args=(addr, authkey, send, True), daemon=True)
+            p.start()
+            send.close()
+            procs.append(p)
+            addresses.append(recv.recv())
+        cluster = Cluster(addresses, authkey)
+    except BaseException:
+        for p in procs:
+            p.terminate()
+        if tmp is not None:
+            shutil.rmtree(tmp, ignore_errors=True)
+        raise
+    cluster.processes, cluster._tmp = procs, tmp
+    return cluster
+
+
+if __name__ == "__main__":
+    import argparse
+    ap = argparse.ArgumentParser(description="Symbol-partitioned evaluation over worker processes")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    w = sub.add_parser("worker", help="serve one symbol partition")
+    w.add_argument("--listen", required=True, help="host:port or a Unix socket path")
+    w.add_argument("--authkey", help="shared key (default: $DSL_CLUSTER_KEY)")
+    r = sub.add_parser("run", help="evaluate alphas on running workers")
+    r.add_argument("--workers", required=True, help="comma-separated host:port or socket paths")
+    r.add_argument("--snapshot", required=True, help="engine.snapshot directory every worker can read")
+    r.add_argument("--alpha", action="append", required=True)
+    r.add_argument("--backtest", action="store_true")
+    r.add_argument("--authkey", help="shared key (default: $DSL_CLUSTER_KEY)")
+    args = ap.parse_args()
+    key = args.authkey.encode() if args.authkey else AUTHKEY
+    if args.cmd == "worker":
+        try:
+            serve(parse_address(args.listen), key)
+        except ValueError as e:
+            ap.error(str(e))
+    else:
+        with Cluster(args.workers.split(","), key) as cluster:
+            cluster.load_snapshot(args.snapshot)
+            for a in args.alpha:
+                if args.backtest:
+                    bt = cluster.backtest(a)
+                    print(f"{a}: final equity {bt['equity'].iloc[-1]:.4f}")
+                else:
+                    sig = cluster.evaluate(a)
+                    print(f"{a}: {sig.shape[0]}×{sig.shape[1]}")
+                    print(sig.tail())
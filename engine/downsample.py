@@ -0,0 +1,126 @@
+"""
+Server-side reduction of chart data to the pixels that will show it:
+LTTB for line series and block mean/min/max tiles for the signal heatmap.
+Output size depends on the viewport, not on the panel.
+"""
+from typing import Dict, Optional, Sequence
+import numpy as np
+import pandas as pd
+
+
+def lttb(y: np.ndarray, n_out: int) -> np.ndarray:
+    """
+    Largest-Triangle-Three-Buckets: indices of `n_out` points of `y` (x is the
+    position) that keep its visual shape. Always keeps the first and last
+    point; NaNs are never picked unless a whole bucket is NaN.
+    """
+    n = len(y)
+    if n_out >= n or n <= 2:
+        return np.arange(n)
+    n_out = max(n_out, 3)
+    edges = np.linspace(1, n - 1, n_out - 1).astype(int)     # n_out-2 buckets over 1..n-2
+    out = np.empty(n_out, dtype=int)
+    out[0], out[-1] = 0, n - 1
+    a = 0
+    for i in range(n_out - 2):
+        lo, hi = edges[i], max(edges[i + 1], edges[i] + 1)
+        if i + 2 < len(edges):
+            nxt = y[edges[i + 1]:edges[i + 2]]
+            xc = (edges[i + 1] + edges[i + 2] - 1) / 2.0
+            yc = np.nanmean(nxt) if np.isfinite(nxt).any() else y[a]
+        else:
+            xc, yc = n - 1, y[n - 1]
+        xb = np.arange(lo, hi)
+        area = np.abs((a - xc) * (y[lo:hi] - y[a]) - (a - xb) * (yc - y[a]))
+        a = lo + int(np.nanargmax(area)) if np.isfinite(area).any() else lo
+        out[i + 1] = a
+    return out
+
+
+def _edges(n: int, k: int) -> np.ndarray:
+    # start offsets of min(n, k) near-equal blocks
+    return np.linspace(0, n, max(min(n, k), 1), endpoint=False).astype(int)
+
+
+def tile_panel(arr: np.ndarray, rows: int, cols: int) -> Dict[str, np.ndarray]:
+    """
+    Reduce a (dates, symbols) array to at most rows×cols blocks. Returns the
+    block start offsets and NaN-skipping mean/min/max/count per block.
+    """
+    r, c = _edges(arr.shape[0], rows), _edges(arr.shape[1], cols)
+    if arr.size == 0:
+        empty = np.empty((len(r), len(c)))
+        return {"row_edges": r, "col_edges": c, "mean": empty, "min": empty, "max": empty,
+                "count": empty}
+    valid = ~np.isnan(arr)
+
+    def block(ufunc, a):
+        return ufunc.reduceat(ufunc.reduceat(a, r, axis=0), c, axis=1)
+
+    s = block(np.add, np.where(valid, arr, 0.0))
+    n = block(np.add, valid.astype(float))
+    with np.errstate(invalid="ignore", divide="ignore"):
+        mean = np.where(n > 0, s / n, np.nan)
+    return {"row_edges": r, "col_edges": c, "mean": mean,
+            "min": block(np.fmin, arr), "max": block(np.fmax, arr), "count": n}
+
+
+def _finite(a, digits: Optional[int] = None) -> list:
+    # JSON-ready list: NaN/inf -> None, optionally rounded to `digits` significant digits
+    a = np.asarray(a, dtype=float)
+    if digits is not None:
+        with np.errstate(invalid="ignore", divide="ignore", over="ignore"):
+            scale = 10.0 ** (digits - 1 - np.floor(np.log10(np.abs(a))))
+            a = np.where(np.isfinite(scale) & (scale > 0), np.round(a * scale) / scale, a)
+    return np.where(np.isfinite(a), a, None).tolist()
+
+
+def resolve_viewport(index: pd.Index, n_symbols: int, start: Optional[str] = None,
+                     end: Optional[str] = None, sym_start: int = 0,
+                     sym_end: Optional[int] = None) -> tuple:
+    """Date and symbol slices for a viewport, clamped to the panel."""
+    lo = index.searchsorted(pd.Timestamp(start), "left") if start else 0
+    hi = index.searchsorted(pd.Timestamp(end), "right") if end else len(index)
+    s0 = min(max(int(sym_start), 0), n_symbols)
+    s1 = n_symbols if sym_end is None else min(max(int(sym_end), s0), n_symbols)
+    return slice(int(lo), int(max(hi, lo))), slice(s0, s1)
+
+
+def downsample_view(index: pd.Index, columns: Sequence[str], series: Dict[str, np.ndarray],
+                    signals: Optional[np.ndarray] = None, start: Optional[str] = None,
+                    end: Optional[str] = None, sym_start: int = 0, sym_end: Optional[int] = None,
+                    width: int = 800, height: int = 200, cell_px: int = 4) -> dict:
+    """
+    JSON-ready view of a backtest inside a viewport: each line series LTTB'd to
+    ~`width` points and the signal matrix tiled to (height/cell_px) date rows ×
+    (width/cell_px) symbol columns.
+    """
+    rows, cols = resolve_viewport(index, len(columns), start, end, sym_start, sym_end)
+    dates = index[rows]
+    labels = dates.strftime("%Y-%m-%d")
+    out = {"viewport": {"start": labels[0] if len(labels) else None,
+                        "end": labels[-1] if len(labels) else None,
+                        "sym_start": cols.start, "sym_end": cols.stop,
+                        "n_dates": len(index), "n_symbols": len(columns)}}
+    for name, y in series.items():
+        y = np.asarray(y, dtype=float)[rows]
+        keep = lttb(y, max(int(width), 3))
+        out[name] = {"dates": labels[keep].tolist(), "values": _finite(y[keep])}
+
+    if signals is not None:
+        cell = max(int(cell_px), 1)
+        t = tile_panel(np.asarray(signals, dtype=float)[rows, cols],
+                       max(int(height) // cell, 1), max(int(width) // cell, 1))
+        r, c = t["row_edges"], t["col_edges"]
+        names = list(columns)[cols]
+        c_end = np.append(c[1:], len(names)) - 1
+        r_end = np.append(r[1:], len(dates)) - 1
+        out["heatmap"] = {
+            "dates": labels[r].tolist() if len(r) and len(dates) else [],
+            "date_end": labels[r_end].tolist() if len(r) and len(dates) else [],
+            "sym_start": (c + cols.start).tolist(),
+            "labels": [names[a] if a == b else f"{names[a]}…{names[b]}"
+                       for a, b in zip(c, c_end)] if names else [],
+            "mean": _finite(t["mean"], 6), "min": _finite(t["min"], 6), "max": _finite(t["max"], 6),
+        }
+    return out
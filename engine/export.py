@@ -0,0 +1,206 @@
+"""
+Signal export for downstream systems: one directory per alpha holding
+date-partitioned signal files and a JSON manifest of their axes.
+
+    <root>/<alpha id>/manifest.json    alpha, columns, rows and date range per partition
+    <root>/<alpha id>/2024.f64         float64 rows (dates × symbols), row-major
+    <root>/<alpha id>/2024.dates       int64 ns timestamp per row
+
+New dates are appended to the end of the current partition file (or start
+a new one); rows already written are never touched, and the manifest is
+replaced last, so a crash mid-append leaves the previous export intact.
+Readers memory-map the raw files and slice date ranges without copying.
+With format="parquet" (needs pyarrow) each append writes its own file.
+
+    python -m engine.export --out exports --alpha "rank(ts_mean(returns,5))" ...
+    python -m engine.export --out exports --alphas alphas.txt --partition month
+"""
+import hashlib
+import json
+import os
+from typing import Dict, Iterable, Iterator, List, Optional
+import numpy as np
+import pandas as pd
+
+VERSION = 1
+FORMATS = ("raw", "parquet")
+PARTITIONS = {"year": "%Y", "month": "%Y-%m"}
+
+
+def has_parquet() -> bool:
+    try:
+        import pyarrow  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def alpha_id(alpha: str) -> str:
+    return hashlib.blake2b(alpha.encode(), digest_size=10).hexdigest()
+
+
+def alpha_dir(root: str, alpha: str) -> str:
+    return os.path.join(root, alpha_id(alpha))
+
+
+def read_manifest(root: str, alpha: str) -> Optional[dict]:
+    try:
+        with open(os.path.join(alpha_dir(root, alpha), "manifest.json")) as f:
+            m = json.load(f)
+    except (OSError, ValueError):
+        return None
+    return m if m.get("version") == VERSION else None
+
+
+def write_manifest(path: str, manifest: dict):
+    """Replace <path>/manifest.json in one step (a temp file and os.replace)."""
+    tmp = os.path.join(path, "manifest.json.tmp")
+    with open(tmp, "w") as f:
+        json.dump(manifest, f, indent=1)
+    os.replace(tmp, os.path.join(path, "manifest.json"))
+
+
+def _append_raw(path: str, name: str, rows: int, values: np.ndarray, stamps: np.ndarray):
+    # drop anything past the manifest's row count (a torn earlier append), then extend
+    for ext, arr in ((".f64", values), (".dates", stamps)):
+        with open(os.path.join(path, name + ext), "ab+") as f:
+            f.truncate(rows * arr[:1].nbytes)
+            arr.tofile(f)
+
+
+def append_signal(root: str, alpha: str, sig: pd.DataFrame, partition: str = "year",
+                  format: str = "raw") -> int:
+    """
+    Append the dates of `sig` after the last exported one; earlier dates are
+    ignored. Returns the number of rows written.
+    """
+    path = alpha_dir(root, alpha)
+    m = read_manifest(root, alpha)
+    if m is None:
+        if format not in FORMATS or partition not in PARTITIONS:
+            raise ValueError(f"format must be one of {FORMATS}, partition one of {tuple(PARTITIONS)}")
+        if format == "parquet" and not has_parquet():
+            raise ImportError("Parquet export needs pyarrow; use format='raw'")
+        os.makedirs(path, exist_ok=True)
+        m = {"version": VERSION, "alpha": alpha, "format": format, "partition": partition,
+             "dtype": "<f8", "index_name": sig.index.name, "partitions": []}
+    parts = m["partitions"]
+    if parts:
+        sig = sig[sig.index > pd.Timestamp(parts[-1]["end"])]
+    if sig.empty:
+        return 0
+
+    columns = [str(c) for c in sig.columns]
+    values = np.ascontiguousarray(sig.to_numpy(dtype="<f8"))
+    stamps = sig.index.as_unit("ns").asi8
+    periods = sig.index.strftime(PARTITIONS[m["partition"]])
+    cuts = np.flatnonzero(periods[1:] != periods[:-1]) + 1
+    for lo, hi in zip(np.r_[0, cuts], np.r_[cuts, len(sig)]):
+        period, first, last = periods[lo], sig.index[lo], sig.index[hi - 1]
+        cur = parts[-1] if parts else None
+        if m["format"] == "raw" and cur is not None and cur["period"] == period \
+                and cur["columns"] == columns:
+            _append_raw(path, cur["file"], cur["rows"], values[lo:hi], stamps[lo:hi])
+            cur["rows"] += int(hi - lo)
+            cur["end"] = last.isoformat()
+            continue
+        # new partition: first chunk of a period, a changed universe, or a parquet append
+        same = sum(p["period"] == period for p in parts)
+        name = period if same == 0 else f"{period}_{same}"
+        if m["format"] == "raw":
+            _append_raw(path, name, 0, values[lo:hi], stamps[lo:hi])
+        else:
+            sig.iloc[lo:hi].set_axis(columns, axis=1).to_parquet(os.path.join(path, name + ".parquet"))
+        parts.append({"period": period, "file": name, "columns": columns, "rows": int(hi - lo),
+                      "start": first.isoformat(), "end": last.isoformat()})
+    write_manifest(path, m)
+    return len(sig)
+
+
+def iter_signal(root: str, alpha: str, start=None, end=None) -> Iterator[pd.DataFrame]:
+    """
+    One frame per partition overlapping [start, end]. Raw partitions are
+    read-only memory maps, so each frame is a zero-copy view of the file.
+    """
+    m = read_manifest(root, alpha)
+    if m is None:
+        raise FileNotFoundError(f"No export of {alpha!r} under {root}")
+    path = alpha_dir(root, alpha)
+    start = pd.Timestamp(start) if start is not None else None
+    end = pd.Timestamp(end) if end is not None else None
+    for p in m["partitions"]:
+        if (start is not None and pd.Timestamp(p["end"]) < start) or \
+                (end is not None and pd.Timestamp(p["start"]) > end):
+            continue
+        if m["format"] == "parquet":
+            df = pd.read_parquet(os.path.join(path, p["file"] + ".parquet"))
+        else:
+            n, s = p["rows"], len(p["columns"])
+            stamps = np.memmap(os.path.join(path, p["file"] + ".dates"), dtype="<i8", mode="r", shape=(n,))
+            values = np.memmap(os.path.join(path, p["file"] + ".f64"), dtype="<f8", mode="r", shape=(n, s))
+            df = pd.DataFrame(values, index=pd.DatetimeIndex(stamps.view("M8[ns]"), name=m["index_name"]),
+                              columns=p["columns"], copy=False)
+        lo = 0 if start is None else df.index.searchsorted(start, "left")
+        hi = len(df) if end is None else df.index.searchsorted(end, "right")
+        yield df.iloc[lo:hi]
+
+
+def read_signal(root: str, alpha: str, start=None, end=None) -> pd.DataFrame:
+    """
+    Exported signal over [start, end]. A range inside one partition is a view
+    of the memory map; ranges spanning partitions are concatenated (a copy).
+    """
+    frames = list(iter_signal(root, alpha, start, end))
+    if not frames:
+        return pd.DataFrame()
+    return frames[0] if len(frames) == 1 else pd.concat(frames)
+
+
+def export_signals(alphas: Iterable[str], fields: Dict[str, pd.DataFrame], root: str,
+                   partition: str = "year", format: str = "raw") -> List[dict]:
+    """
+    Evaluate and append every alpha. Only dates after each alpha's last export
+    are written; those are evaluated on the trailing rows they read (new
+    dates + lookback) rather than the whole history.
+    """
+    from dsl.parser import parse_alpha
+    from dsl.analyzer import analyze
+    from engine.planner import evaluate
+    dates = next(iter(fields.values())).index
+    tails: Dict[int, dict] = {}   # first row -> trailing views of the fields
+    out = []
+    for a in alphas:
+        m = read_manifest(root, a)
+        last = pd.Timestamp(m["partitions"][-1]["end"]) if m and m["partitions"] else None
+        new = len(dates) - (dates.searchsorted(last, "right") if last is not None else 0)
+        if new <= 0:
+            out.append({"alpha": a, "id": alpha_id(a), "rows": 0})
+            continue
+        first = max(len(dates) - new - analyze(parse_alpha(a)).lookback, 0)
+        if first not in tails:
+            tails[first] = {k: f.iloc[first:] for k, f in fields.items()} if first else fields
+        # no node cache: it would keep every alpha's intermediates alive until the end
+        sig, _ = evaluate(a, tails[first])
+        rows = append_signal(root, a, sig.iloc[-new:], partition, format)
+        out.append({"alpha": a, "id": alpha_id(a), "rows": rows})
+    return out
+
+
+if __name__ == "__main__":
+    import argparse
+    from engine.snapshot import DATA_DIR, load_csv_fields
+    ap = argparse.ArgumentParser(description="Export evaluated signals to date-partitioned files")
+    ap.add_argument("--out", required=True)
+    ap.add_argument("--data", default=DATA_DIR)
+    ap.add_argument("--alpha", action="append", default=[], help="alpha to export (repeatable)")
+    ap.add_argument("--alphas", help="file with one alpha per line")
+    ap.add_argument("--partition", choices=sorted(PARTITIONS), default="year")
+    ap.add_argument("--format", choices=FORMATS, default="raw")
+    args = ap.parse_args()
+    alphas = list(args.alpha)
+    if args.alphas:
+        with open(args.alphas) as f:
+            alphas += [ln.strip() for ln in f if ln.strip() and not ln.startswith("#")]
+    fields = load_csv_fields(args.data)
+    for r in export_signals(alphas, fields, args.out, args.partition, args.format):
+        print(f"{r['id']}  +{r['rows']:<6d} {r['alpha']}")
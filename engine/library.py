@@ -0,0 +1,242 @@
+"""
+Alpha library: stored alphas with compact signal fingerprints and an index
+over them, to tell which stored alphas a new one is highly correlated with.
+
+    <root>/manifest.json      sample dates, symbols, count and file sizes
+    <root>/fingerprints.f32   float32 rows (alphas × DIM), row-major
+    <root>/alphas.jsonl       {"id", "alpha", "canonical"} per row
+
+Correlation here is the pooled correlation of per-date cross-sectional
+ranks (centered per date, missing values at the mean). A fingerprint
+estimates it cheaply: the ranks on SAMPLE_DATES evenly spaced dates of the
+panel, hashed with random signs into DIM buckets (a sparse random
+projection) and scaled to unit length, so the dot product of two
+fingerprints approximates the correlation of the two signals.
+
+Lookups do not scan the library. Fingerprints are bucketed by random-
+hyperplane LSH (TABLES tables of BITS sign bits); a query scores only the
+alphas in its buckets, or one bit away from them, for it and its negation
+(anti-correlated alphas are duplicates too), then re-evaluates the best
+few and ranks them by exact correlation over the full panel. Libraries
+below BRUTE_FORCE_BELOW alphas are simply scanned.
+
+Appends follow engine.export: the data files are truncated to the counts
+in the manifest, extended, and the manifest is replaced last.
+
+    python -m engine.library --root library --add alphas.txt
+    python -m engine.library --root library --similar "rank(ts_mean(returns,5))"
+"""
+import json
+import os
+import threading
+from collections import defaultdict
+from typing import Callable, Dict, List, Optional
+import numpy as np
+import pandas as pd
+from dsl.parser import parse_alpha
+from dsl.ast_utils import canonical
+from engine.export import alpha_id, write_manifest
+
+VERSION = 1
+SAMPLE_DATES = 64
+DIM = 128
+TABLES = 16
+BITS = 12
+BRUTE_FORCE_BELOW = 1024
+SEED = 20240101
+
+
+def centered_ranks(sig: pd.DataFrame) -> np.ndarray:
+    """Per-date percentile ranks minus their mean; NaN (no signal) becomes 0."""
+    r = sig.rank(axis=1, pct=True).to_numpy(dtype=float)
+    n = (~np.isnan(r)).sum(axis=1, keepdims=True)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        r = r - np.nansum(r, axis=1, keepdims=True) / n
+    return np.nan_to_num(r)
+
+
+def _corr(a: np.ndarray, b: np.ndarray) -> float:
+    den = np.sqrt((a * a).sum() * (b * b).sum())
+    return float((a * b).sum() / den) if den > 0 else 0.0
+
+
+def rank_corr(a: pd.DataFrame, b: pd.DataFrame) -> float:
+    """Pooled correlation of the two signals' centered cross-sectional ranks."""
+    b = b.reindex(index=a.index, columns=a.columns)
+    return _corr(centered_ranks(a), centered_ranks(b))
+
+
+def sample_dates(index: pd.Index, n: int = SAMPLE_DATES) -> pd.Index:
+    return index[np.unique(np.linspace(0, len(index) - 1, min(n, len(index))).round().astype(int))]
+
+
+class Library:
+    def __init__(self, root: str):
+        self.root = root
+        self._lock = threading.Lock()
+        self.manifest = self._read_manifest()
+        self.entries: List[dict] = []
+        self.fingerprints = np.empty((0, DIM), dtype=np.float32)
+        self._by_canonical: Dict[str, int] = {}
+        self._buckets = [defaultdict(list) for _ in range(TABLES)]
+        self._planes = np.random.default_rng(SEED + 1).standard_normal((DIM, TABLES * BITS))
+        self._axes = None
+        if self.manifest is not None:
+            self._load()
+
+    # -- storage --------------------------------------------------------------
+
+    def _read_manifest(self) -> Optional[dict]:
+        try:
+            with open(os.path.join(self.root, "manifest.json")) as f:
+                m = json.load(f)
+        except (OSError, ValueError):
+            return None
+        return m if m.get("version") == VERSION and m.get("dim") == DIM else None
+
+    def _load(self):
+        m = self.manifest
+        n = m["count"]
+        fp = np.fromfile(os.path.join(self.root, "fingerprints.f32"), dtype="<f4", count=n * DIM)
+        with open(os.path.join(self.root, "alphas.jsonl"), "rb") as f:
+            lines = f.read(m["entries_bytes"]).splitlines()
+        self._append_index([json.loads(ln) for ln in lines[:n]], fp.reshape(n, DIM))
+
+    def _append_index(self, entries: List[dict], fps: np.ndarray):
+        base = len(self.entries)
+        self.entries += entries
+        self.fingerprints = np.concatenate([self.fingerprints, fps.astype(np.float32)])
+        for i, e in enumerate(entries):
+            self._by_canonical[e["canonical"]] = base + i
+        for t, keys in enumerate(self._keys(fps).T):
+            for i, key in enumerate(keys.tolist()):
+                self._buckets[t][key].append(base + i)
+
+    def _keys(self, fps: np.ndarray) -> np.ndarray:
+        # (n, TABLES) bucket keys: BITS hyperplane signs per table
+        bits = (np.atleast_2d(fps) @ self._planes > 0).reshape(-1, TABLES, BITS)
+        return bits @ (1 << np.arange(BITS))
+
+    # -- fingerprints -----------------------------------------------------------
+
+    def axes(self, sig: pd.DataFrame):
+        """(sample dates, symbols) fingerprints are taken on; fixed by the first alpha added."""
+        if self._axes is None:
+            if self.manifest is not None:
+                self._axes = (pd.DatetimeIndex(self.manifest["dates"]), pd.Index(self.manifest["symbols"]))
+            else:
+                return sample_dates(sig.index), sig.columns.astype(str)
+        return self._axes
+
+    def fingerprint(self, sig: pd.DataFrame) -> np.ndarray:
+        dates, symbols = self.axes(sig)
+        # symbols are matched as strings, as stored in the manifest
+        sig = sig.set_axis(sig.columns.astype(str), axis=1)
+        x = centered_ranks(sig.reindex(index=dates, columns=symbols)).ravel()
+        rng = np.random.default_rng(SEED)
+        slot = rng.integers(0, DIM, x.size)
+        sign = rng.integers(0, 2, x.size) * 2.0 - 1.0
+        fp = np.bincount(slot, weights=sign * x, minlength=DIM)
+        norm = np.linalg.norm(fp)
+        return (fp / norm if norm > 0 else fp).astype(np.float32)
+
+    # -- public -----------------------------------------------------------------
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def get(self, alpha: str) -> Optional[dict]:
+        i = self._by_canonical.get(canonical(parse_alpha(alpha)))
+        return None if i is None else self.entries[i]
+
+    def add(self, alpha: str, sig: pd.DataFrame) -> dict:
+        """Store `alpha` with the fingerprint of `sig`; an equivalent spelling already stored is returned as is."""
+        canon = canonical(parse_alpha(alpha))
+        with self._lock:
+            i = self._by_canonical.get(canon)
+            if i is not None:
+                return dict(self.entries[i], added=False)
+            entry = {"id": alpha_id(canon), "alpha": alpha, "canonical": canon}
+            fp = self.fingerprint(sig)
+            m = self.manifest
+            if m is None:
+                dates, symbols = self.axes(sig)
+                os.makedirs(self.root, exist_ok=True)
+                m = {"version": VERSION, "dim": DIM, "seed": SEED, "count": 0, "entries_bytes": 0,
+                     "dates": [d.isoformat() for d in pd.DatetimeIndex(dates)],
+                     "symbols": [str(s) for s in symbols]}
+            line = (json.dumps(entry) + "\n").encode()
+            for name, data, size in (("fingerprints.f32", fp.astype("<f4").tobytes(), m["count"] * DIM * 4),
+                                     ("alphas.jsonl", line, m["entries_bytes"])):
+                with open(os.path.join(self.root, name), "ab+") as f:
+                    f.truncate(size)   # a torn earlier append
+                    f.write(data)
+            m = dict(m, count=m["count"] + 1, entries_bytes=m["entries_bytes"] + len(line))
+            write_manifest(self.root, m)
+            self.manifest = m
+            self._append_index([entry], fp[None])
+        return dict(entry, added=True)
+
+    def candidates(self, fp: np.ndarray) -> np.ndarray:
+        """Rows worth scoring for `fp`: its LSH buckets and those of -fp, each probed to one bit flip."""
+        if len(self) < BRUTE_FORCE_BELOW:
+            return np.arange(len(self))
+        out = set()
+        flips = [0] + [1 << b for b in range(BITS)]
+        for keys in self._keys(np.stack([fp, -fp])):
+            for t, key in enumerate(keys.tolist()):
+                for f in flips:
+                    out.update(self._buckets[t].get(key ^ f, ()))
+        return np.fromiter(sorted(out), dtype=np.int64, count=len(out))
+
+    def similar(self, sig: pd.DataFrame, k: int = 5, signal: Optional[Callable[[str], pd.DataFrame]] = None,
+                refine: Optional[int] = None, exclude: Optional[str] = None) -> List[dict]:
+        """
+        Top-k stored alphas by |correlation| with `sig`. Candidates are scored
+        on fingerprints; if `signal(alpha)` is given, the best `refine` of
+        them (default 4k) are re-ranked by exact correlation over the panel.
+        """
+        if not len(self) or k <= 0:
+            return []
+        with self._lock:
+            fp = self.fingerprint(sig)
+            rows = self.candidates(fp)
+            approx = self.fingerprints[rows] @ fp
+        if exclude is not None:
+            keep = rows != self._by_canonical.get(canonical(parse_alpha(exclude)), -1)
+            rows, approx = rows[keep], approx[keep]
+        top = np.argsort(-np.abs(approx), kind="stable")[:max(refine or 4 * k, k)]
+        out = [dict(self.entries[rows[j]], approx=float(approx[j]), corr=None) for j in top]
+        if signal is not None:
+            ranks = centered_ranks(sig)
+            for o in out:
+                other = signal(o["alpha"]).reindex(index=sig.index, columns=sig.columns)
+                o["corr"] = _corr(ranks, centered_ranks(other))
+            out.sort(key=lambda o: -abs(o["corr"]))
+        return out[:k]
+
+
+if __name__ == "__main__":
+    import argparse
+    from engine.snapshot import DATA_DIR, load_csv_fields
+    from engine.planner import evaluate
+    ap = argparse.ArgumentParser(description="Store alphas and look up correlated ones")
+    ap.add_argument("--root", required=True)
+    ap.add_argument("--data", default=DATA_DIR)
+    ap.add_argument("--add", help="file with one alpha per line to store")
+    ap.add_argument("--similar", action="append", default=[], help="alpha to look up (repeatable)")
+    ap.add_argument("-k", type=int, default=5)
+    args = ap.parse_args()
+    fields = load_csv_fields(args.data)
+    lib = Library(args.root)
+    signal = lambda a: evaluate(a, fields)[0]
+    if args.add:
+        with open(args.add) as f:
+            for a in (ln.strip() for ln in f):
+                if a and not a.startswith("#"):
+                    e = lib.add(a, signal(a))
+                    print(f"{e['id']}  {'added' if e['added'] else 'exists'}  {a}")
+    for a in args.similar:
+        print(a)
+        for m in lib.similar(signal(a), args.k, signal, exclude=a):
+            print(f"  {m['corr']:+.3f}  {m['id']}  {m['alpha']}")
@@ -0,0 +1,193 @@
+"""
+Evaluation order and buffer lifetimes for the whole-panel engine.
+
+schedule() flattens an AST into post-order steps, one per distinct
+subexpression (folded constants excluded), and records the step that last
+reads each result. The engine drops a result right after that step instead
+of holding every intermediate until the root is done, so peak memory is the
+widest point of the expression, not its size.
+
+SharedCache is the node cache for a batch of alphas (sweep variants,
+portfolio members): it holds only the subexpressions that several of them
+contain, until the last of those is done, so private intermediates are
+released as in a single evaluation. CarryCache does the same across the
+versions of an edited expression (the live playground): it holds the
+subexpressions nearest the root, as many as a memory budget allows.
+
+BufferPool keeps a few released (dates × symbols) float buffers that
+elementwise operators write into with ufunc out=, instead of allocating a
+fresh panel per operator.
+"""
+from collections import Counter, deque
+from typing import Dict, Iterable, List, NamedTuple, Tuple
+import numpy as np
+import pandas as pd
+from dsl.parser import Node, UnaryOp, BinOp, Call, parse_alpha
+
+
+class Step(NamedTuple):
+    key: tuple
+    node: Node
+
+
+def children(node) -> list:
+    if isinstance(node, UnaryOp):
+        return [node.operand]
+    if isinstance(node, BinOp):
+        return [node.left, node.right]
+    if isinstance(node, Call):
+        return list(node.args)
+    return []
+
+
+def schedule(ast: Node, shapes, ready=frozenset()) -> Tuple[List[Step], Dict[tuple, int]]:
+    """
+    Post-order steps of the distinct non-constant subexpressions, and key -> last
+    reading step. A key in `ready` (a result already at hand, e.g. cached) is a
+    step of its own, but its operands are not scheduled for it.
+    """
+    steps: List[Step] = []
+    seen = set()
+    stack = [(ast, False)]
+    while stack:
+        node, expanded = stack.pop()
+        if shapes.const(node) is not None:
+            continue
+        k = shapes.key(node)
+        if k in seen:
+            continue
+        if expanded or k in ready:
+            seen.add(k)
+            steps.append(Step(k, node))
+            continue
+        stack.append((node, True))
+        stack.extend((c, False) for c in reversed(children(node)))
+    last: Dict[tuple, int] = {}
+    for i, s in enumerate(steps):
+        if s.key in ready:
+            continue
+        for c in children(s.node):
+            if shapes.const(c) is None:
+                last[shapes.key(c)] = i
+    return steps, last
+
+
+def peak_live(steps: List[Step], last: Dict[tuple, int], skip=()) -> int:
+    """Most results alive at once while running `steps` (keys in `skip` are not counted)."""
+    live = peak = 0
+    dying: Dict[int, int] = {}
+    for i, s in enumerate(steps):
+        if s.key not in skip:
+            live += 1
+            peak = max(peak, live)
+            if s.key in last:
+                dying[last[s.key]] = dying.get(last[s.key], 0) + 1
+        live -= dying.pop(i, 0)
+    return peak
+
+
+def nbytes(v) -> int:
+    if isinstance(v, pd.DataFrame):
+        return len(v) * int(sum(dt.itemsize for dt in v.dtypes))
+    if isinstance(v, (pd.Series, np.ndarray)):
+        return int(v.nbytes)
+    return 0
+
+
+def float_values(v):
+    """The float64 array behind a single-dtype frame (no copy), else None."""
+    if isinstance(v, pd.DataFrame) and len(v.columns) and \
+            all(dt == np.float64 for dt in v.dtypes):
+        arr = v.to_numpy()
+        if arr.dtype == np.float64:
+            return arr
+    return None
+
+
+def _step_keys(alpha: str) -> set:
+    from dsl.shapes import infer
+    ast = parse_alpha(alpha)
+    return {s.key for s in schedule(ast, infer(ast))[0] if s.key[0] != "name"}
+
+
+class SharedCache(dict):
+    """
+    node_key -> panel for the keys in `keep`: subexpressions of more than one
+    of `alphas`. done(alpha) drops the ones no alpha still to run needs.
+    """
+
+    def __init__(self, alphas: Iterable[str]):
+        super().__init__()
+        self._keys: Dict[str, set] = {}
+        counts = Counter()
+        for a in alphas:
+            if a not in self._keys:
+                try:
+                    self._keys[a] = _step_keys(a)
+                except Exception:
+                    self._keys[a] = set()   # invalid alphas fail when they are evaluated
+            counts.update(self._keys[a])
+        self._left = {k: n for k, n in counts.items() if n > 1}
+        self.keep = frozenset(self._left)
+
+    def done(self, alpha: str):
+        for k in self._keys.get(alpha, ()):
+            if k in self._left:
+                self._left[k] -= 1
+                if not self._left[k]:
+                    del self._left[k]
+                    self.pop(k, None)
+
+
+class CarryCache(dict):
+    """
+    node_key -> panel for one version of an edited expression. It starts with
+    the panels of `carried` (the previous version's cache) that `ast` still
+    contains and keeps at most `panels` subexpressions, nearest the root first:
+    reusing those skips the most work when the next edit changes one branch.
+    None keeps every subexpression.
+    """
+
+    def __init__(self, ast: Node, carried: dict = None, panels: int = None):
+        from dsl.shapes import infer
+        super().__init__()
+        shapes = infer(ast)
+        order, seen, queue = [], set(), deque([ast])
+        while queue:
+            node = queue.popleft()
+            k = shapes.key(node)
+            if shapes.const(node) is not None or k[0] == "name" or k in seen:
+                continue
+            seen.add(k)
+            order.append(k)
+            queue.extend(children(node))
+        self.keep = frozenset(order if panels is None else order[:max(panels, 0)])
+        self.update((k, v) for k, v in (carried or {}).items() if k in self.keep)
+
+
+class BufferPool:
+    def __init__(self, max_buffers: int = 2):
+        self.max_buffers = max_buffers
+        self._free: Dict[tuple, List[np.ndarray]] = {}
+        self.reused = 0
+        self.allocated = 0
+
+    def get(self, shape: tuple) -> np.ndarray:
+        free = self._free.get(shape)
+        if free:
+            self.reused += 1
+            return free.pop()
+        self.allocated += 1
+        return np.empty(shape)
+
+    def put(self, buf: np.ndarray):
+        free = self._free.setdefault(buf.shape, [])
+        if sum(len(f) for f in self._free.values()) < self.max_buffers:
+            free.append(buf)
+
+    @property
+    def bytes(self) -> int:
+        return sum(b.nbytes for f in self._free.values() for b in f)
+
+    def clear(self):
+        self._free.clear()
@@ -0,0 +1,294 @@
+import hashlib
+import os
+import threading
+import weakref
+from collections import OrderedDict
+from typing import Dict, Iterable, Optional, Tuple
+import numpy as np
+import pandas as pd
+
+
+def fingerprint(df: pd.DataFrame) -> str:
+    """Content hash of a panel: index, columns and values."""
+    h = hashlib.blake2b(digest_size=16)
+    h.update(np.asarray(df.index.astype("int64") if isinstance(df.index, pd.DatetimeIndex)
+                        else df.index.astype(str)).tobytes())
+    h.update("\x1f".join(map(str, df.columns)).encode())
+    h.update(np.ascontiguousarray(df.to_numpy(dtype=float)).tobytes())
+    return h.hexdigest()
+
+
+def _prefix(a: np.ndarray) -> np.ndarray:
+    # cumulative sum with a leading zero row, so window sums are P[i+1] - P[lo]
+    out = np.zeros((a.shape[0] + 1,) + a.shape[1:])
+    np.cumsum(a, axis=0, out=out[1:])
+    return out
+
+
+def _window(P: np.ndarray, n: int) -> np.ndarray:
+    T = P.shape[0] - 1
+    hi = np.arange(1, T + 1)
+    lo = np.maximum(hi - n, 0)
+    return P[hi] - P[lo]
+
+
+def rolling_comoments(x: np.ndarray, y: Optional[np.ndarray], n: int) -> Dict[str, np.ndarray]:
+    """
+    Fused rolling co-moments in one pass over the rows: pairwise count, means
+    and centered sums Cxx, Cyy, Cxy (y=None computes only the x terms).
+
+    Uses Welford-style add/remove updates vectorized across symbols, so sums
+    stay centered on the window mean and price-level fields keep their
+    precision. Rows where x or y is NaN are skipped pairwise. A window whose
+    values are all identical gets exactly zero variance.
+    """
+    x = np.asarray(x, dtype=float)
+    uni = y is None
+    y = x if uni else np.asarray(y, dtype=float)
+    T, N = x.shape
+    valid = ~np.isnan(x) & ~np.isnan(y)
+    xv = np.where(valid, x, 0.0); yv = np.where(valid, y, 0.0)
+
+    m = np.zeros(N); mx = np.zeros(N); my = np.zeros(N)
+    cxx = np.zeros(N); cyy = np.zeros(N); cxy = np.zeros(N)
+    out = {k: np.empty((T, N)) for k in (("n", "mx", "cxx") if uni else
+                                         ("n", "mx", "my", "cxx", "cyy", "cxy"))}
+    # run lengths of repeated values, to pin constant windows to zero variance
+    run_x = np.zeros(N); run_y = np.zeros(N)
+    prev_x = np.full(N, np.nan); prev_y = np.full(N, np.nan)
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        for i in range(T):
+            if i >= n:
+                v = valid[i - n]
+                a, b = xv[i - n], yv[i - n]
+                m1 = m - v
+                dx = a - mx
+                mx1 = np.where(m1 > 0, mx - dx / m1, 0.0)
+                cxx = np.where(v, cxx - dx * (a - mx1), cxx)
+                if not uni:
+                    dy = b - my
+                    my1 = np.where(m1 > 0, my - dy / m1, 0.0)
+                    cyy = np.where(v, cyy - dy * (b - my1), cyy)
+                    cxy = np.where(v, cxy - dx * (b - my1), cxy)
+                    my = np.where(v, my1, my)
+                mx = np.where(v, mx1, mx)
+                m = m1
+            v = valid[i]
+            a, b = xv[i], yv[i]
+            m1 = m + v
+            dx = a - mx
+            mx1 = np.where(v, mx + dx / np.maximum(m1, 1), mx)
+            cxx = np.where(v, cxx + dx * (a - mx1), cxx)
+            if not uni:
+                dy = b - my
+                my1 = np.where(v, my + dy / np.maximum(m1, 1), my)
+                cyy = np.where(v, cyy + dy * (b - my1), cyy)
+                cxy = np.where(v, cxy + dx * (b - my1), cxy)
+                my = my1
+            mx, m = mx1, m1
+
+            run_x = np.where(v, np.where(a == prev_x, run_x + 1, 1), 0)
+            prev_x = np.where(v, a, np.nan)
+            cxx = np.where((run_x >= m) | (m <= 1), 0.0, np.maximum(cxx, 0.0))
+            out["n"][i] = m; out["mx"][i] = mx; out["cxx"][i] = cxx
+            if not uni:
+                run_y = np.where(v, np.where(b == prev_y, run_y + 1, 1), 0)
+                prev_y = np.where(v, b, np.nan)
+                cyy = np.where((run_y >= m) | (m <= 1), 0.0, np.maximum(cyy, 0.0))
+                cxy = np.where(m <= 1, 0.0, cxy)
+                out["my"][i] = my; out["cyy"][i] = cyy; out["cxy"][i] = cxy
+    return out
+
+
+def co_var(co: Dict[str, np.ndarray], which: str = "x") -> np.ndarray:
+    m = co["n"]
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return np.where(m >= 2, co["c" + which * 2] / (m - 1), np.nan)
+
+def co_cov(co: Dict[str, np.ndarray]) -> np.ndarray:
+    m = co["n"]
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return np.where(m >= 2, co["cxy"] / (m - 1), np.nan)
+
+def co_corr(co: Dict[str, np.ndarray]) -> np.ndarray:
+    m, cxx, cyy = co["n"], co["cxx"], co["cyy"]
+    with np.errstate(invalid="ignore", divide="ignore"):
+        out = co["cxy"] / np.sqrt(cxx * cyy)
+    return np.where((m >= 2) & (cxx > 0) & (cyy > 0), out, np.nan)
+
+def co_beta(co: Dict[str, np.ndarray]) -> np.ndarray:
+    """OLS slope of x on y: Cxy / Cyy."""
+    m, cyy = co["n"], co["cyy"]
+    with np.errstate(invalid="ignore", divide="ignore"):
+        out = co["cxy"] / cyy
+    return np.where((m >= 2) & (cyy > 0), out, np.nan)
+
+
+class MomentStore:
+    """
+    Shared cache of rolling statistics per field fingerprint.
+
+    Sums and means come from prefix sums of count and (mean-shifted) x, so
+    any window is O(1) per cell. Second moments (var/std/cov/corr/beta) come
+    from the fused rolling_comoments kernel -- differencing prefix sums of
+    squares cancels badly on price-level fields -- and are cached per
+    (field, other field, window).
+
+    Only frames passed to track() (raw fields) go through the store, so
+    per-request intermediates do not evict shared entries. Entries are evicted
+    least-recently-used once their total size exceeds max_bytes.
+    """
+
+    def __init__(self, max_bytes: int = 256 * 2**20):
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[tuple, Dict[str, np.ndarray]]" = OrderedDict()
+        self._bytes = 0
+        self._fp: Dict[int, Tuple[weakref.ref, str]] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    # ---- identity -------------------------------------------------------
+    def track(self, fields: Dict[str, pd.DataFrame]):
+        for df in fields.values():
+            self._fingerprint(df)
+
+    def tracked(self, df) -> bool:
+        if not isinstance(df, pd.DataFrame):
+            return False
+        ref = self._fp.get(id(df))
+        return ref is not None and ref[0]() is df
+
+    def _fingerprint(self, df: pd.DataFrame) -> str:
+        ref = self._fp.get(id(df))
+        if ref is not None and ref[0]() is df:
+            return ref[1]
+        fp = fingerprint(df)
+        key = id(df)
+        self._fp[key] = (weakref.ref(df, lambda _r, key=key: self._fp.pop(key, None)), fp)
+        return fp
+
+    # ---- cache ----------------------------------------------------------
+    def _get(self, key, build):
+        # requests evaluate on worker threads: the LRU is guarded, build() is not
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry
+            self.misses += 1
+        entry = build()
+        with self._lock:
+            if key in self._entries:
+                return self._entries[key]
+            self._entries[key] = entry
+            self._bytes += sum(a.nbytes for a in entry.values())
+            while self._bytes > self.max_bytes and len(self._entries) > 1:
+                _, old = self._entries.popitem(last=False)
+                self._bytes -= sum(a.nbytes for a in old.values())
+        return entry
+
+    def _single(self, df: pd.DataFrame):
+        def build():
+            x = df.to_numpy(dtype=float)
+            valid = ~np.isnan(x)
+            ref = np.nan_to_num(np.nanmean(np.where(valid, x, np.nan), axis=0)) \
+                if valid.any() else np.zeros(x.shape[1])
+            d = np.where(valid, x - ref, 0.0)
+            return {"ref": ref, "n": _prefix(valid.astype(float)),
+                    "s": _prefix(d)}
+        return self._get(("single", self._fingerprint(df)), build)
+
+    def _comoments(self, x: pd.DataFrame, y: Optional[pd.DataFrame], n: int):
+        fy = None if y is None else self._fingerprint(y)
+        def build():
+            return rolling_comoments(x.to_numpy(dtype=float),
+                                     None if y is None else y.to_numpy(dtype=float), n)
+        return self._get(("co", self._fingerprint(x), fy, int(n)), build)
+
+    def stats(self) -> dict:
+        return {"entries": len(self._entries), "bytes": self._bytes,
+                "max_bytes": self.max_bytes, "hits": self.hits, "misses": self.misses}
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    # ---- prewarm --------------------------------------------------------
+    def prewarm(self, fields: Dict[str, pd.DataFrame], analyses: Iterable):
+        """Build the sums and per-window moments the analyzed alphas will read."""
+        for an in analyses:
+            for name, windows in an.windows.items():
+                if name in fields:
+                    self._single(fields[name])
+                    for n in windows:
+                        self._comoments(fields[name], None, n)
+            for a, b, n in getattr(an, "pairs", ()):
+                if a in fields and b in fields:
+                    x, y = self._aligned(fields[a], fields[b])
+                    self._comoments(x, y, n)
+
+    def _aligned(self, x: pd.DataFrame, y: pd.DataFrame):
+        if x.index.equals(y.index) and x.columns.equals(y.columns):
+            return x, y
+        x2, y2 = x.align(y, join="inner")
+        # aligned copies are new objects: track them under their content hash
+        self._fingerprint(x2); self._fingerprint(y2)
+        return x2, y2
+
+    # ---- window queries (reduced-window semantics as engine.vectorized) --
+    def _frame(self, df: pd.DataFrame, arr: np.ndarray) -> pd.DataFrame:
+        return pd.DataFrame(arr, index=df.index, columns=df.columns)
+
+    def sum(self, df: pd.DataFrame, n: int) -> pd.DataFrame:
+        e = self._single(df)
+        m = _window(e["n"], n)
+        with np.errstate(invalid="ignore"):
+            out = _window(e["s"], n) + m * e["ref"]
+        return self._frame(df, np.where(m >= 1, out, np.nan))
+
+    def mean(self, df: pd.DataFrame, n: int) -> pd.DataFrame:
+        e = self._single(df)
+        m = _window(e["n"], n)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            out = _window(e["s"], n) / m + e["ref"]
+        return self._frame(df, np.where(m >= 1, out, np.nan))
+
+    def var(self, df: pd.DataFrame, n: int) -> pd.DataFrame:
+        return self._frame(df, co_var(self._comoments(df, None, n)))
+
+    def std(self, df: pd.DataFrame, n: int) -> pd.DataFrame:
+        return np.sqrt(self.var(df, n))
+
+    def zscore(self, df: pd.DataFrame, n: int) -> pd.DataFrame:
+        co = self._comoments(df, None, n)
+        sd = np.sqrt(co_var(co))
+        with np.errstate(invalid="ignore", divide="ignore"):
+            out = (df.to_numpy(dtype=float) - co["mx"]) / np.where(sd > 0, sd, np.nan)
+        return self._frame(df, out)
+
+    def cov(self, x: pd.DataFrame, y: pd.DataFrame, n: int) -> pd.DataFrame:
+        x, y = self._aligned(x, y)
+        return self._frame(x, co_cov(self._comoments(x, y, n)))
+
+    def corr(self, x: pd.DataFrame, y: pd.DataFrame, n: int) -> pd.DataFrame:
+        x, y = self._aligned(x, y)
+        return self._frame(x, co_corr(self._comoments(x, y, n)))
+
+    def beta(self, x: pd.DataFrame, y: pd.DataFrame, n: int) -> pd.DataFrame:
+        """Rolling OLS slope of x on y: cov(x, y) / var(y)."""
+        x, y = self._aligned(x, y)
+        return self._frame(x, co_beta(self._comoments(x, y, n)))
+
+
+STORE = MomentStore(max_bytes=int(float(os.environ.get("DSL_MOMENT_STORE_MB", "256")) * 2**20))
+
+
+def prewarm(fields: Dict[str, pd.DataFrame], alphas: Iterable[str], store: MomentStore = None):
+    """Analyze a batch of alpha sources and build the prefix sums they will read."""
+    from dsl.parser import parse_alpha
+    from dsl.analyzer import analyze
+    (store or STORE).prewarm(fields, [analyze(parse_alpha(a)) for a in alphas])
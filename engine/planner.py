@@ -0,0 +1,246 @@
+"""
+Engine selection and evaluation budgets.
+
+plan() checks an alpha against the registry and the fields up front, then
+estimates time and memory for each engine from the analyzer's view of the
+expression and the panel size:
+
+  vectorized  engine.vectorized: whole-panel kernels, cost ~ nodes × dates × symbols
+  loop        engine.backtest_loop: per-date eval_node, cost ~ dates × nodes / workers
+
+and picks the cheapest engine that supports every function and fits the
+budget. evaluate() runs the plan, enforcing the time budget at engine
+checkpoints (between nodes / dates).
+"""
+import os
+import time
+from dataclasses import dataclass, field, asdict
+from typing import Callable, Dict, Optional, Tuple
+import pandas as pd
+from dsl.parser import parse_alpha, Node, Number, Name, UnaryOp, BinOp, Call
+from dsl.analyzer import analyze
+from dsl.registry import REGISTRY
+from dsl.shapes import infer, ShapeError
+import engine.vectorized  # noqa: F401  (attaches the panel kernels to the specs)
+from engine.backtest_loop import effective_workers, pool_warm
+from engine.liveness import schedule, peak_live
+
+ENGINES = ("vectorized", "loop")
+
+# Rough per-node costs: (vectorized ns per cell, loop µs per date). Measured on
+# a laptop; only the order of magnitude matters for choosing an engine.
+_KIND_COST = {"scalar": (50, 300), "cs": (100, 300), "ts": (500, 300)}
+_FN_COST = {
+    "rank": (600, 300),
+    "sdiv": (50, 3500),
+    "ts_std": (900, 500), "ts_zscore": (900, 500), "ts_skew": (900, 500), "ts_kurt": (900, 500),
+    "ts_argmin": (700, 300), "ts_argmax": (700, 300),
+    "ts_corr": (2000, 2500), "ts_cov": (2000, 2500), "ts_beta": (2000, 2500),
+    # rolling.apply kernels: one Python call per window and symbol
+    "ts_rank": (300_000, 1000), "decay_linear": (25_000, 500),
+    # stateful scans (vectorized only) and their cheap neighbours
+    "trade_when": (60, 400), "hump": (400, 400), "ts_backfill": (40, 300), "if_else": (30, 300),
+}
+_OP_COST = (30, 50)
+_LOOP_DATE_US = 250            # EvaluationContext + bookkeeping per date
+_LOOP_WINDOW_NS = 5            # per symbol per window row read by a ts op
+_VEC_NODE_US = 300             # fixed overhead of one pandas kernel
+_POOL_START_S = 0.5            # process pool start + field snapshot for a sharded loop (first call)
+_MOMENT_PANELS = {"ts_corr": 6, "ts_cov": 6, "ts_beta": 6, "ts_std": 3, "ts_zscore": 3}
+
+
+class PlanError(ValueError):
+    """The alpha cannot be evaluated by any engine (unknown name, bad arity, ...)."""
+
+
+class BudgetExceeded(RuntimeError):
+    """An evaluation would exceed, or did exceed, its time or memory budget."""
+
+
+@dataclass
+class Budget:
+    seconds: Optional[float] = None
+    bytes: Optional[int] = None
+
+    @classmethod
+    def from_env(cls) -> "Budget":
+        s = os.environ.get("DSL_EVAL_TIMEOUT_S", "30")
+        mb = os.environ.get("DSL_EVAL_MAX_MB", "2048")
+        return cls(seconds=float(s) if float(s) > 0 else None,
+                   bytes=int(float(mb) * 2**20) if float(mb) > 0 else None)
+
+    def remaining(self, started: float) -> "Budget":
+        """
+        What is left of the time budget of a job started at `started`
+        (time.perf_counter()); raises BudgetExceeded once it is spent.
+        """
+        if self.seconds is None:
+            return self
+        left = self.seconds - (time.perf_counter() - started)
+        if left <= 0:
+            raise BudgetExceeded(f"Job exceeded the {self.seconds:g}s budget")
+        return Budget(left, self.bytes)
+
+    def check(self, seconds: float, nbytes: int) -> Optional[str]:
+        """Why an estimate does not fit, or None."""
+        if self.seconds is not None and seconds > self.seconds:
+            return f"estimated {seconds:.1f}s exceeds the {self.seconds:g}s budget"
+        if self.bytes is not None and nbytes > self.bytes:
+            return f"estimated {nbytes / 2**20:.0f} MB exceeds the {self.bytes / 2**20:.0f} MB budget"
+        return None
+
+
+@dataclass
+class Plan:
+    engine: str
+    dates: int
+    symbols: int
+    nodes: int
+    lookback: int
+    workers: int = 1          # processes used by the loop engine
+    seconds: Dict[str, float] = field(default_factory=dict)
+    bytes: Dict[str, int] = field(default_factory=dict)
+    unsupported: Dict[str, str] = field(default_factory=dict)   # engine -> reason
+    peak_bytes: Optional[int] = None   # measured by the vectorized engine after evaluate()
+
+    def to_dict(self) -> dict:
+        return asdict(self)
+
+
+def _walk(node):
+    yield node
+    if isinstance(node, UnaryOp):
+        yield from _walk(node.operand)
+    elif isinstance(node, BinOp):
+        yield from _walk(node.left)
+        yield from _walk(node.right)
+    elif isinstance(node, Call):
+        for a in node.args:
+            yield from _walk(a)
+
+
+def estimate(ast: Node, T: int, S: int, workers: int = 1,
+             warm: bool = False) -> Tuple[Dict[str, float], Dict[str, int], Dict[str, str], int]:
+    """
+    Per-engine (seconds, bytes, unsupported reasons) and the node count. `warm`:
+    the sharded loop's worker pool is already up for these fields.
+    """
+    cells = T * S
+    vec_s = loop_s = 0.0
+    # intermediates are freed after their last use: the widest point of the
+    # schedule plus one kernel output, not one panel per node
+    shapes = infer(ast)
+    steps, last = schedule(ast, shapes)
+    vec_panels = 1 + peak_live(steps, last, skip={s.key for s in steps if isinstance(s.node, Name)})
+    nodes = 0
+    unsupported: Dict[str, str] = {}
+    for n in _walk(ast):
+        if isinstance(n, (Number, Name)) or shapes.const(n) is not None:
+            continue
+        nodes += 1
+        if not isinstance(n, Call):
+            vec_ns, loop_us = _OP_COST
+            window = 1
+        else:
+            spec = REGISTRY[n.name.lower()]
+            vec_ns, loop_us = _FN_COST.get(spec.name, _KIND_COST.get(spec.kind, _KIND_COST["ts"]))
+            w = spec.window_arg
+            folded = shapes.const(n.args[w]) if w is not None and len(n.args) > w else None
+            window = int(folded) if folded is not None else 1
+            if spec.stateful:
+                window = T
+                unsupported.setdefault("loop", f"'{spec.name}' depends on the whole history")
+            if spec.panel is None:
+                unsupported.setdefault("vectorized", f"'{spec.name}' has no vectorized kernel")
+            if spec.kind == "ts" and any(not isinstance(a, Name) and shapes.const(a) is None for a in n.args):
+                # the per-date engine reads ts windows straight from raw fields
+                unsupported.setdefault("loop", f"'{spec.name}' is applied to a computed expression")
+            vec_panels += _MOMENT_PANELS.get(spec.name, 0)
+        vec_s += _VEC_NODE_US * 1e-6 + vec_ns * 1e-9 * cells
+        loop_s += T * (loop_us * 1e-6 + _LOOP_WINDOW_NS * 1e-9 * S * window)
+    loop_s += T * _LOOP_DATE_US * 1e-6
+    if workers > 1:
+        loop_s = loop_s / workers + (0.0 if warm else _POOL_START_S)
+    seconds = {"vectorized": vec_s, "loop": loop_s}
+    nbytes = {"vectorized": vec_panels * cells * 8, "loop": 3 * cells * 8}
+    return seconds, nbytes, unsupported, nodes
+
+
+def plan(alpha, fields: Dict[str, pd.DataFrame], budget: Optional[Budget] = None,
+         engine: Optional[str] = None) -> Plan:
+    """
+    Validate `alpha` (source or AST) against the registry and `fields`, estimate
+    each engine and choose one. `engine` forces a choice. Raises PlanError for
+    invalid alphas and BudgetExceeded when no supporting engine fits `budget`.
+    """
+    try:
+        ast = parse_alpha(alpha) if isinstance(alpha, str) else alpha
+    except Exception as e:
+        raise PlanError(str(e)) from e
+    try:
+        infer(ast)
+    except ShapeError as e:
+        raise PlanError(str(e)) from e
+    an = analyze(ast)
+    missing = sorted(an.fields - set(fields))
+    if missing:
+        raise PlanError(f"Unknown field(s): {', '.join(missing)}")
+
+    base = next(iter(fields.values()))
+    T, S = base.shape
+    workers = effective_workers(T)
+    seconds, nbytes, unsupported, nodes = estimate(ast, T, S, workers,
+                                                   workers > 1 and pool_warm(fields, workers))
+    p = Plan(engine="", dates=T, symbols=S, nodes=nodes, lookback=an.lookback, workers=workers,
+             seconds=seconds, bytes=nbytes, unsupported=unsupported)
+
+    if engine is not None:
+        if engine not in ENGINES:
+            raise PlanError(f"Unknown engine '{engine}' (expected one of {ENGINES})")
+        if engine in unsupported:
+            raise PlanError(f"{engine} engine cannot evaluate this alpha: {unsupported[engine]}")
+        candidates = [engine]
+    else:
+        candidates = sorted((e for e in ENGINES if e not in unsupported), key=seconds.get)
+        if not candidates:
+            raise PlanError("No engine supports this alpha: " +
+                            "; ".join(f"{e}: {r}" for e, r in unsupported.items()))
+
+    budget = budget or Budget()
+    reasons = []
+    for e in candidates:
+        why = budget.check(seconds[e], nbytes[e])
+        if why is None:
+            p.engine = e
+            return p
+        reasons.append(f"{e}: {why}")
+    raise BudgetExceeded(f"Alpha would exceed the evaluation budget ({'; '.join(reasons)})")
+
+
+def evaluate(alpha: str, fields: Dict[str, pd.DataFrame], budget: Optional[Budget] = None,
+             engine: Optional[str] = None, cache: Optional[dict] = None,
+             checkpoint: Optional[Callable[[], None]] = None) -> Tuple[pd.DataFrame, Plan]:
+    """
+    Plan and run `alpha`; the time budget is enforced while it runs. A
+    `checkpoint` of the caller's (e.g. cancellation) is called along with it.
+    """
+    budget = budget or Budget.from_env()
+    p = plan(alpha, fields, budget, engine)
+    deadline = None if budget.seconds is None else time.perf_counter() + budget.seconds
+    outer = checkpoint
+
+    def checkpoint():
+        if outer is not None:
+            outer()
+        if deadline is not None and time.perf_counter() > deadline:
+            raise BudgetExceeded(f"Evaluation exceeded the {budget.seconds:g}s budget "
+                                 f"({p.engine} engine)")
+
+    if p.engine == "vectorized":
+        from engine.vectorized import evaluate_series_vectorized
+        stats: dict = {}
+        df = evaluate_series_vectorized(alpha, fields, cache=cache, checkpoint=checkpoint, stats=stats)
+        p.peak_bytes = stats["peak_bytes"]
+        return df, p
+    from engine.backtest_loop import evaluate_series
+    return evaluate_series(alpha, fields, checkpoint=checkpoint, workers=p.workers), p
@@ -0,0 +1,153 @@
+import time
+from typing import Dict, List, Optional, Sequence
+import numpy as np
+import pandas as pd
+from engine.liveness import SharedCache
+from engine.planner import Budget, BudgetExceeded, evaluate
+from engine.backtest import weights_from_array, cs_corr, TRADING_DAYS
+
+NORMALIZERS = ("zscore", "rank", "none")
+RULES = ("equal", "inverse_vol")
+
+
+def stack_signals(sigs: Sequence[pd.DataFrame], index: pd.Index, columns: pd.Index) -> np.ndarray:
+    """Align K (dates×symbols) signals into one (K, dates, symbols) array."""
+    return np.stack([s.reindex(index=index, columns=columns).to_numpy(dtype=float) for s in sigs])
+
+
+def normalize_stack(S: np.ndarray, how: str = "zscore") -> np.ndarray:
+    """Cross-sectional normalization of every (alpha, date) row at once."""
+    if how == "none":
+        return S
+    if how == "zscore":
+        n = (~np.isnan(S)).sum(axis=-1, keepdims=True)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            d = S - np.nansum(S, axis=-1, keepdims=True) / n
+            sd = np.sqrt(np.nansum(d * d, axis=-1, keepdims=True) / (n - 1))
+            return d / np.where(sd > 0, sd, np.nan)
+    if how == "rank":
+        flat = pd.DataFrame(S.reshape(-1, S.shape[-1]))
+        return flat.rank(axis=1, pct=True).to_numpy().reshape(S.shape)
+    raise ValueError(f"Unknown normalization '{how}' (expected one of {NORMALIZERS})")
+
+
+def backtest_stack(S: np.ndarray, R: np.ndarray, top_q: float = 0.2, bot_q: float = 0.2,
+                   cost_bps: float = 0.0, neutralize: bool = True) -> Dict[str, np.ndarray]:
+    """
+    engine.backtest.run_backtest for a whole (K, dates, symbols) stack in one
+    vectorized pass. R is the (dates, symbols) return panel.
+    Returns weights (K,T,S) and turnover/pnl/equity (K,T).
+    """
+    W = weights_from_array(S, top_q, bot_q, neutralize)
+    turnover = np.zeros(W.shape[:2])
+    turnover[:, 1:] = np.abs(np.diff(W, axis=1)).sum(axis=-1)
+    pnl = np.nansum(W * R[None], axis=-1) - (cost_bps / 1e4) * turnover
+    equity = np.cumprod(1.0 + pnl, axis=1)
+    return {"weights": W, "turnover": turnover, "pnl": pnl, "equity": equity}
+
+
+def stack_summary(bt: Dict[str, np.ndarray], S: Optional[np.ndarray] = None,
+                  R: Optional[np.ndarray] = None) -> Dict[str, np.ndarray]:
+    """engine.backtest.summarize per row of a stacked backtest."""
+    pnl = bt["pnl"]
+    sd = pnl.std(axis=1, ddof=1) if pnl.shape[1] > 1 else np.full(pnl.shape[0], np.nan)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        sharpe = np.where(sd > 0, pnl.mean(axis=1) / sd * np.sqrt(TRADING_DAYS), np.nan)
+    out = {
+        "sharpe": sharpe,
+        "ann_return": pnl.mean(axis=1) * TRADING_DAYS,
+        "turnover": bt["turnover"].mean(axis=1),
+        "final_equity": bt["equity"][:, -1] if pnl.shape[1] else np.full(pnl.shape[0], np.nan),
+    }
+    if S is not None and R is not None:
+        fwd = np.full_like(R, np.nan)
+        fwd[:-1] = R[1:]
+        ic = cs_corr(S, fwd[None])
+        n = (~np.isnan(ic)).sum(axis=1)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            out["ic"] = np.where(n > 0, np.nansum(ic, axis=1) / n, np.nan)
+    return out
+
+
+def blend_weights(K: int, T: int, weights: Optional[Sequence[float]] = None, rule: str = "equal",
+                  pnl: Optional[np.ndarray] = None, lookback: int = 60) -> np.ndarray:
+    """
+    Per-date combination weights (T, K), rows summing to 1 in absolute value.
+    Fixed `weights` take precedence over `rule`:
+      equal        1/K each date
+      inverse_vol  proportional to 1 / trailing std of each alpha's pnl over
+                   `lookback` days, known before the date (equal until then)
+    """
+    if weights is not None:
+        w = np.asarray(weights, dtype=float)
+        if w.shape != (K,):
+            raise ValueError(f"Expected {K} combination weights, got {w.size}")
+        l1 = np.abs(w).sum()
+        return np.tile(w / (l1 if l1 > 0 else 1.0), (T, 1))
+    if rule == "equal":
+        return np.full((T, K), 1.0 / K)
+    if rule == "inverse_vol":
+        vol = pd.DataFrame(pnl.T).rolling(lookback, min_periods=2).std(ddof=1).shift(1).to_numpy()
+        with np.errstate(divide="ignore", invalid="ignore"):
+            inv = np.where(vol > 0, 1.0 / vol, np.nan)
+        inv = np.where(np.isnan(inv).any(axis=1, keepdims=True), 1.0, inv)
+        return inv / inv.sum(axis=1, keepdims=True)
+    raise ValueError(f"Unknown combination rule '{rule}' (expected one of {RULES})")
+
+
+def run_portfolio(alphas: List[str], fields: Dict[str, pd.DataFrame],
+                  weights: Optional[Sequence[float]] = None, rule: str = "equal",
+                  normalize: str = "zscore", lookback: int = 60,
+                  top_q: float = 0.2, bot_q: float = 0.2, cost_bps: float = 0.0,
+                  neutralize: bool = True, budget: Optional[Budget] = None) -> dict:
+    """
+    Backtest N alphas and their blend. Signals are stacked into one
+    (alpha, date, symbol) array and normalized, weighted, costed and
+    P&L'd together; the blend is the weighted sum of normalized signals.
+    Alphas are planned and evaluated within one `budget` (default
+    Budget.from_env()) for all of them.
+    """
+    if not alphas:
+        raise ValueError("No alphas given")
+    budget = budget or Budget.from_env()
+    t0 = time.perf_counter()
+    cache = SharedCache(alphas)   # only subexpressions several alphas contain
+    sigs = []
+    for i, a in enumerate(alphas):
+        try:
+            sigs.append(evaluate(a, fields, budget.remaining(t0), cache=cache)[0])
+        except BudgetExceeded:
+            raise
+        except Exception as e:
+            raise ValueError(f"alpha[{i}] '{a}': {e}") from e
+        cache.done(a)
+
+    rets = fields["returns"]
+    index, columns = sigs[0].index, sigs[0].columns
+    R = rets.reindex(index=index, columns=columns).to_numpy(dtype=float)
+    Z = normalize_stack(stack_signals(sigs, index, columns), normalize)
+    K, T, _ = Z.shape
+
+    bt = backtest_stack(Z, R, top_q, bot_q, cost_bps, neutralize)
+    per_alpha = stack_summary(bt, Z, R)
+
+    Wc = blend_weights(K, T, weights, rule, pnl=bt["pnl"], lookback=lookback)
+    contrib = np.where(np.isnan(Z), 0.0, Z) * Wc.T[:, :, None]
+    blend = np.where(np.isnan(Z).all(axis=0), np.nan, contrib.sum(axis=0))[None]
+    bt_b = backtest_stack(blend, R, top_q, bot_q, cost_bps, neutralize)
+    blend_stats = stack_summary(bt_b, blend, R)
+
+    def _f(x):
+        x = float(x)
+        return x if np.isfinite(x) else None
+
+    return {
+        "dates": index.strftime("%Y-%m-%d").tolist(),
+        "alphas": [dict({"alpha": a}, **{k: _f(v[i]) for k, v in per_alpha.items()})
+                   for i, a in enumerate(alphas)],
+        "blend": dict({k: _f(v[0]) for k, v in blend_stats.items()},
+                      equity=bt_b["equity"][0].tolist(),
+                      pnl=bt_b["pnl"][0].tolist(),
+                      turnover=bt_b["turnover"][0].tolist(),
+                      weights=Wc[-1].tolist()),
+    }
@@ -0,0 +1,250 @@
+"""
+Signal cache that survives data appends.
+
+Each entry keeps the signal, the alpha's lookback (dsl.analyzer) and a
+fingerprint of the inputs it was computed from: one hash per block of BLOCK
+rows over the dates and the fields the alpha reads. When the data changes
+(a new day appended under data/), an entry is checked block by block:
+
+    same rows, same hashes     reused as is
+    new rows, same hashes      extended: only the new rows are evaluated, on a
+                               trailing slice of lookback + new rows, and
+                               appended to the stored signal
+    a stored block differs     recomputed in full (history was revised)
+
+Alphas with stateful functions (unbounded lookback) are recomputed. Block
+hashes are memoized per field and per loaded fields dict, so checking many
+entries hashes each panel once; the evaluation work of a refresh then scales
+with the new rows, not the history.
+
+With a root directory, entries persist as engine.export directories plus a
+cache.json holding the fingerprint, and extensions append to the files.
+Requests for the same alpha are serialized (a lock per alpha id, striped),
+so the second one reuses what the first stored instead of racing its writes:
+
+    python -m engine.signal_cache --root cache/signals --alphas alphas.txt
+"""
+import hashlib
+import json
+import os
+import shutil
+import threading
+from collections import Counter, OrderedDict
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+import numpy as np
+import pandas as pd
+from engine import export
+
+BLOCK = 256
+VERSION = 1
+ALPHA_LOCKS = 64
+
+
+def block_ends(n: int) -> List[int]:
+    """Row counts at which fingerprint blocks end: every BLOCK rows, and n."""
+    return list(range(BLOCK, n, BLOCK)) + [n] if n else []
+
+
+class Inputs:
+    """One loaded fields dict: memoized block hashes and trailing slices."""
+
+    def __init__(self, fields: Dict[str, pd.DataFrame]):
+        self.fields = fields
+        self.index = next(iter(fields.values())).index
+        self._stamps = self.index.as_unit("ns").asi8
+        self._hashes: Dict[tuple, bytes] = {}
+        self._tails: Dict[int, dict] = {}
+
+    def _hash(self, name: Optional[str], lo: int, hi: int) -> bytes:
+        key = (name, lo, hi)
+        h = self._hashes.get(key)
+        if h is None:
+            d = hashlib.blake2b(digest_size=16)
+            if name is None:
+                d.update(self._stamps[lo:hi].tobytes())
+            else:
+                f = self.fields[name]
+                d.update(json.dumps([str(c) for c in f.columns]).encode())
+                d.update(np.ascontiguousarray(f.iloc[lo:hi].to_numpy(dtype=float)).tobytes())
+            h = self._hashes[key] = d.digest()
+        return h
+
+    def block(self, names: Iterable[str], lo: int, hi: int) -> str:
+        """Hash of rows [lo, hi) of the dates and of each named field."""
+        d = hashlib.blake2b(digest_size=16)
+        for name in (None, *names):
+            d.update(self._hash(name, lo, hi))
+        return d.hexdigest()
+
+    def blocks(self, names: Iterable[str]) -> List[list]:
+        out, lo = [], 0
+        for hi in block_ends(len(self.index)):
+            out.append([hi, self.block(names, lo, hi)])
+            lo = hi
+        return out
+
+    def unchanged(self, names: Iterable[str], blocks: List[list]) -> bool:
+        """True when the stored blocks hash the same over the current rows."""
+        lo = 0
+        for hi, h in blocks:
+            if hi > len(self.index) or self.block(names, lo, hi) != h:
+                return False
+            lo = hi
+        return True
+
+    def tail(self, first: int) -> Dict[str, pd.DataFrame]:
+        if first not in self._tails:
+            self._tails[first] = {k: f.iloc[first:] for k, f in self.fields.items()} if first else self.fields
+        return self._tails[first]
+
+
+def _planned(alpha: str, fields: Dict[str, pd.DataFrame]) -> pd.DataFrame:
+    from engine.planner import evaluate
+    return evaluate(alpha, fields)[0]
+
+
+class SignalCache:
+    """
+    alpha -> signal over the current fields, kept up to date across data
+    appends (see the module docstring). At most `max_entries` signals are
+    held in memory; with `root` every entry is also stored on disk.
+    """
+
+    def __init__(self, root: Optional[str] = None, max_entries: int = 64,
+                 evaluate: Callable[[str, Dict[str, pd.DataFrame]], pd.DataFrame] = _planned):
+        self.root = root
+        self.max_entries = max_entries
+        self.evaluate = evaluate
+        self.counts = Counter()   # how entries were served: computed, reused, extended, recomputed
+        self._mem: "OrderedDict[str, dict]" = OrderedDict()
+        self._inputs: Optional[Inputs] = None
+        self._lock = threading.Lock()
+        # one alpha is checked, evaluated and stored by one request at a time
+        self._alpha_locks = [threading.Lock() for _ in range(ALPHA_LOCKS)]
+
+    def inputs(self, fields: Dict[str, pd.DataFrame]) -> Inputs:
+        with self._lock:
+            if self._inputs is None or self._inputs.fields is not fields:
+                self._inputs = Inputs(fields)
+            return self._inputs
+
+    def get(self, alpha: str, fields: Dict[str, pd.DataFrame]) -> pd.DataFrame:
+        return self.update(alpha, fields)[0]
+
+    def update(self, alpha: str, fields: Dict[str, pd.DataFrame]) -> Tuple[pd.DataFrame, str]:
+        """(signal over `fields`, how it was obtained)."""
+        lock = self._alpha_locks[int(export.alpha_id(alpha), 16) % ALPHA_LOCKS]
+        with lock:
+            return self._update(alpha, fields)
+
+    def _update(self, alpha: str, fields: Dict[str, pd.DataFrame]) -> Tuple[pd.DataFrame, str]:
+        from dsl.parser import parse_alpha
+        from dsl.analyzer import analyze
+        from dsl.registry import UNBOUNDED
+        inp = self.inputs(fields)
+        with self._lock:
+            entry = self._mem.get(alpha)
+        if entry is None and self.root is not None:
+            entry = self._load(alpha)
+        an = analyze(parse_alpha(alpha))
+        names = sorted(an.fields & set(fields))
+        n = len(inp.index)
+        how, new = "computed", None
+        if entry is not None:
+            if entry["fields"] != names or not inp.unchanged(names, entry["blocks"]):
+                how = "recomputed"
+            elif entry["rows"] == n:
+                how = "reused"
+            elif an.lookback < UNBOUNDED and entry["rows"] > an.lookback:
+                how = "extended"
+            else:
+                how = "recomputed"
+        if how == "reused":
+            sig = entry["sig"]
+        elif how == "extended":
+            added = n - entry["rows"]
+            tail = self.evaluate(alpha, inp.tail(entry["rows"] - an.lookback))
+            new = tail.iloc[-added:]
+            sig = pd.concat([entry["sig"], new.set_axis(entry["sig"].columns, axis=1)])
+        else:
+            sig = self.evaluate(alpha, fields)
+        if how != "reused":
+            entry = {"alpha": alpha, "lookback": an.lookback, "fields": names, "rows": n,
+                     "blocks": inp.blocks(names), "sig": sig}
+            if self.root is not None:
+                self._store(entry, new)
+        self._remember(alpha, entry)
+        self.counts[how] += 1
+        return sig, how
+
+    def refresh(self, alphas: Iterable[str], fields: Dict[str, pd.DataFrame]) -> List[dict]:
+        """Bring every alpha up to date with `fields`; one row per alpha."""
+        out = []
+        for a in alphas:
+            sig, how = self.update(a, fields)
+            out.append({"alpha": a, "id": export.alpha_id(a), "how": how, "rows": len(sig)})
+        return out
+
+    def clear(self):
+        with self._lock:
+            self._mem.clear()
+            self._inputs = None
+
+    def _remember(self, alpha: str, entry: dict):
+        with self._lock:
+            self._mem[alpha] = entry
+            self._mem.move_to_end(alpha)
+            while len(self._mem) > self.max_entries:
+                self._mem.popitem(last=False)
+
+    # -- on disk: an engine.export directory plus cache.json ---------------------
+
+    def _load(self, alpha: str) -> Optional[dict]:
+        path = export.alpha_dir(self.root, alpha)
+        m = export.read_manifest(self.root, alpha)
+        try:
+            with open(os.path.join(path, "cache.json")) as f:
+                meta = json.load(f)
+        except (OSError, ValueError):
+            return None
+        # the signal files are appended before cache.json: a crash in between leaves them longer
+        if m is None or meta.get("version") != VERSION or \
+                meta["rows"] != sum(p["rows"] for p in m["partitions"]):
+            return None
+        return dict(meta, sig=export.read_signal(self.root, alpha))
+
+    def _store(self, entry: dict, new: Optional[pd.DataFrame]):
+        path = export.alpha_dir(self.root, entry["alpha"])
+        if new is None:
+            shutil.rmtree(path, ignore_errors=True)
+            export.append_signal(self.root, entry["alpha"], entry["sig"])
+        else:
+            export.append_signal(self.root, entry["alpha"], new)
+        meta = {k: v for k, v in entry.items() if k != "sig"}
+        tmp = os.path.join(path, "cache.json.tmp")
+        with open(tmp, "w") as f:
+            json.dump(dict(meta, version=VERSION), f)
+        os.replace(tmp, os.path.join(path, "cache.json"))
+
+
+if __name__ == "__main__":
+    import argparse
+    import time
+    from engine.snapshot import DATA_DIR, load_csv_fields
+    ap = argparse.ArgumentParser(description="Refresh stored signals, evaluating only new dates where possible")
+    ap.add_argument("--root", required=True)
+    ap.add_argument("--data", default=DATA_DIR)
+    ap.add_argument("--alpha", action="append", default=[], help="alpha to refresh (repeatable)")
+    ap.add_argument("--alphas", help="file with one alpha per line")
+    args = ap.parse_args()
+    alphas = list(args.alpha)
+    if args.alphas:
+        with open(args.alphas) as f:
+            alphas += [ln.strip() for ln in f if ln.strip() and not ln.startswith("#")]
+    fields = load_csv_fields(args.data)
+    cache = SignalCache(args.root)
+    t0 = time.perf_counter()
+    for r in cache.refresh(alphas, fields):
+        print(f"{r['id']}  {r['how']:10s} {r['rows']:>7d}  {r['alpha']}")
+    print(", ".join(f"{k} {v}" for k, v in sorted(cache.counts.items())) +
+          f" in {time.perf_counter() - t0:.1f}s")
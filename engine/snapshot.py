@@ -0,0 +1,137 @@
+"""
+Warm-start snapshot: the CSV fields and a few popular signals as raw .npy
+arrays plus a JSON manifest, memory-mapped on load instead of parsed.
+
+    python -m engine.snapshot                 # data/ -> data/snapshot/
+    python -m engine.snapshot --alpha "rank(ts_mean(returns,5))" ...
+
+The manifest records each source CSV's size and mtime; a snapshot whose
+sources changed is ignored and the CSVs are read instead.
+"""
+import hashlib
+import json
+import os
+from typing import Dict, Iterable, Optional, Tuple
+import numpy as np
+import pandas as pd
+
+DATA_DIR = os.environ.get("DSL_DATA_DIR", os.path.normpath(os.path.join(os.path.dirname(__file__), "..", "data")))
+SNAPSHOT_DIR = os.environ.get("DSL_SNAPSHOT_DIR", os.path.join(DATA_DIR, "snapshot"))
+FIELDS = ("returns", "close", "volume")
+# the playground's default alpha and the README examples
+POPULAR_ALPHAS = (
+    "rank(ts_mean(returns,5) - ts_mean(returns,20))",
+    "rank(ts_mean(returns,5))",
+    "ts_corr(close, volume, 20)",
+)
+VERSION = 1
+
+
+def csv_path(name: str, data_dir: str = DATA_DIR) -> str:
+    return os.path.join(data_dir, f"{name}.csv")
+
+
+def source_stamp(path: str) -> list:
+    st = os.stat(path)
+    return [st.st_size, st.st_mtime_ns]
+
+
+def _signal_file(alpha: str) -> str:
+    return "sig_" + hashlib.blake2b(alpha.encode(), digest_size=10).hexdigest() + ".npy"
+
+
+def write_snapshot(fields: Dict[str, pd.DataFrame], path: str = SNAPSHOT_DIR,
+                   signals: Optional[Dict[str, pd.DataFrame]] = None,
+                   sources: Optional[Dict[str, str]] = None) -> dict:
+    """
+    Write fields (and optional alpha -> signal frames) under `path`. All frames
+    must share the first field's dates; columns are stored per frame.
+    `sources` maps field name -> CSV path for staleness checks.
+    """
+    os.makedirs(path, exist_ok=True)
+    first = next(iter(fields.values()))
+    np.save(os.path.join(path, "dates.npy"), first.index.to_numpy())
+    manifest = {"version": VERSION, "index_name": first.index.name, "fields": {}, "signals": {},
+                "sources": {k: source_stamp(p) for k, p in (sources or {}).items()}}
+
+    def put(fname, df):
+        if not df.index.equals(first.index):
+            raise ValueError(f"'{fname}' is not aligned to the snapshot dates")
+        np.save(os.path.join(path, fname), np.ascontiguousarray(df.to_numpy()))
+        return {"file": fname, "columns": [str(c) for c in df.columns]}
+
+    for name, df in fields.items():
+        manifest["fields"][name] = put(f"{name}.npy", df)
+    for alpha, df in (signals or {}).items():
+        manifest["signals"][alpha] = put(_signal_file(alpha), df)
+
+    # manifest last: a half-written snapshot has none and is ignored
+    tmp = os.path.join(path, "manifest.json.tmp")
+    with open(tmp, "w") as f:
+        json.dump(manifest, f, indent=1)
+    os.replace(tmp, os.path.join(path, "manifest.json"))
+    return manifest
+
+
+def read_manifest(path: str = SNAPSHOT_DIR) -> Optional[dict]:
+    try:
+        with open(os.path.join(path, "manifest.json")) as f:
+            m = json.load(f)
+    except (OSError, ValueError):
+        return None
+    return m if m.get("version") == VERSION else None
+
+
+def is_fresh(manifest: dict, sources: Dict[str, str]) -> bool:
+    """True when every source file still has the size and mtime it was snapshotted with."""
+    stamps = manifest.get("sources", {})
+    try:
+        return all(stamps.get(k) == source_stamp(p) for k, p in sources.items())
+    except OSError:
+        return False
+
+
+def read_snapshot(path: str = SNAPSHOT_DIR, manifest: Optional[dict] = None,
+                  mmap: bool = True) -> Tuple[Dict[str, pd.DataFrame], Dict[str, pd.DataFrame]]:
+    """Load (fields, signals) from a snapshot; arrays are memory-mapped read-only."""
+    manifest = manifest or read_manifest(path)
+    if manifest is None:
+        raise FileNotFoundError(f"No snapshot at {path}")
+    index = pd.DatetimeIndex(np.load(os.path.join(path, "dates.npy")), name=manifest["index_name"])
+    mode = "r" if mmap else None
+
+    def get(entry):
+        arr = np.load(os.path.join(path, entry["file"]), mmap_mode=mode)
+        return pd.DataFrame(arr, index=index, columns=entry["columns"], copy=False)
+
+    fields = {k: get(e) for k, e in manifest["fields"].items()}
+    signals = {k: get(e) for k, e in manifest["signals"].items()}
+    return fields, signals
+
+
+def load_csv_fields(data_dir: str = DATA_DIR, names: Iterable[str] = FIELDS) -> Dict[str, pd.DataFrame]:
+    return {n: pd.read_csv(csv_path(n, data_dir), index_col=0, parse_dates=True) for n in names}
+
+
+def build(data_dir: str = DATA_DIR, path: str = SNAPSHOT_DIR,
+          alphas: Iterable[str] = POPULAR_ALPHAS) -> dict:
+    """Read the CSVs, evaluate `alphas` and write a snapshot of both."""
+    from engine.vectorized import evaluate_series_vectorized
+    fields = load_csv_fields(data_dir)
+    signals = {}
+    for a in alphas:
+        sig = evaluate_series_vectorized(a, fields)
+        signals[a] = sig.reindex(index=next(iter(fields.values())).index)
+    return write_snapshot(fields, path, signals, {n: csv_path(n, data_dir) for n in fields})
+
+
+if __name__ == "__main__":
+    import argparse
+    ap = argparse.ArgumentParser(description="Build the warm-start snapshot")
+    ap.add_argument("--data", default=DATA_DIR)
+    ap.add_argument("--out", default=None)
+    ap.add_argument("--alpha", action="append", help="signal to precompute (repeatable)")
+    args = ap.parse_args()
+    out = args.out or (SNAPSHOT_DIR if args.data == DATA_DIR else os.path.join(args.data, "snapshot"))
+    m = build(args.data, out, args.alpha or POPULAR_ALPHAS)
+    print(f"snapshot: {out} ({len(m['fields'])} fields, {len(m['signals'])} signals)")
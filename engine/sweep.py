@@ -0,0 +1,64 @@
+import time
+from typing import Dict, Optional
+import pandas as pd
+from dsl.parser import expand_template, parse_alpha
+from dsl.analyzer import analyze
+from engine.liveness import SharedCache
+from engine.planner import Budget, BudgetExceeded, evaluate
+from engine.backtest import run_backtest, summarize, json_number
+from engine.moments import STORE
+
+MAX_COMBOS = 2000
+
+
+def run_sweep(template: str, fields: Dict[str, pd.DataFrame], grid: Optional[dict] = None,
+              top_q: float = 0.2, bot_q: float = 0.2, cost_bps: float = 0.0,
+              neutralize: bool = True, max_combos: int = MAX_COMBOS,
+              budget: Optional[Budget] = None) -> dict:
+    """
+    Evaluate and backtest every expansion of an alpha template in one job.
+
+    Subexpressions that several variants contain, such as ts_mean(returns,10),
+    are computed once and held until the last of those variants is done
+    (engine.liveness.SharedCache); the rest are released as they die. The
+    rolling-moment store is prewarmed for every window in the grid.
+    Returns a compact summary per combination instead of full matrices.
+
+    Variants go through the planner; `budget` (default Budget.from_env())
+    is for the whole sweep, and BudgetExceeded is raised once it is spent.
+    Invalid variants are reported per combination.
+    """
+    combos = expand_template(template, grid, max_combos)
+
+    budget = budget or Budget.from_env()
+    t0 = time.perf_counter()
+    analyses = []
+    for _, src in combos:
+        try:
+            analyses.append(analyze(parse_alpha(src)))
+        except Exception:
+            pass   # reported per combination below
+    STORE.prewarm(fields, analyses)
+    rets = fields["returns"]
+    cache = SharedCache(src for _, src in combos)
+    results = []
+    for params, src in combos:
+        row = {"params": params, "alpha": src}
+        try:
+            sig, _ = evaluate(src, fields, budget.remaining(t0), cache=cache)
+            bt = run_backtest(sig, rets, top_q, bot_q, cost_bps, neutralize)
+            row.update({k: json_number(v) for k, v in summarize(bt, sig, rets).items()})
+        except BudgetExceeded:
+            raise
+        except Exception as e:
+            row["error"] = str(e)
+        cache.done(src)
+        results.append(row)
+
+    return {
+        "template": template,
+        "combinations": len(combos),
+        "shared_subexpressions": len(cache.keep),
+        "seconds": time.perf_counter() - t0,
+        "results": results,
+    }
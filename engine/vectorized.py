@@ -1,7 +1,15 @@
+import sys
 import pandas as pd
 import numpy as np
-from typing import Dict
+from collections import deque
+from typing import Callable, Dict, Optional
 from dsl.parser import parse_alpha, Number, Name, UnaryOp, BinOp, Call
+from dsl.registry import get_fn, check_arity, register_panel
+from dsl.shapes import infer
+import dsl.functions  # noqa: F401  (specs must exist before panels attach)
+from dsl.functions.stateful import trade_when_scan, backfill_scan, hump_scan
+from engine.liveness import schedule, BufferPool, nbytes, float_values, children
+from engine.moments import STORE, rolling_comoments, co_var, co_cov, co_corr, co_beta
 
 _BIN = {
     '+': lambda a,b: a + b,
@@ -42,16 +50,14 @@ def _align(a, b):
     return a, b
 
 def _decay_linear(df: pd.DataFrame, n: int):
-    base_w = np.arange(1, n+1, dtype=float)
-    base_w /= base_w.sum()
-
     def wdot(x):
         arr = np.asarray(x, dtype=float)
         m = len(arr)
 
-        # Trim to current window length, then normalize to sum=1 for this length
-        w = base_w[-m:]
-        w = w / w.sum()
+        # Weights 1..m for the current (possibly reduced) window, normalized to
+        # sum=1 -- the slow engine's np.arange(1, len(window)+1).
+        w = np.arange(1, m+1, dtype=float)
+        w /= w.sum()
 
         # Match pandas .sum(skipna=True): NaNs contribute 0, and we DO NOT
         # re-normalize weights after dropping NaNs.
@@ -84,93 +90,356 @@ def _ts_rank_last(df: pd.DataFrame, n: int) -> pd.DataFrame:
         )
     return df.apply(rank_last)
 
+def _comoments(x: pd.DataFrame, y, n: int):
+    # one fused, numerically stable pass (see engine.moments.rolling_comoments)
+    if y is not None:
+        x, y = x.align(y, join='inner')
+    co = rolling_comoments(x.to_numpy(dtype=float),
+                           None if y is None else y.to_numpy(dtype=float), n)
+    return x, co
+
+def _frame_like(df: pd.DataFrame, arr: np.ndarray) -> pd.DataFrame:
+    return pd.DataFrame(arr, index=df.index, columns=df.columns)
+
+# Rolling moments: raw fields are served from the shared store
+# (engine.moments.STORE); intermediates go through the fused kernel directly.
+# Only fields read directly by these kernels are fingerprinted for the store.
+_STORE_KERNELS = {"ts_mean", "ts_sum", "ts_std", "ts_zscore", "ts_corr", "ts_cov", "ts_beta"}
+
+def _ts_mean(x: pd.DataFrame, n: int) -> pd.DataFrame:
+    if STORE.tracked(x): return STORE.mean(x, n)
+    return x.rolling(n, min_periods=1).mean()
+
+def _ts_sum(x: pd.DataFrame, n: int) -> pd.DataFrame:
+    if STORE.tracked(x): return STORE.sum(x, n)
+    return x.rolling(n, min_periods=1).sum()
+
+def _ts_std(x: pd.DataFrame, n: int) -> pd.DataFrame:
+    if STORE.tracked(x): return STORE.std(x, n)
+    x, co = _comoments(x, None, n)
+    return _frame_like(x, np.sqrt(co_var(co)))
+
+def _ts_zscore(x: pd.DataFrame, n: int) -> pd.DataFrame:
+    if STORE.tracked(x): return STORE.zscore(x, n)
+    x, co = _comoments(x, None, n)
+    sd = np.sqrt(co_var(co))
+    return _frame_like(x, (x.to_numpy(dtype=float) - co["mx"]) / np.where(sd > 0, sd, np.nan))
+
 def _ts_corr(x: pd.DataFrame, y: pd.DataFrame, n: int) -> pd.DataFrame:
-    x, y = x.align(y, join='inner')
-    win = n
-
-    Sx  = x.rolling(win, min_periods=2).sum()
-    Sy  = y.rolling(win, min_periods=2).sum()
-    Sxy = (x*y).rolling(win, min_periods=2).sum()
-    Sxx = (x*x).rolling(win, min_periods=2).sum()
-    Syy = (y*y).rolling(win, min_periods=2).sum()
-    m   = x.rolling(win, min_periods=2).count()
-
-    cov_num = Sxy - (Sx*Sy)/m
-    varx    = Sxx - (Sx*Sx)/m
-    vary    = Syy - (Sy*Sy)/m
-    denom   = (varx * vary).where((varx>0) & (vary>0))
-    corr    = cov_num / np.sqrt(denom)
-    return corr
-
-def evaluate_series_vectorized(alpha_src: str, fields: Dict[str, pd.DataFrame]) -> pd.DataFrame:
+    if STORE.tracked(x) and STORE.tracked(y):
+        return STORE.corr(x, y, n)
+    x, co = _comoments(x, y, n)
+    return _frame_like(x, co_corr(co))
+
+def _ts_cov(x: pd.DataFrame, y: pd.DataFrame, n: int) -> pd.DataFrame:
+    if STORE.tracked(x) and STORE.tracked(y):
+        return STORE.cov(x, y, n)
+    x, co = _comoments(x, y, n)
+    return _frame_like(x, co_cov(co))
+
+def _ts_beta(x: pd.DataFrame, y: pd.DataFrame, n: int) -> pd.DataFrame:
+    if STORE.tracked(x) and STORE.tracked(y):
+        return STORE.beta(x, y, n)
+    x, co = _comoments(x, y, n)
+    return _frame_like(x, co_beta(co))
+
+def _rolling_argext(df: pd.DataFrame, n: int, largest: bool) -> pd.DataFrame:
+    """
+    Days since the rolling max/min (0 = today) via a monotonic deque per
+    column: each row is pushed and popped at most once, so O(1) amortized per
+    step regardless of n. NaNs are skipped; ties resolve to the most recent row.
     """
-    Vectorized evaluation across all dates for supported subset:
-      arithmetic/logic/comparisons, delay, ts_mean/std/sum, ts_rank, ts_corr,
-      decay_linear, rank, zscore, scale, sdiv.
-    Returns DataFrame (dates×symbols). Raises NotImplementedError for unsupported
-    functions so callers can fallback to the slow per-date engine.
+    vals = df.to_numpy(dtype=float)
+    out = np.full(vals.shape, np.nan)
+    for j in range(vals.shape[1]):
+        col = vals[:, j].tolist()
+        dq = deque()
+        for i, v in enumerate(col):
+            if v == v:  # not NaN
+                if largest:
+                    while dq and col[dq[-1]] <= v: dq.pop()
+                else:
+                    while dq and col[dq[-1]] >= v: dq.pop()
+                dq.append(i)
+            while dq and dq[0] <= i - n: dq.popleft()
+            if dq:
+                out[i, j] = i - dq[0]
+    return pd.DataFrame(out, index=df.index, columns=df.columns)
+
+def _rolling_central_sums(df: pd.DataFrame, n: int, min_periods: int):
+    """
+    Running power sums over the window, converted to central moment sums
+    (C2, C3, C4) plus the count. Data is shifted by its column mean first --
+    moments are shift-invariant and this keeps the power sums well scaled.
+    """
+    d = df - df.mean()
+    roll = lambda z: z.rolling(n, min_periods=min_periods).sum()
+    m = df.rolling(n, min_periods=min_periods).count()
+    S1, S2, S3, S4 = roll(d), roll(d**2), roll(d**3), roll(d**4)
+    mu = S1 / m
+    C2 = S2 - m * mu**2
+    C3 = S3 - 3*mu*S2 + 2*m*mu**3
+    C4 = S4 - 4*mu*S3 + 6*mu**2*S2 - 3*m*mu**4
+    return m, C2, C3, C4
+
+def _ts_skew(df: pd.DataFrame, n: int) -> pd.DataFrame:
+    # Bias-corrected G1, as DataFrame.skew() computes per window.
+    m, C2, C3, _ = _rolling_central_sums(df, n, min_periods=3)
+    out = (m * np.sqrt(m - 1) / (m - 2)) * C3 / C2**1.5
+    return out.mask(C2 <= 0, 0.0).where(m >= 3)
+
+def _ts_kurt(df: pd.DataFrame, n: int) -> pd.DataFrame:
+    # Bias-corrected excess kurtosis, as DataFrame.kurt() computes per window.
+    m, C2, _, C4 = _rolling_central_sums(df, n, min_periods=4)
+    adj = 3 * (m - 1)**2 / ((m - 2) * (m - 3))
+    out = m * (m + 1) * (m - 1) * C4 / ((m - 2) * (m - 3) * C2**2) - adj
+    return out.mask(C2 <= 0, 0.0).where(m >= 4)
+
+# ---------------------------------------------------------------------------
+# Panel implementations, attached to the registry specs by name.
+# ---------------------------------------------------------------------------
+
+# time-series
+register_panel("ts_mean")(lambda x, n: _ts_mean(x, int(n)))
+register_panel("ts_sum")(lambda x, n: _ts_sum(x, int(n)))
+register_panel("ts_std")(lambda x, n: _ts_std(x, int(n)))
+register_panel("ts_zscore")(lambda x, n: _ts_zscore(x, int(n)))
+register_panel("ts_min")(lambda x, n: x.rolling(int(n), min_periods=1).min())
+register_panel("ts_max")(lambda x, n: x.rolling(int(n), min_periods=1).max())
+register_panel("delay")(lambda x, n: x.shift(int(n)))
+register_panel("ts_delta")(lambda x, n: x - x.shift(int(n)))
+register_panel("decay_linear")(lambda x, n: _decay_linear(x, int(n)))
+register_panel("ts_rank")(lambda x, n: _ts_rank_last(x, int(n)))
+register_panel("ts_corr")(lambda x, y, n: _ts_corr(x, y, int(n)))
+register_panel("ts_cov")(lambda x, y, n: _ts_cov(x, y, int(n)))
+register_panel("ts_beta")(lambda x, y, n: _ts_beta(x, y, int(n)))
+register_panel("ts_argmin")(lambda x, n: _rolling_argext(x, int(n), largest=False))
+register_panel("ts_argmax")(lambda x, n: _rolling_argext(x, int(n), largest=True))
+register_panel("ts_skew")(lambda x, n: _ts_skew(x, int(n)))
+register_panel("ts_kurt")(lambda x, n: _ts_kurt(x, int(n)))
+
+# cross-sectional
+register_panel("rank")(_cs_rank)
+register_panel("zscore")(_cs_zscore)
+
+@register_panel("scale")
+def _panel_scale(x, a=1.0):
+    a = float(a) if not isinstance(a, (pd.DataFrame, pd.Series)) else 1.0
+    return _cs_scale(x, a=a)
+
+# safe divide
+@register_panel("sdiv")
+def _panel_sdiv(a, b):
+    a, b = _align(a, b)
+    if isinstance(a, pd.DataFrame) and isinstance(b, pd.DataFrame):
+        out = a.copy()
+        mask = (b == 0) | b.isna()
+        out[~mask] = a[~mask] / b[~mask]
+        out[mask] = 0.0
+        return out
+    return 0.0 if (isinstance(b, (int,float)) and b == 0) else a / b
+
+
+# stateful: one forward scan over the dates (dsl/functions/stateful.py)
+def _panels(*args):
+    # arrays of the args on the union of their frames' axes; scalars broadcast
+    frames = [a for a in args if isinstance(a, pd.DataFrame)]
+    index, columns = frames[0].index, frames[0].columns
+    for f in frames[1:]:
+        index, columns = index.union(f.index), columns.union(f.columns)
+    shape = (len(index), len(columns))
+    arrs = [a.reindex(index=index, columns=columns).to_numpy(dtype=float) if isinstance(a, pd.DataFrame)
+            else np.full(shape, float(a)) for a in args]
+    return arrs, index, columns
+
+@register_panel("trade_when")
+def _panel_trade_when(cond, x, exit):
+    (c, v, e), index, columns = _panels(cond, x, exit)
+    return pd.DataFrame(trade_when_scan(c, v, e), index=index, columns=columns)
+
+@register_panel("hump")
+def _panel_hump(x, h=0.01):
+    (v,), index, columns = _panels(x)
+    return pd.DataFrame(hump_scan(v, float(h)), index=index, columns=columns)
+
+@register_panel("ts_backfill")
+def _panel_ts_backfill(x, n):
+    return _frame_like(x, backfill_scan(x.to_numpy(dtype=float), int(n)))
+
+@register_panel("if_else")
+def _panel_if_else(c, a, b):
+    if not any(isinstance(v, pd.DataFrame) for v in (c, a, b)):
+        return a if (c == c and c != 0) else b
+    (c, a, b), index, columns = _panels(c, a, b)
+    return pd.DataFrame(np.where(np.nan_to_num(c) != 0, a, b), index=index, columns=columns)
+
+
+# elementwise operators that can write into a recycled buffer (NaN semantics match pandas)
+_UFUNC = {'+': np.add, '-': np.subtract, '*': np.multiply, '/': np.divide, '%': np.mod,
+          '^': np.power, '==': np.equal, '!=': np.not_equal, '>': np.greater,
+          '>=': np.greater_equal, '<': np.less, '<=': np.less_equal}
+
+
+def _operand(v, like: pd.DataFrame):
+    # float64 array (or scalar) of v on like's axes, or None when pandas must align
+    if isinstance(v, (int, float, np.floating)):
+        return v
+    if v is like or (isinstance(v, pd.DataFrame) and v.index.equals(like.index)
+                     and v.columns.equals(like.columns)):
+        return float_values(v)
+    return None
+
+
+def evaluate_series_vectorized(alpha_src: str, fields: Dict[str, pd.DataFrame],
+                               cache: Optional[dict] = None,
+                               checkpoint: Optional[Callable[[], None]] = None,
+                               stats: Optional[dict] = None) -> pd.DataFrame:
+    """
+    Vectorized evaluation across all dates. Operators are handled here; calls
+    dispatch to the registry's panel implementation (FuncSpec.panel).
+    Returns DataFrame (dates×symbols). Raises KeyError for unknown functions and
+    NotImplementedError for functions registered without a panel kernel.
+
+    `cache` (node_key -> panel) shares subexpression results across calls that
+    use the same fields, e.g. the variants of a parameter sweep. A plain dict
+    keeps every intermediate; an engine.liveness.SharedCache or CarryCache only
+    its `keep` keys, and everything else is released as without a cache. The
+    nodes under a cached result are not evaluated.
+    `checkpoint` is called before each node is computed; raising from it
+    abandons the evaluation (used to cancel superseded live edits).
+    Constant subexpressions are folded by dsl.shapes.infer before any data is
+    read, and scalar operands are broadcast by pandas, not materialized.
+
+    Nodes run in engine.liveness.schedule order. Without a plain dict `cache`, each
+    intermediate is dropped after its last use and elementwise operators on
+    aligned float panels write into recycled buffers. `stats`, if given, is
+    filled with the peak bytes of live intermediates and buffer counts.
     """
     ast = parse_alpha(alpha_src)
+    shapes = infer(ast)
+    shared = getattr(cache, "keep", None)
+    pooled = cache is None or shared is not None   # intermediates released after last use
+    # cached results are read as they are: the nodes under them are not computed
+    ready = frozenset(k for k in cache or () if shared is None or k in shared)
+    steps, last = schedule(ast, shapes, ready)
+    STORE.track({a.name: fields[a.name] for _, n in steps
+                 if isinstance(n, Call) and n.name.lower() in _STORE_KERNELS
+                 for a in n.args if isinstance(a, Name) and a.name in fields})
+    pool = BufferPool()
+    slots: Dict[tuple, object] = {}
+    owned: Dict[tuple, np.ndarray] = {}   # key -> buffer its frame was written into
+    refs: Dict[tuple, tuple] = {}         # key -> (frame, buffer) refcounts right after its step
+    live = peak = released = 0
+    donor = None
+
+    def cached(k, node) -> bool:
+        return cache is not None and not isinstance(node, Name) and (shared is None or k in shared)
+
+    def get(node):
+        c = shapes.const(node)
+        return c if c is not None else slots[shapes.key(node)]
+
+    def unshared(k) -> bool:
+        # nothing but its own slot holds the frame or views the buffer
+        return (sys.getrefcount(slots[k]), sys.getrefcount(owned[k])) == refs[k]
+
+    def elementwise(op, a, b=None):
+        # ufunc into the donor's buffer or a pooled one, when every operand is a
+        # float panel on the same axes or a scalar; None leaves it to pandas
+        like = a if isinstance(a, pd.DataFrame) else b
+        if not isinstance(like, pd.DataFrame):
+            return None
+        x = _operand(a, like)
+        y = None if b is None else _operand(b, like)
+        if x is None or (b is not None and y is None):
+            return None
+        buf = owned[donor] if donor is not None else pool.get(like.shape)
+        with np.errstate(all="ignore"):
+            if b is None:
+                np.negative(x, out=buf)
+            else:
+                _UFUNC[op](x, y, out=buf)
+        return buf, pd.DataFrame(buf, index=like.index, columns=like.columns, copy=False)
 
-    def walk(node):
-        if isinstance(node, Number):
-            return float(node.value)
+    def compute(node):
         if isinstance(node, Name):
             if node.name not in fields:
                 raise KeyError(f"Unknown field '{node.name}'")
             return fields[node.name]
         if isinstance(node, UnaryOp):
-            v = walk(node.operand)
+            v = get(node.operand)
             if isinstance(v, (int,float,np.floating)):
                 if node.op == '+': return +v
                 if node.op == '-': return -v
                 if node.op == '!': return 0.0 if v!=0 else 1.0
             if node.op == '+': return v
-            if node.op == '-': return -v
+            if node.op == '-': return (pooled and elementwise('-', v)) or -v
             if node.op == '!': return (~truthy(v)).astype(float)
             raise ValueError(f"Unsupported unary {node.op}")
         if isinstance(node, BinOp):
-            a = walk(node.left); b = walk(node.right)
-            a, b = _align(a, b)
+            a = get(node.left); b = get(node.right)
+            if node.op in _UFUNC and pooled:
+                out = elementwise(node.op, a, b)
+                if out is not None:
+                    return out
+            if not (shapes.is_scalar(node.left) or shapes.is_scalar(node.right)):
+                a, b = _align(a, b)
             if node.op not in _BIN:
                 raise ValueError(f"Unsupported op {node.op}")
             return _BIN[node.op](a, b)
         if isinstance(node, Call):
             name = node.name.lower()
-            args = [walk(a) for a in node.args]
-
-            # time-series
-            if name == "ts_mean": return args[0].rolling(int(args[1]), min_periods=1).mean()
-            if name == "ts_sum":  return args[0].rolling(int(args[1]), min_periods=1).sum()
-            if name == "ts_std":  return args[0].rolling(int(args[1]), min_periods=2).std(ddof=1)
-            if name == "delay":   return args[0].shift(int(args[1]))
-            if name == "decay_linear": return _decay_linear(args[0], int(args[1]))
-            if name == "ts_rank": return _ts_rank_last(args[0], int(args[1]))
-            if name == "ts_corr": return _ts_corr(args[0], args[1], int(args[2]))
-
-            # cross-sectional
-            if name == "rank":   return _cs_rank(args[0])
-            if name == "zscore": return _cs_zscore(args[0])
-            if name == "scale":
-                a = float(args[1]) if len(args) > 1 and not isinstance(args[1], (pd.DataFrame, pd.Series)) else 1.0
-                return _cs_scale(args[0], a=a)
-
-            # safe divide
-            if name == "sdiv":
-                a, b = _align(args[0], args[1])
-                if isinstance(a, pd.DataFrame) and isinstance(b, pd.DataFrame):
-                    out = a.copy()
-                    mask = (b == 0) | b.isna()
-                    out[~mask] = a[~mask] / b[~mask]
-                    out[mask] = 0.0
-                    return out
-                return 0.0 if (isinstance(b, (int,float)) and b == 0) else a / b
-
-            raise NotImplementedError(f"Function '{name}' not yet vectorized")
-
+            spec = get_fn(name)
+            check_arity(spec, len(node.args))
+            if spec.panel is None:
+                raise NotImplementedError(f"Function '{name}' not yet vectorized")
+            pool.clear()   # kernels allocate their own outputs; idle buffers only add to the peak
+            return spec.panel(*[get(a) for a in node.args])
         raise TypeError(f"Unknown node {type(node)}")
 
-    res = walk(ast)
+    for i, (k, node) in enumerate(steps):
+        if checkpoint is not None:
+            checkpoint()
+        dying = {shapes.key(c) for c in children(node) if shapes.const(c) is None}
+        dying = [c for c in dying if last[c] == i] if pooled and k not in ready else []
+        if k in ready:
+            v = cache[k]
+        else:
+            # an operand read for the last time can take the result in place
+            donor = next((c for c in dying if c in owned and unshared(c)), None) \
+                if isinstance(node, (UnaryOp, BinOp)) else None
+            v = compute(node)
+            if isinstance(v, tuple):
+                buf, v = v
+                if not cached(k, node):   # a cached panel's buffer is never recycled
+                    owned[k] = buf
+                del buf
+            else:
+                donor = None
+            if cached(k, node):
+                cache[k] = v
+        slots[k] = v
+        if not isinstance(node, Name):
+            live += nbytes(v)
+            peak = max(peak, live + pool.bytes)
+        del v
+        for c in dying:
+            if c in owned:
+                if c != donor and unshared(c):
+                    pool.put(owned[c])
+                del owned[c], refs[c]
+            if c[0] != "name":
+                live -= nbytes(slots[c])
+                released += 1
+            del slots[c]
+        if k in owned:
+            refs[k] = (sys.getrefcount(slots[k]), sys.getrefcount(owned[k]))
+
+    res = get(ast)
+    if stats is not None:
+        stats.update(peak_bytes=peak, steps=len(steps), released=released,
+                     buffers_allocated=pool.allocated, buffers_reused=pool.reused,
+                     input_bytes=sum(nbytes(fields[n.name]) for _, n in steps if isinstance(n, Name)))
     if isinstance(res, pd.Series):
         res = res.to_frame()
     if not isinstance(res, pd.DataFrame):
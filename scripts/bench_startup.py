@@ -0,0 +1,92 @@
+"""
+scripts/bench_startup.py
+
+Time-to-first-response after a cold process start: spawns uvicorn, polls
+/healthz until it answers, then times the first /backtest (a snapshotted
+alpha) and a first /backtest of an alpha that has to be evaluated.
+
+Runs each configuration in a fresh process:
+  warm   parser cache + snapshot + warm-up thread (the defaults)
+  cold   DSL_PARSER_CACHE=0, no snapshot, no warm-up thread
+
+Usage:
+    python -m engine.snapshot && python -m dsl.parser    # build the artifacts
+    python scripts/bench_startup.py --trials 5
+"""
+
+import argparse
+import json
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import time
+import urllib.request
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+SNAPSHOT_ALPHA = "rank(ts_mean(returns,5) - ts_mean(returns,20))"
+FRESH_ALPHA = "rank(ts_zscore(close,15) - ts_mean(returns,3))"
+
+CONFIGS = {
+    "warm": {},
+    "cold": {"DSL_PARSER_CACHE": "0", "DSL_SNAPSHOT_DIR": os.devnull, "DSL_WARM_START": "0"},
+}
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _post(url: str, body: dict):
+    req = urllib.request.Request(url, data=json.dumps(body).encode(),
+                                 headers={"Content-Type": "application/json"})
+    with urllib.request.urlopen(req, timeout=60) as r:
+        r.read()
+
+
+def trial(env_over: dict) -> dict:
+    port = _free_port()
+    base = f"http://127.0.0.1:{port}"
+    env = dict(os.environ, **env_over)
+    t0 = time.perf_counter()
+    proc = subprocess.Popen([sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(port),
+                             "--log-level", "warning"], cwd=ROOT, env=env)
+    try:
+        while True:
+            try:
+                urllib.request.urlopen(base + "/healthz", timeout=1).read()
+                break
+            except OSError:
+                if proc.poll() is not None:
+                    raise RuntimeError("server exited during startup")
+                time.sleep(0.005)
+        ready = time.perf_counter() - t0
+        _post(base + "/backtest", {"alpha": SNAPSHOT_ALPHA})
+        first = time.perf_counter() - t0
+        t1 = time.perf_counter()
+        _post(base + "/backtest", {"alpha": FRESH_ALPHA})
+        fresh = time.perf_counter() - t1
+    finally:
+        proc.terminate()
+        proc.wait()
+    return {"ready": ready, "first_backtest": first, "new_alpha": fresh}
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--trials", type=int, default=3)
+    ap.add_argument("--config", choices=sorted(CONFIGS), action="append")
+    args = ap.parse_args()
+
+    print(f"{'config':8s} {'ready':>9s} {'first /backtest':>16s} {'new alpha':>10s}   (median of {args.trials}, seconds)")
+    for name in args.config or list(CONFIGS):
+        runs = [trial(CONFIGS[name]) for _ in range(args.trials)]
+        med = {k: statistics.median(r[k] for r in runs) for k in runs[0]}
+        print(f"{name:8s} {med['ready']:9.3f} {med['first_backtest']:16.3f} {med['new_alpha']:10.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -4,6 +4,7 @@ def make_field(seed=0, n_days=200, n_symbols=6):
     rng = np.random.default_rng(seed)
     dates = pd.date_range("2024-01-01", periods=n_days, freq="B")
     symbols = ["AAPL","MSFT","GOOG","AMZN","TSLA","NVDA"][:n_symbols]
+    symbols += [f"S{i:04d}" for i in range(len(symbols), n_symbols)]
     close = pd.DataFrame(100 + np.cumsum(rng.normal(0, 1, (n_days, n_symbols)), axis=0),
                          index=dates, columns=symbols)
     volume = pd.DataFrame(rng.integers(1e5, 5e6, (n_days, n_symbols)),
@@ -0,0 +1,294 @@
+"""
+scripts/load_test.py
+
+Concurrent HTTP load on app.main:app. Writes synthetic fields
+(scripts/gen_synthetic_data.py) to a temporary data dir, starts uvicorn on
+them, then runs each scenario: a fixed number of requests sent by many
+asyncio clients over keep-alive connections.
+
+Scenarios (request mix by weight):
+  evaluate   /evaluate at a random date
+  series     /evaluate_series_fast
+  backtest   /backtest (a few cost levels, so the result cache also misses)
+  mixed      evaluate 5 : series 3 : backtest 2
+
+Request bodies come from a seeded generator over a fixed alpha pool, so
+every run issues the same sequence and runs on different commits are
+comparable. Reported per scenario: throughput, p50/p95/p99 latency, error
+rate, and the server's peak RSS while it ran (Linux /proc).
+
+Usage:
+    python scripts/load_test.py --clients 32 --requests 400
+    python scripts/load_test.py --scenario mixed --json before.json
+    python scripts/load_test.py --scenario mixed --compare before.json
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+from collections import Counter
+
+import numpy as np
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.insert(0, os.path.join(ROOT, "scripts"))
+from gen_synthetic_data import make_field  # noqa: E402
+
+# signals without NaNs on the synthetic data (the JSON endpoints answer 500 on NaN
+# values) and with ts functions on raw fields only (/evaluate runs the per-date
+# engine), so a capacity run does not turn into an error-path run
+ALPHAS = (
+    "rank(ts_mean(returns,5) - ts_mean(returns,20))",
+    "sdiv(ts_mean(returns,5), ts_std(returns,20))",
+    "rank(ts_sum(returns,10))",
+    "rank(ts_max(close,10) - close)",
+    "rank(volume) * rank(returns)",
+    "rank(ts_min(close,10) - close) - rank(ts_mean(volume, 20))",
+    "rank(ts_rank(close,10))",
+)
+COSTS = (0.0, 5.0, 10.0)
+SCENARIOS = {
+    "evaluate": {"evaluate": 1},
+    "series": {"evaluate_series_fast": 1},
+    "backtest": {"backtest": 1},
+    "mixed": {"evaluate": 5, "evaluate_series_fast": 3, "backtest": 2},
+}
+METRICS = ("rps", "p50_ms", "p95_ms", "p99_ms", "error_rate", "rss_peak_mb")
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _rss_mb(pid: int):
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return None
+
+
+def requests_for(mix: dict, n: int, dates: list, seed: int) -> list:
+    """n (endpoint, body) pairs drawn from `mix`; the same for the same seed."""
+    rng = random.Random(seed)
+    names = sorted(mix)
+    out = []
+    for endpoint in rng.choices(names, weights=[mix[e] for e in names], k=n):
+        body = {"alpha": rng.choice(ALPHAS)}
+        if endpoint == "evaluate":
+            body["date"] = rng.choice(dates)
+        elif endpoint == "backtest":
+            body["cost_bps"] = rng.choice(COSTS)
+        out.append((endpoint, body))
+    return out
+
+
+class Client:
+    """One keep-alive HTTP/1.1 connection; reconnects after an error."""
+
+    def __init__(self, port: int, timeout: float):
+        self.port, self.timeout = port, timeout
+        self.reader = self.writer = None
+
+    async def post(self, path: str, body: dict) -> int:
+        try:
+            return await asyncio.wait_for(self._post(path, body), self.timeout)
+        except BaseException:
+            self.close()
+            raise
+
+    async def _post(self, path: str, body: dict) -> int:
+        if self.writer is None:
+            self.reader, self.writer = await asyncio.open_connection("127.0.0.1", self.port)
+        data = json.dumps(body).encode()
+        self.writer.write(f"POST {path} HTTP/1.1\r\nHost: 127.0.0.1\r\nContent-Type: application/json\r\n"
+                          f"Content-Length: {len(data)}\r\n\r\n".encode() + data)
+        await self.writer.drain()
+        head = (await self.reader.readuntil(b"\r\n\r\n")).decode("latin-1").split("\r\n")
+        status = int(head[0].split()[1])
+        headers = dict(h.lower().split(": ", 1) for h in head[1:] if ": " in h)
+        if headers.get("transfer-encoding") == "chunked":
+            while True:
+                size = int((await self.reader.readuntil(b"\r\n")).split(b";")[0], 16)
+                await self.reader.readexactly(size + 2)
+                if size == 0:
+                    break
+        else:
+            await self.reader.readexactly(int(headers.get("content-length", 0)))
+        if headers.get("connection") == "close":
+            self.close()
+        return status
+
+    def close(self):
+        if self.writer is not None:
+            self.writer.close()
+        self.reader = self.writer = None
+
+
+async def _run(port: int, pid: int, reqs: list, clients: int, timeout: float) -> dict:
+    queue = iter(reqs)
+    samples = []   # (endpoint, seconds, status); status 0 for a failed connection or timeout
+    rss = []
+    done = asyncio.Event()
+
+    async def worker():
+        c = Client(port, timeout)
+        for endpoint, body in queue:
+            t0 = time.perf_counter()
+            try:
+                status = await c.post("/" + endpoint, body)
+            except (OSError, asyncio.IncompleteReadError, asyncio.TimeoutError, ValueError):
+                status = 0
+            samples.append((endpoint, time.perf_counter() - t0, status))
+        c.close()
+
+    async def sample_rss():
+        while not done.is_set():
+            r = _rss_mb(pid)
+            if r is not None:
+                rss.append(r)
+            try:
+                await asyncio.wait_for(done.wait(), 0.05)
+            except asyncio.TimeoutError:
+                pass
+
+    sampler = asyncio.create_task(sample_rss())
+    t0 = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(clients)))
+    wall = time.perf_counter() - t0
+    done.set()
+    await sampler
+    return summarize(samples, wall, rss)
+
+
+def summarize(samples: list, wall: float, rss: list) -> dict:
+    def stats(rows):
+        lat = np.array([s for _, s, _ in rows]) * 1e3
+        errors = sum(not 200 <= st < 400 for _, _, st in rows)
+        p50, p95, p99 = np.percentile(lat, [50, 95, 99]) if len(lat) else (np.nan,) * 3
+        return {"requests": len(rows), "rps": len(rows) / wall if wall > 0 else np.nan,
+                "p50_ms": float(p50), "p95_ms": float(p95), "p99_ms": float(p99),
+                "error_rate": errors / len(rows) if rows else 0.0,
+                "statuses": {str(st): n for st, n in sorted(Counter(st for _, _, st in rows).items())}}
+
+    out = stats(samples)
+    out.update(seconds=wall, rss_peak_mb=max(rss) if rss else None, rss_end_mb=rss[-1] if rss else None,
+               endpoints={e: stats([s for s in samples if s[0] == e])
+                          for e in sorted({s[0] for s in samples})})
+    return out
+
+
+def _wait_ready(base: str, proc, timeout: float = 60):
+    t0 = time.perf_counter()
+    while time.perf_counter() - t0 < timeout:
+        try:
+            urllib.request.urlopen(base + "/healthz", timeout=1).read()
+            return
+        except OSError:
+            if proc.poll() is not None:
+                raise RuntimeError("server exited during startup")
+            time.sleep(0.02)
+    raise RuntimeError("server did not become ready")
+
+
+def run(args) -> dict:
+    data = tempfile.mkdtemp(prefix="dsl-load-")
+    fields = make_field(seed=args.seed, n_days=args.days, n_symbols=args.symbols)
+    for name, df in fields.items():
+        df.to_csv(os.path.join(data, f"{name}.csv"))
+    dates = [d.strftime("%Y-%m-%d") for d in fields["close"].index]
+    port = _free_port()
+    env = dict(os.environ, DSL_DATA_DIR=data, DSL_SNAPSHOT_DIR=os.devnull)
+    proc = subprocess.Popen([sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(port),
+                             "--log-level", "warning"], cwd=ROOT, env=env)
+    results = {}
+    try:
+        _wait_ready(f"http://127.0.0.1:{port}", proc)
+        for name in args.scenario or list(SCENARIOS):
+            mix = SCENARIOS[name]
+            warm = requests_for(mix, args.warmup, dates, args.seed + 1)
+            asyncio.run(_run(port, proc.pid, warm, 1, args.timeout))
+            reqs = requests_for(mix, args.requests, dates, args.seed)
+            results[name] = asyncio.run(_run(port, proc.pid, reqs, args.clients, args.timeout))
+            if proc.poll() is not None:
+                raise RuntimeError(f"server exited during scenario {name!r}")
+    finally:
+        proc.terminate()
+        proc.wait()
+        shutil.rmtree(data, ignore_errors=True)
+    return results
+
+
+def _commit() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def _fmt(v, metric):
+    if v is None:
+        return "-"
+    return f"{100 * v:.1f}%" if metric == "error_rate" else f"{v:.1f}"
+
+
+def report(results: dict, baseline: dict = None):
+    print(f"{'scenario':10s}" + "".join(f"{m:>14s}" for m in METRICS))
+    for name, r in results.items():
+        print(f"{name:10s}" + "".join(f"{_fmt(r[m], m):>14s}" for m in METRICS))
+        base = (baseline or {}).get(name)
+        if base is not None:
+            cells = []
+            for m in METRICS:
+                a, b = base.get(m), r.get(m)
+                cells.append("-" if a in (None, 0) or b is None else f"{100 * (b - a) / a:+.0f}%")
+            print(f"{'  vs base':10s}" + "".join(f"{c:>14s}" for c in cells))
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--scenario", choices=sorted(SCENARIOS), action="append")
+    ap.add_argument("--clients", type=int, default=16, help="concurrent connections")
+    ap.add_argument("--requests", type=int, default=200, help="requests per scenario")
+    ap.add_argument("--warmup", type=int, default=10, help="sequential requests before each scenario")
+    ap.add_argument("--days", type=int, default=500)
+    ap.add_argument("--symbols", type=int, default=100)
+    ap.add_argument("--seed", type=int, default=0)
+    ap.add_argument("--timeout", type=float, default=60.0, help="seconds per request")
+    ap.add_argument("--json", help="write the results here")
+    ap.add_argument("--compare", help="results JSON of an earlier run to diff against")
+    args = ap.parse_args()
+
+    results = run(args)
+    baseline = None
+    if args.compare:
+        with open(args.compare) as f:
+            prev = json.load(f)
+        baseline = prev["results"]
+        print(f"baseline: commit {prev['commit']}")
+    print(f"commit {_commit()}: {args.clients} clients, {args.requests} requests per scenario, "
+          f"{args.days} days × {args.symbols} symbols")
+    report(results, baseline)
+    if args.json:
+        config = {k: getattr(args, k) for k in ("clients", "requests", "warmup", "days", "symbols", "seed")}
+        with open(args.json, "w") as f:
+            json.dump({"commit": _commit(), "config": config, "results": results}, f, indent=1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,31 @@
+import pandas as pd
+import pytest
+from engine import backtest_loop
+from engine.backtest_loop import evaluate_series, pool_warm, shutdown_pool
+
+@pytest.fixture(scope="module")
+def fields():
+    names = ["returns", "close", "volume"]
+    return {n: pd.read_csv(f"data/{n}.csv", index_col=0, parse_dates=True) for n in names}
+
+def test_sharded_loop_matches_serial(fields):
+    alpha = "rank(ts_mean(returns,5) - delay(close,3)) * ts_std(volume,10)"
+    serial = evaluate_series(alpha, fields, workers=1)
+    sharded = evaluate_series(alpha, fields, workers=2)
+    pd.testing.assert_frame_equal(serial, sharded)
+
+def test_pool_is_reused_for_the_same_fields(fields):
+    try:
+        evaluate_series("ts_mean(returns,5)", fields, workers=2)
+        pool, path = backtest_loop._POOL["pool"], backtest_loop._POOL["path"]
+        assert pool_warm(fields, 2) and not pool_warm(fields, 3)
+        # equal content in new frames: same pool and snapshot
+        copy = {k: f.copy() for k, f in fields.items()}
+        evaluate_series("ts_mean(close,5)", copy, workers=2)
+        assert backtest_loop._POOL["pool"] is pool and pool_warm(copy, 2)
+        changed = dict(copy, close=copy["close"] * 2)
+        out = evaluate_series("ts_mean(close,5)", changed, workers=2)
+        assert backtest_loop._POOL["pool"] is not pool and backtest_loop._POOL["path"] != path
+        pd.testing.assert_frame_equal(out, evaluate_series("ts_mean(close,5)", changed, workers=1))
+    finally:
+        shutdown_pool()
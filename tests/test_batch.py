@@ -0,0 +1,54 @@
+import json
+import os
+import numpy as np
+import pytest
+from engine.batch import run_batch, read_results, read_alphas, main
+from engine.export import alpha_id
+from engine.snapshot import load_csv_fields
+from engine.vectorized import evaluate_series_vectorized
+
+ALPHAS = ["rank(ts_mean(returns,5) - ts_mean(returns,20))",
+          "RANK(ts_mean(returns, 5.0) - ts_mean(returns,20))",
+          "ts_corr(close, volume, 10)",
+          "nope(returns)"]
+
+@pytest.fixture(scope="module")
+def fields():
+    return load_csv_fields("data")
+
+def test_results_signals_and_resume(fields, tmp_path):
+    out = str(tmp_path)
+    counts = run_batch(ALPHAS, out, fields, backtest=True, signals=True)
+    assert (counts["done"], counts["failed"], counts["skipped"]) == (3, 1, 0)
+    res = read_results(out)
+    assert res[alpha_id("nope(returns)")]["stage"] == "plan"
+    a, b = res[alpha_id(ALPHAS[0])], res[alpha_id(ALPHAS[1])]
+    assert a["stats"] == b["stats"] and a["stats"]["sharpe"] is not None
+    ref = evaluate_series_vectorized(ALPHAS[2], fields).to_numpy()
+    sig = np.load(os.path.join(out, res[alpha_id(ALPHAS[2])]["signal"]))
+    assert np.allclose(sig, ref, equal_nan=True)
+
+    # a torn last line is dropped, that alpha runs again, the rest are skipped
+    path = os.path.join(out, "results.jsonl")
+    lines = open(path).read().splitlines(True)
+    open(path, "w").write("".join(lines[:-1]) + lines[-1][:10])
+    counts = run_batch(ALPHAS + ["rank(volume)"], out, fields)
+    assert (counts["done"], counts["skipped"]) == (2, 3)
+    assert len(read_results(out)) == 5
+    assert all(json.loads(ln) for ln in open(path))
+
+def test_pool_matches_serial(fields, tmp_path):
+    alphas = ["ts_mean(returns,5)", "rank(ts_std(close,10))", "zscore(ts_sum(volume,3))"]
+    run_batch(alphas, str(tmp_path / "serial"), fields, backtest=True)
+    run_batch(alphas, str(tmp_path / "pool"), fields, workers=2, backtest=True)
+    serial, pool = read_results(str(tmp_path / "serial")), read_results(str(tmp_path / "pool"))
+    assert serial.keys() == pool.keys()
+    for k in serial:
+        assert pool[k]["stats"] == pytest.approx(serial[k]["stats"])
+
+def test_cli_reads_stdin(tmp_path, monkeypatch):
+    import io
+    monkeypatch.setattr("sys.stdin", io.StringIO("# comment\nts_mean(returns,5)\n\nts_mean(returns,5)\n"))
+    assert main(["-", "--out", str(tmp_path), "--data", "data", "--workers", "1", "--quiet"]) == 0
+    assert len(read_results(str(tmp_path))) == 1
+    assert read_alphas(["a", " a ", "#b", "c"]) == ["a", "c"]
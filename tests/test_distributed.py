@@ -0,0 +1,67 @@
+import numpy as np
+import pandas as pd
+import pytest
+from engine.distributed import (spawn_local, sorted_sample, _finish_rank, RemoteError, serve, is_local,
+                                DEFAULT_AUTHKEY)
+from engine.backtest import run_backtest
+from engine.snapshot import load_csv_fields, write_snapshot
+from engine.vectorized import evaluate_series_vectorized
+
+ALPHAS = ["rank(ts_mean(returns,5) - ts_mean(returns,20))",
+          "zscore(ts_std(returns,10)) + scale(close, 2)",
+          "ts_mean(rank(returns), 5) * rank(volume)",
+          "hump(returns, 0.05)",
+          "rank(rank(returns) + zscore(returns)) - returns"]
+
+@pytest.fixture(scope="module")
+def fields():
+    return load_csv_fields("data")
+
+@pytest.fixture(scope="module")
+def cluster(fields):
+    with spawn_local(3) as c:
+        c.load(fields)
+        yield c
+
+@pytest.mark.parametrize("alpha", ALPHAS)
+def test_matches_single_process(cluster, fields, alpha):
+    got, ref = cluster.evaluate(alpha), evaluate_series_vectorized(alpha, fields)
+    assert got.index.equals(ref.index) and got.columns.equals(ref.columns)
+    assert np.allclose(got.to_numpy(), ref.to_numpy(), equal_nan=True)
+
+def test_backtest_matches(cluster, fields):
+    a = ALPHAS[0]
+    got = cluster.backtest(a, cost_bps=5)
+    ref = run_backtest(evaluate_series_vectorized(a, fields), fields["returns"], cost_bps=5)
+    for col in ("pnl", "turnover", "equity"):
+        assert np.allclose(got[col], ref[col])
+
+def test_remote_error(cluster):
+    with pytest.raises(RemoteError):
+        cluster.evaluate("ts_mean(nope, 5)")
+    assert cluster.evaluate("rank(returns)").shape[1] == 6   # still usable
+
+def test_tcp_snapshot(fields, tmp_path):
+    write_snapshot(fields, str(tmp_path))
+    with spawn_local(2, transport="tcp") as c:
+        c.load_snapshot(str(tmp_path))
+        got = c.evaluate(ALPHAS[1])
+    ref = evaluate_series_vectorized(ALPHAS[1], fields)
+    assert np.allclose(got.to_numpy(), ref.to_numpy(), equal_nan=True)
+
+def test_sampled_rank_is_close():
+    rng = np.random.default_rng(0)
+    x = rng.standard_normal((4, 3000))
+    x[0, :2990] = np.nan           # a row below the sample size stays exact
+    parts = np.array_split(x, 3, axis=1)
+    samples = [sorted_sample(p, 64) for p in parts]
+    got = np.concatenate([_finish_rank(p, samples) for p in parts], axis=1)
+    ref = pd.DataFrame(x).rank(axis=1, pct=True).to_numpy()
+    assert np.allclose(got[0], ref[0], equal_nan=True)
+    assert np.nanmax(np.abs(got - ref)) < 0.02
+
+def test_network_listen_needs_a_key():
+    assert is_local("/tmp/w.sock") and is_local(("127.0.0.1", 7101)) and is_local(("::1", 7101))
+    assert not is_local(("0.0.0.0", 7101)) and not is_local(("10.0.0.5", 7101))
+    with pytest.raises(ValueError, match="DSL_CLUSTER_KEY"):
+        serve(("0.0.0.0", 0), DEFAULT_AUTHKEY)
@@ -0,0 +1,40 @@
+import numpy as np
+import pandas as pd
+from engine.downsample import lttb, tile_panel, downsample_view
+
+def test_lttb_keeps_extremes_and_ends():
+    y = np.sin(np.linspace(0, 20, 5000))
+    y[1234] = 5.0
+    keep = lttb(y, 200)
+    assert len(keep) == 200 and keep[0] == 0 and keep[-1] == 4999
+    assert np.all(np.diff(keep) > 0)
+    assert 1234 in keep
+    assert np.array_equal(lttb(y[:50], 200), np.arange(50))
+
+def test_tiles_match_block_reduction():
+    rng = np.random.default_rng(0)
+    a = rng.normal(size=(103, 17))
+    a[rng.random(a.shape) < 0.1] = np.nan
+    t = tile_panel(a, 10, 4)
+    r, c = t["row_edges"], t["col_edges"]
+    assert t["mean"].shape == (10, 4)
+    rb, cb = np.append(r, 103), np.append(c, 17)
+    for i in range(10):
+        for j in range(4):
+            blk = a[rb[i]:rb[i + 1], cb[j]:cb[j + 1]]
+            assert np.isclose(t["mean"][i, j], np.nanmean(blk))
+            assert t["min"][i, j] == np.nanmin(blk) and t["max"][i, j] == np.nanmax(blk)
+
+def test_view_size_is_bounded():
+    idx = pd.bdate_range("2000-01-03", periods=3000)
+    cols = [f"s{i}" for i in range(900)]
+    sig = np.random.default_rng(1).normal(size=(3000, 900))
+    v = downsample_view(idx, cols, {"equity": np.arange(3000.0)}, sig, width=400, height=100, cell_px=4)
+    assert len(v["equity"]["values"]) == 400
+    assert np.array(v["heatmap"]["mean"]).shape == (25, 100)
+
+    z = downsample_view(idx, cols, {"equity": np.arange(3000.0)}, sig, start="2005-01-01",
+                        end="2005-01-31", sym_start=10, sym_end=13)
+    assert z["viewport"]["start"] >= "2005-01-01" and z["viewport"]["end"] <= "2005-01-31"
+    assert z["heatmap"]["labels"] == ["s10", "s11", "s12"]
+    assert np.allclose(np.array(z["heatmap"]["mean"], dtype=float)[0], sig[idx.searchsorted(pd.Timestamp("2005-01-03")), 10:13], atol=1e-5)
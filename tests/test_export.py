@@ -0,0 +1,62 @@
+import os
+import numpy as np
+import pandas as pd
+import pytest
+from engine.export import export_signals, append_signal, read_signal, read_manifest, alpha_dir
+from engine.snapshot import load_csv_fields
+from engine.vectorized import evaluate_series_vectorized
+
+ALPHAS = ["rank(ts_mean(returns,5) - ts_mean(returns,20))", "ts_corr(close, volume, 10)"]
+
+@pytest.fixture(scope="module")
+def fields():
+    return load_csv_fields("data")
+
+def test_incremental_export_matches_full_evaluation(fields, tmp_path):
+    root = str(tmp_path)
+    head = {k: f.iloc[:400] for k, f in fields.items()}
+    assert [r["rows"] for r in export_signals(ALPHAS, head, root)] == [400, 400]
+    m = read_manifest(root, ALPHAS[0])
+    first = os.path.join(alpha_dir(root, ALPHAS[0]), m["partitions"][0]["file"] + ".f64")
+    before = open(first, "rb").read()
+
+    assert [r["rows"] for r in export_signals(ALPHAS, fields, root)] == [291, 291]
+    assert [r["rows"] for r in export_signals(ALPHAS, fields, root)] == [0, 0]
+    assert open(first, "rb").read() == before       # history is not rewritten
+    for a in ALPHAS:
+        ref = evaluate_series_vectorized(a, fields)
+        out = read_signal(root, a)
+        assert np.allclose(out.to_numpy(), ref.to_numpy(), equal_nan=True)
+        assert out.index.equals(ref.index)
+
+def test_range_reads_are_memory_mapped(fields, tmp_path):
+    sig = evaluate_series_vectorized(ALPHAS[0], fields)
+    append_signal(str(tmp_path), ALPHAS[0], sig, partition="month")
+    d = sig.index
+    out = read_signal(str(tmp_path), ALPHAS[0], d[40], d[45])
+    assert out.index.equals(d[40:46])
+    base = out.to_numpy()
+    while base.base is not None and not isinstance(base, np.memmap):
+        base = base.base
+    assert isinstance(base, np.memmap)
+    pd.testing.assert_frame_equal(out, sig.iloc[40:46], check_freq=False, check_index_type=False)
+    assert len(read_signal(str(tmp_path), ALPHAS[0], d[10], d[300])) == 291
+
+def test_torn_append_is_discarded(fields, tmp_path):
+    sig = evaluate_series_vectorized(ALPHAS[1], fields)
+    append_signal(str(tmp_path), ALPHAS[1], sig.iloc[:100])
+    m = read_manifest(str(tmp_path), ALPHAS[1])
+    with open(os.path.join(alpha_dir(str(tmp_path), ALPHAS[1]), m["partitions"][-1]["file"] + ".f64"), "ab") as f:
+        f.write(b"\0" * 13)    # crash after writing data, before the manifest
+    append_signal(str(tmp_path), ALPHAS[1], sig)
+    out = read_signal(str(tmp_path), ALPHAS[1])
+    assert np.allclose(out.to_numpy(), sig.to_numpy(), equal_nan=True)
+
+def test_folded_windows_export_enough_history(fields, tmp_path):
+    root = str(tmp_path)
+    alphas = ["ts_mean(close, 2+3)", "ts_corr(close, volume, 1*10)"]
+    export_signals(alphas, {k: f.iloc[:400] for k, f in fields.items()}, root)
+    export_signals(alphas, fields, root)
+    for a in alphas:
+        ref = evaluate_series_vectorized(a, fields)
+        assert np.allclose(read_signal(root, a).to_numpy(), ref.to_numpy(), equal_nan=True)
@@ -0,0 +1,80 @@
+import numpy as np
+import pandas as pd
+import pytest
+from dsl.parser import parse_alpha
+from dsl.ast_utils import canonical
+import engine.library as library
+from engine.library import Library, rank_corr
+from engine.snapshot import load_csv_fields
+from engine.vectorized import evaluate_series_vectorized
+
+@pytest.fixture(scope="module")
+def fields():
+    return load_csv_fields("data")
+
+@pytest.mark.parametrize("a,b", [
+    ("RANK(ts_mean(returns, 5.0)) + close", "close + rank(ts_mean(returns,5))"),
+    ("a * (b * c)", "(c * a) * b"),
+    ("x > y", "y < x"),
+])
+def test_canonical_spellings(a, b):
+    assert canonical(parse_alpha(a)) == canonical(parse_alpha(b))
+    assert canonical(parse_alpha(canonical(parse_alpha(a)))) == canonical(parse_alpha(a))
+
+def test_canonical_keeps_order_of_noncommutative_ops():
+    assert canonical(parse_alpha("a - b")) != canonical(parse_alpha("b - a"))
+    assert canonical(parse_alpha("a / b * c")) != canonical(parse_alpha("a / (b * c)"))
+
+def test_fingerprints_estimate_rank_correlation(fields, tmp_path):
+    lib = Library(str(tmp_path))
+    a = evaluate_series_vectorized("ts_mean(returns,5)", fields)
+    b = evaluate_series_vectorized("ts_mean(returns,10)", fields)
+    assert abs(float(lib.fingerprint(a) @ lib.fingerprint(b)) - rank_corr(a, b)) < 0.15
+    assert float(lib.fingerprint(a) @ lib.fingerprint(-a)) == pytest.approx(-1, abs=1e-5)
+
+def test_add_dedupes_and_persists(fields, tmp_path):
+    sig = lambda a: evaluate_series_vectorized(a, fields)
+    lib = Library(str(tmp_path))
+    for a in ["rank(ts_mean(returns,5))", "rank(ts_std(returns,20))", "-rank(volume)"]:
+        assert lib.add(a, sig(a))["added"]
+    assert not lib.add("RANK(ts_mean(returns, 5.0))", sig("rank(ts_mean(returns,5))"))["added"]
+
+    again = Library(str(tmp_path))
+    assert len(again) == 3 and np.array_equal(again.fingerprints, lib.fingerprints)
+    q = "rank(ts_mean(returns,6))"
+    top = again.similar(sig(q), k=2, signal=sig)
+    assert top[0]["alpha"] == "rank(ts_mean(returns,5))" and top[0]["corr"] > 0.8
+    assert top[0]["corr"] == pytest.approx(rank_corr(sig(q), sig(top[0]["alpha"])))
+    neg = again.similar(-sig("rank(volume)"), k=1, signal=sig)
+    assert neg[0]["alpha"] == "-rank(volume)" and neg[0]["corr"] > 0.99
+    assert again.similar(sig(q), k=3, exclude="rank(ts_mean(returns,5))")[0]["alpha"] != "rank(ts_mean(returns,5))"
+
+def test_index_scores_a_fraction_and_finds_the_duplicates(tmp_path, monkeypatch):
+    monkeypatch.setattr(library, "BRUTE_FORCE_BELOW", 0)
+    rng = np.random.default_rng(0)
+    idx = pd.bdate_range("2020-01-01", periods=300)
+    panel = lambda: pd.DataFrame(rng.normal(size=(300, 40)), index=idx)
+    base = panel()
+    lib = Library(str(tmp_path))
+    stored = {}
+    for i in range(600):
+        s = base + 0.3 * panel() if i % 100 == 0 else panel()
+        stored[f"returns + {i}"] = s
+        lib.add(f"returns + {i}", s)
+    q = base + 0.3 * panel()
+    rows = lib.candidates(lib.fingerprint(q))
+    assert len(rows) < len(lib) // 2
+    top = lib.similar(q, k=6, signal=stored.get)
+    assert {m["alpha"] for m in top} == {f"returns + {i}" for i in range(0, 600, 100)}
+
+def test_backtest_lists_similar_only_when_asked(tmp_path, monkeypatch):
+    import app.main as m
+    monkeypatch.setattr(m, "_LIBRARY", {"lib": None})
+    monkeypatch.setenv("DSL_LIBRARY_DIR", str(tmp_path))
+    a = "rank(ts_mean(returns,5))"
+    m.library().add("rank(ts_mean(returns,6))", m._signal_frame("rank(ts_mean(returns,6))"))
+    full = m.backtest(m.BacktestBody(alpha=a))
+    view = m.backtest(m.BacktestBody(alpha=a, viewport=m.Viewport()))
+    assert full["similar"] == view["similar"] == []
+    asked = m.backtest(m.BacktestBody(alpha=a, similar=1, viewport=m.Viewport()))
+    assert asked["similar"][0]["alpha"] == "rank(ts_mean(returns,6))"
@@ -0,0 +1,90 @@
+import asyncio
+import numpy as np
+import pandas as pd
+import pytest
+from app.live import LiveSession
+from dsl.ast_utils import node_key
+from dsl.parser import parse_alpha
+from engine.vectorized import evaluate_series_vectorized
+
+@pytest.fixture(scope="module")
+def fields():
+    names = ["returns", "close", "volume"]
+    return {n: pd.read_csv(f"data/{n}.csv", index_col=0, parse_dates=True) for n in names}
+
+def run(fields, edits, between=None, budget=None):
+    out = []
+    async def main():
+        s = None
+        async def send(m):
+            # nothing from a superseded version ever reaches the socket
+            assert m["version"] == s.version
+            out.append(m)
+        s = LiveSession(send, lambda: fields, debounce=0.0, budget=budget)
+        for e in edits:
+            await s.edit(e)
+            if between is not None:
+                await between(s)
+        await s.wait()
+        return s
+    return asyncio.run(main()), out
+
+def test_stages_stream_in_order(fields):
+    alpha = "rank(ts_mean(returns,5) - ts_corr(close,volume,20))"
+    s, out = run(fields, [{"alpha": alpha}])
+    assert [m["type"] for m in out] == ["parse", "cross_section", "series", "backtest", "done"]
+    ref = evaluate_series_vectorized(alpha, fields).iloc[-1]
+    got = pd.Series(out[1]["values"], dtype=float)
+    assert np.allclose(got[ref.index].to_numpy(), ref.to_numpy(), equal_nan=True)
+
+def test_superseded_versions_are_dropped(fields):
+    edits = [{"alpha": f"rank(ts_mean(returns,{n}))"} for n in (3, 4, 5, 6)]
+    s, out = run(fields, edits)
+    assert {m["version"] for m in out} == {4}
+    assert out[-1]["type"] == "done"
+
+def test_reuses_previous_version(fields):
+    seen = {}
+    async def snapshot(s):
+        await s.wait()
+        seen.update(s._cache)
+    inner = "rank(ts_mean(returns,5))"
+    s, out = run(fields, [{"alpha": inner}, {"alpha": inner + " + ts_std(returns,10)"},
+                          {"alpha": inner + " + ts_std(returns,10)", "cost_bps": 5}], between=snapshot)
+    k = node_key(parse_alpha(inner))
+    assert s._cache[k] is seen[k]           # carried over, not recomputed
+    # a parameter-only change reruns just the backtest
+    assert [m["type"] for m in out if m["version"] == 3] == ["parse", "backtest", "done"]
+
+def test_session_cache_fits_the_budget(fields):
+    from engine.planner import Budget, plan
+    alpha = "rank(ts_mean(returns,5) - ts_mean(close,10))"
+    ast = parse_alpha(alpha)
+    p = plan(alpha, fields, Budget())
+    T, S = fields["returns"].shape
+    s, out = run(fields, [{"alpha": alpha}], budget=Budget(bytes=p.bytes["vectorized"] + 2 * T * S * 8))
+    assert out[-1]["type"] == "done"
+    # the root and its operand, not every intermediate
+    assert set(s._cache) == {node_key(ast), node_key(ast.args[0])}
+
+def test_errors_report_stage(fields):
+    s, out = run(fields, [{"alpha": "rank(ts_mean(returns,5)"}])
+    assert out[-1]["type"] == "error" and out[-1]["stage"] == "parse"
+    s, out = run(fields, [{"alpha": "nope(returns)"}])
+    assert out[-1]["type"] == "error" and out[-1]["stage"] == "parse"
+
+def test_budget_overrun_is_a_422(fields):
+    from engine.planner import Budget
+    s, out = run(fields, [{"alpha": "ts_rank(close, 200)"}], budget=Budget(bytes=1))
+    assert out[-1]["type"] == "error" and out[-1]["status"] == 422
+    assert out[-1]["stage"] == "cross_section"
+
+def test_checkpoint_aborts_evaluation(fields):
+    calls = []
+    def checkpoint():
+        calls.append(1)
+        if len(calls) > 3:
+            raise RuntimeError("superseded")
+    with pytest.raises(RuntimeError):
+        evaluate_series_vectorized("rank(ts_mean(returns,5) - ts_mean(returns,20))", fields,
+                                   checkpoint=checkpoint)
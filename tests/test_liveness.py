@@ -0,0 +1,99 @@
+import numpy as np
+import pandas as pd
+import pytest
+from dsl.parser import parse_alpha
+from dsl.shapes import infer
+from engine.liveness import schedule, peak_live, BufferPool
+from engine.vectorized import evaluate_series_vectorized
+from engine.planner import evaluate
+
+@pytest.fixture(scope="session")
+def fields():
+    names = ["returns","close","volume"]
+    return {n: pd.read_csv(f"data/{n}.csv", index_col=0, parse_dates=True) for n in names}
+
+def test_schedule_last_use():
+    ast = parse_alpha("rank(returns * 2) + returns * 2 - close")
+    steps, last = schedule(ast, infer(ast))
+    keys = [s.key for s in steps]
+    assert len(keys) == len(set(keys)) == 6   # returns, returns*2, rank, +, close, -
+    mul = next(k for k in keys if k[:2] == ("bin", "*"))
+    assert last[mul] == keys.index(next(k for k in keys if k[:2] == ("bin", "+")))
+    assert keys[-1] == infer(ast).key(ast) and keys[-1] not in last
+
+def test_peak_live_is_width_not_size():
+    ast = parse_alpha("((returns + 1) * 2 - 3) / 4 + close")
+    steps, last = schedule(ast, infer(ast))
+    assert peak_live(steps, last, skip={s.key for s in steps if s.key[0] == "name"}) == 2
+
+@pytest.mark.parametrize("alpha", [
+    "((returns * 2 + close) / (volume - 1) - returns * close) * (close + 1)",
+    "-(returns - close) * -(returns - close) + (returns > close) * volume",
+    "rank(returns * 3 - close) - ts_mean(returns * 3 - close, 5) / (1 + 1)",
+    "(returns * 2) * (returns * 2) + 1",
+])
+def test_reuse_matches_pandas(fields, alpha):
+    r, c, v = fields["returns"], fields["close"], fields["volume"]
+    ref = evaluate_series_vectorized(alpha, fields, cache={})
+    stats = {}
+    out = evaluate_series_vectorized(alpha, fields, stats=stats)
+    pd.testing.assert_frame_equal(out, ref)
+    assert stats["buffers_reused"] + stats["buffers_allocated"] > 0
+    # inputs are never written to
+    pd.testing.assert_frame_equal(fields["returns"], r)
+    pd.testing.assert_frame_equal(fields["close"], c)
+    pd.testing.assert_frame_equal(fields["volume"], v)
+
+def test_peak_stays_flat_for_long_chains(fields):
+    panel = fields["returns"].to_numpy().nbytes
+    alpha = "returns"
+    for _ in range(30):
+        alpha = f"({alpha}) * 1.01 + close"
+    stats = {}
+    evaluate_series_vectorized(alpha, fields, stats=stats)
+    assert stats["steps"] == 62 and stats["released"] == 59
+    assert stats["peak_bytes"] <= 3 * panel and stats["buffers_allocated"] <= 2
+
+def test_shared_subexpression_survives_until_last_use(fields):
+    alpha = "ts_mean(returns, 5) * 2 + ts_mean(returns, 5)"
+    out = evaluate_series_vectorized(alpha, fields)
+    m = evaluate_series_vectorized("ts_mean(returns, 5)", fields)
+    np.testing.assert_allclose(out.to_numpy(), (m * 2 + m).to_numpy(), equal_nan=True)
+
+def test_plan_reports_peak(fields):
+    _, p = evaluate("rank(returns * 2 - close)", fields, engine="vectorized")
+    assert 0 < p.peak_bytes <= p.bytes["vectorized"]
+
+def test_pool_bounded():
+    pool = BufferPool(max_buffers=1)
+    a, b = pool.get((3, 2)), pool.get((3, 2))
+    pool.put(a); pool.put(b)
+    assert pool.bytes == a.nbytes and pool.get((3, 2)) is a and pool.reused == 1
+
+def test_shared_cache_counts_repeated_alphas(fields):
+    from engine.liveness import SharedCache
+    a, b = "rank(ts_mean(returns, 5))", "ts_mean(returns, 5) * 2"
+    cache = SharedCache([a, b, a])
+    assert len(cache.keep) == 2   # ts_mean in all three, rank(...) in both copies of a
+    for alpha in (a, b):
+        evaluate_series_vectorized(alpha, fields, cache=cache)
+        cache.done(alpha)
+    assert len(cache) == 2        # the second copy of a still needs both
+    cache.done(a)
+    assert not cache
+
+def test_carry_cache_keeps_nodes_nearest_the_root(fields):
+    from engine.liveness import CarryCache
+    from dsl.ast_utils import node_key
+    old = parse_alpha("rank(ts_mean(returns, 5) - close)")
+    cache = CarryCache(old, panels=2)
+    evaluate_series_vectorized("rank(ts_mean(returns, 5) - close)", fields, cache=cache)
+    diff = old.args[0]
+    assert set(cache) == {node_key(old), node_key(diff)}
+    # the next edit reads the carried difference and does not evaluate the nodes under it
+    new = parse_alpha("zscore(ts_mean(returns, 5) - close)")
+    nxt, stats = CarryCache(new, cache, panels=2), {}
+    out = evaluate_series_vectorized("zscore(ts_mean(returns, 5) - close)", fields, cache=nxt, stats=stats)
+    assert nxt[node_key(diff)] is cache[node_key(diff)] and stats["steps"] == 2
+    ref = evaluate_series_vectorized("zscore(ts_mean(returns, 5) - close)", fields)
+    np.testing.assert_allclose(out.to_numpy(), ref.to_numpy(), equal_nan=True)
@@ -0,0 +1,80 @@
+import numpy as np
+import pandas as pd
+import pytest
+from engine.moments import MomentStore
+from dsl.parser import parse_alpha
+from dsl.analyzer import analyze
+
+@pytest.fixture(scope="module")
+def fields():
+    names = ["returns", "close", "volume"]
+    return {n: pd.read_csv(f"data/{n}.csv", index_col=0, parse_dates=True) for n in names}
+
+def _close(a, b, tol=1e-8):
+    # relative to the panel's scale: prefix sums difference away small values
+    b = b.to_numpy()
+    scale = np.nanmax(np.abs(b)) if np.isfinite(b).any() else 1.0
+    return np.allclose(a.to_numpy(), b, rtol=tol, atol=tol * scale, equal_nan=True)
+
+@pytest.mark.parametrize("n", [2, 5, 20, 120])
+def test_matches_pandas_rolling(fields, n):
+    st = MomentStore()
+    st.track(fields)
+    close, volume = fields["close"], fields["volume"]
+    assert _close(st.mean(close, n), close.rolling(n, min_periods=1).mean())
+    assert _close(st.sum(volume, n), volume.rolling(n, min_periods=1).sum())
+    assert _close(st.std(close, n), close.rolling(n, min_periods=2).std(ddof=1))
+    expected = close.rolling(n, min_periods=2).cov(volume)
+    assert _close(st.cov(close, volume, n), expected)
+
+def test_stable_on_price_level_offsets():
+    rng = np.random.default_rng(0)
+    base = pd.DataFrame(1e6 + np.cumsum(rng.normal(0, 1, (500, 3)), axis=0))
+    noise = pd.DataFrame(rng.normal(0, 1, (500, 3)))
+    st = MomentStore()
+    st.track({"a": base, "b": noise})
+    n = 20
+    exact_std = base.rolling(n).apply(lambda w: np.std(w - w.mean(), ddof=1), raw=True)
+    rel = ((st.std(base, n) - exact_std).abs() / exact_std).iloc[n:]
+    assert rel.max().max() < 1e-6   # the naive sum-of-squares form is off by ~1e-3 here
+    exact_corr = pd.DataFrame([[np.corrcoef(base.iloc[i-n+1:i+1, j], noise.iloc[i-n+1:i+1, j])[0, 1]
+                                for j in range(3)] for i in range(n, 500)])
+    assert _close(st.corr(base, noise, n).iloc[n:].reset_index(drop=True), exact_corr, tol=1e-6)
+
+def test_constant_window_has_zero_std():
+    df = pd.DataFrame({"a": [1.0, 2.0, 3.3, 3.3, 3.3, 3.3]})
+    st = MomentStore()
+    assert st.std(df, 3)["a"].tolist()[-2:] == [0.0, 0.0]
+
+def test_reuses_entries_across_windows_and_copies(fields):
+    st = MomentStore()
+    st.mean(fields["returns"], 5)
+    st.sum(fields["returns"], 20)
+    st.mean(fields["returns"].copy(), 10)   # same content, new object
+    assert st.stats()["misses"] == 1 and st.stats()["hits"] == 2
+    st.std(fields["returns"], 20)
+    st.zscore(fields["returns"], 20)        # same window moments
+    assert st.stats()["misses"] == 2 and st.stats()["hits"] == 3
+
+def test_eviction_is_bounded(fields):
+    st = MomentStore(max_bytes=1)
+    for name in ("returns", "close", "volume"):
+        st.mean(fields[name], 5)
+    assert st.stats()["entries"] == 1
+
+def test_prewarm_from_analysis(fields):
+    st = MomentStore()
+    an = analyze(parse_alpha("ts_corr(close, volume, 20) + ts_mean(returns, 5)"))
+    st.prewarm(fields, [an])
+    # prefix sums for returns/close/volume, window-5 moments of returns,
+    # window-20 moments of close and volume, and the (close, volume, 20) pair
+    assert st.stats()["entries"] == 7
+    assert st.tracked(fields["close"])
+
+def test_engine_fingerprints_only_kernel_operands(fields):
+    from engine.moments import STORE
+    from engine.vectorized import evaluate_series_vectorized
+    fresh = {k: f.copy() for k, f in fields.items()}
+    evaluate_series_vectorized("rank(ts_mean(returns, 5)) * ts_rank(close, 5)", fresh)
+    assert STORE.tracked(fresh["returns"])
+    assert not STORE.tracked(fresh["close"]) and not STORE.tracked(fresh["volume"])
@@ -13,3 +13,17 @@ from dsl.parser import parse_alpha
 def test_parse_ok(src):
     ast = parse_alpha(src)
     assert ast is not None
+
+
+@pytest.mark.parametrize("src,expected", [
+    ("1+2", "BinOp(+)"),
+    ("a - b*c", "BinOp(-)"),
+    ("a >= b", "BinOp(>=)"),
+    ("a != b", "BinOp(!=)"),
+    ("-a", "UnaryOp(-)"),
+    ("!a", "UnaryOp(!)"),
+    ("a - -b", "BinOp(-)"),
+])
+def test_operators_kept(src, expected):
+    from dsl.ast_utils import ast_to_pretty
+    assert ast_to_pretty(parse_alpha(src)).splitlines()[0] == expected
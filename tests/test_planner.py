@@ -0,0 +1,59 @@
+import numpy as np
+import pandas as pd
+import pytest
+from engine.planner import plan, evaluate, Budget, PlanError, BudgetExceeded
+from engine.vectorized import evaluate_series_vectorized
+
+@pytest.fixture(scope="module")
+def fields():
+    names = ["returns", "close", "volume"]
+    return {n: pd.read_csv(f"data/{n}.csv", index_col=0, parse_dates=True) for n in names}
+
+def test_picks_vectorized_for_cheap_kernels(fields):
+    p = plan("rank(ts_mean(returns,5) - ts_corr(close,volume,20))", fields)
+    assert p.engine == "vectorized" and p.unsupported == {}
+    assert p.seconds["vectorized"] < p.seconds["loop"]
+    assert (p.dates, p.symbols, p.nodes, p.lookback) == (691, 6, 4, 19)
+
+def test_loop_cannot_window_computed_expressions(fields):
+    p = plan("ts_mean(rank(close),5)", fields)
+    assert p.engine == "vectorized" and "loop" in p.unsupported
+    with pytest.raises(PlanError):
+        plan("ts_mean(rank(close),5)", fields, engine="loop")
+
+@pytest.mark.parametrize("alpha", ["rank(retuns)", "rnk(returns)", "ts_mean(returns)", "rank(returns"])
+def test_invalid_alphas_fail_before_evaluation(fields, alpha):
+    with pytest.raises(PlanError):
+        plan(alpha, fields)
+
+def test_budgets(fields, monkeypatch):
+    with pytest.raises(BudgetExceeded):
+        plan("ts_corr(close,volume,20)", fields, Budget(bytes=1024))
+    with pytest.raises(BudgetExceeded):
+        plan("ts_rank(ts_mean(returns,3),10)", fields, Budget(seconds=0.01))
+    # runtime enforcement when the estimate was too optimistic: both engines
+    # stop at their next checkpoint
+    import engine.planner as planner
+    real = planner.estimate
+    def optimistic(*a):
+        seconds, nbytes, unsupported, nodes = real(*a)
+        return {e: 0.0 for e in seconds}, nbytes, unsupported, nodes
+    monkeypatch.setattr(planner, "estimate", optimistic)
+    for engine in ("loop", "vectorized"):
+        with pytest.raises(BudgetExceeded, match="Evaluation exceeded"):
+            evaluate("ts_mean(returns,5) + ts_mean(returns,7)", fields, Budget(seconds=1e-9), engine=engine)
+
+def test_engines_agree(fields):
+    alpha = "rank(ts_mean(returns,5) - ts_mean(returns,20))"
+    out, p = evaluate(alpha, fields, Budget(), engine="loop")
+    ref = evaluate_series_vectorized(alpha, fields)
+    assert p.engine == "loop"
+    assert np.allclose(out.to_numpy(dtype=float), ref.to_numpy(dtype=float), equal_nan=True)
+
+def test_loop_is_serial_by_default(fields):
+    p = plan("ts_mean(returns,5)", fields, engine="loop")
+    assert p.workers == 1
+
+def test_folded_windows_are_costed(fields):
+    a, b = plan("ts_rank(close, 100*2)", fields), plan("ts_rank(close, 200)", fields)
+    assert a.seconds == b.seconds and a.nodes == b.nodes == 1
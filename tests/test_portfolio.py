@@ -0,0 +1,44 @@
+import numpy as np
+import pandas as pd
+import pytest
+from engine.portfolio import run_portfolio, blend_weights
+from engine.backtest import run_backtest, summarize
+from engine.vectorized import evaluate_series_vectorized
+
+ALPHAS = [
+    "rank(ts_mean(returns,5) - ts_mean(returns,20))",
+    "ts_corr(close, volume, 20)",
+    "-ts_zscore(close, 10)",
+]
+
+@pytest.fixture(scope="module")
+def fields():
+    names = ["returns", "close", "volume"]
+    return {n: pd.read_csv(f"data/{n}.csv", index_col=0, parse_dates=True) for n in names}
+
+def test_per_alpha_matches_single_backtest(fields):
+    out = run_portfolio(ALPHAS, fields, cost_bps=5)
+    for row, alpha in zip(out["alphas"], ALPHAS):
+        sig = evaluate_series_vectorized(alpha, fields)
+        ref = summarize(run_backtest(sig, fields["returns"], cost_bps=5), sig, fields["returns"])
+        assert row["sharpe"] == pytest.approx(ref["sharpe"])
+        assert row["turnover"] == pytest.approx(ref["turnover"])
+        assert row["ic"] == pytest.approx(ref["ic"])
+
+def test_single_alpha_blend_is_the_alpha(fields):
+    out = run_portfolio(ALPHAS[:1], fields)
+    assert out["blend"]["sharpe"] == pytest.approx(out["alphas"][0]["sharpe"])
+
+def test_blend_weights():
+    assert np.allclose(blend_weights(2, 3, weights=[3, -1]), [[0.75, -0.25]] * 3)
+    pnl = np.vstack([np.tile([0.01, -0.01], 50), np.tile([0.02, -0.02], 50)])
+    w = blend_weights(2, 100, rule="inverse_vol", pnl=pnl, lookback=20)
+    assert np.allclose(w[0], [0.5, 0.5])             # no history yet
+    assert np.allclose(w[-1], [2 / 3, 1 / 3])
+    with pytest.raises(ValueError):
+        blend_weights(2, 3, weights=[1.0])
+
+def test_portfolio_budget(fields):
+    from engine.planner import Budget, BudgetExceeded
+    with pytest.raises(BudgetExceeded):
+        run_portfolio(ALPHAS, fields, budget=Budget(bytes=1))
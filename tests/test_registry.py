@@ -0,0 +1,39 @@
+import pytest
+import engine.vectorized  # noqa: F401  (attaches panel kernels)
+from dsl.registry import REGISTRY, get_fn, lookback, register, register_panel
+from dsl.parser import parse_alpha
+from dsl.analyzer import analyze
+
+def test_every_function_has_panel_kernel():
+    missing = [name for name, spec in REGISTRY.items() if spec.panel is None]
+    assert missing == []
+
+def test_metadata():
+    assert get_fn("ts_corr").window_arg == 2
+    assert not get_fn("rank").independent
+    assert get_fn("ts_mean").independent
+    assert lookback(get_fn("ts_mean"), 5) == 4
+    assert lookback(get_fn("delay"), 5) == 5
+    assert lookback(get_fn("rank"), 5) == 0
+
+def test_analyze_windows_and_lookback():
+    an = analyze(parse_alpha("rank(ts_mean(delay(returns,3),5)) - ts_cov(close, volume, 20)"))
+    assert an.windows == {"returns": {3}, "close": {20}, "volume": {20}}
+    assert an.lookback == 19   # max(3 + 4, 19)
+
+def test_registered_panel_dispatch():
+    import pandas as pd
+    from engine.vectorized import evaluate_series_vectorized
+
+    @register("_twice", arity=[1], kind="scalar", doc="test-only")
+    def _twice(ctx, x):
+        return x * 2
+    try:
+        fields = {"x": pd.DataFrame({"A": [1.0, 2.0]})}
+        with pytest.raises(NotImplementedError):
+            evaluate_series_vectorized("_twice(x)", fields)
+        register_panel("_twice")(lambda x: x * 2)
+        out = evaluate_series_vectorized("_twice(x)", fields)
+        assert out["A"].tolist() == [2.0, 4.0]
+    finally:
+        REGISTRY.pop("_twice", None)
@@ -0,0 +1,41 @@
+import numpy as np
+import pandas as pd
+import pytest
+from dsl.parser import parse_alpha
+from dsl.shapes import infer, ShapeError, SCALAR, CROSS_SECTION, PANEL
+from engine.vectorized import evaluate_series_vectorized
+from engine.backtest_loop import evaluate_series
+
+@pytest.mark.parametrize("alpha,label", [
+    ("2 * 3 - 1", SCALAR),
+    ("rank(close) * 2", CROSS_SECTION),
+    ("sdiv(volume, close) + 1", CROSS_SECTION),
+    ("rank(ts_mean(returns, 2 + 3))", PANEL),
+])
+def test_labels(alpha, label):
+    ast = parse_alpha(alpha)
+    assert infer(ast).label(ast) == label
+
+def test_constants_are_folded():
+    ast = parse_alpha("ts_mean(returns, 2 * 5) + (1 < 2)")
+    sh = infer(ast)
+    assert sh.const(ast.left.args[1]) == 10 and sh.const(ast.right) == 1.0
+    assert sh.const(ast) is None and sh.label(ast) == PANEL
+
+@pytest.mark.parametrize("alpha", ["ts_mean(returns, close)", "ts_mean(returns, 2.5)",
+                                   "ts_mean(returns, 0)", "rank(3)", "ts_corr(close, 1, 5)",
+                                   "ts_mean(returns)", "nope(returns)"])
+def test_errors_before_data(alpha):
+    with pytest.raises(ShapeError):
+        infer(parse_alpha(alpha))
+    # no fields at all: the engines must fail in the pass, not on data
+    with pytest.raises(ShapeError):
+        evaluate_series_vectorized(alpha, {})
+
+def test_engines_agree_with_folded_scalars():
+    names = ["returns", "close", "volume"]
+    fields = {n: pd.read_csv(f"data/{n}.csv", index_col=0, parse_dates=True).iloc[:60] for n in names}
+    alpha = "rank(ts_mean(returns, 2 + 3)) * (4 / 2) - sdiv(1, 0) + (close > 100)"
+    vec = evaluate_series_vectorized(alpha, fields)
+    loop = evaluate_series(alpha, fields)
+    assert np.allclose(vec.to_numpy(), loop.to_numpy(), equal_nan=True)
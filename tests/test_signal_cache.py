@@ -0,0 +1,77 @@
+import numpy as np
+import pytest
+from engine.signal_cache import SignalCache
+from engine.export import read_signal
+from engine.vectorized import evaluate_series_vectorized
+from engine.snapshot import load_csv_fields
+
+ALPHA = "rank(ts_mean(returns,5) - ts_mean(returns,20))"
+
+@pytest.fixture(scope="module")
+def fields():
+    return load_csv_fields("data")
+
+def head(fields, n):
+    return {k: f.iloc[:n] for k, f in fields.items()}
+
+def recording():
+    rows = []
+    def evaluate(alpha, fields):
+        rows.append(len(next(iter(fields.values()))))
+        return evaluate_series_vectorized(alpha, fields)
+    return rows, evaluate
+
+def test_extends_only_new_rows(fields):
+    rows, ev = recording()
+    cache = SignalCache(evaluate=ev)
+    n = len(fields["returns"])
+    assert cache.update(ALPHA, head(fields, n - 5))[1] == "computed"
+    assert cache.update(ALPHA, head(fields, n - 5))[1] == "reused"
+    sig, how = cache.update(ALPHA, fields)
+    assert how == "extended" and rows == [n - 5, 5 + 19]
+    ref = evaluate_series_vectorized(ALPHA, fields)
+    assert sig.index.equals(ref.index)
+    assert np.allclose(sig.to_numpy(), ref.to_numpy(), equal_nan=True)
+
+def test_revised_history_and_stateful_recompute(fields):
+    cache = SignalCache(evaluate=evaluate_series_vectorized)
+    n = len(fields["returns"])
+    cache.update(ALPHA, head(fields, n - 5))
+    revised = dict(fields, returns=fields["returns"].copy())
+    revised["returns"].iloc[10, 0] += 0.01
+    assert cache.update(ALPHA, revised)[1] == "recomputed"
+    # fields the alpha does not read may change freely
+    other = dict(revised, volume=revised["volume"] * 2)
+    assert cache.update(ALPHA, other)[1] == "reused"
+    cache.update("hump(returns, 0.05)", head(fields, n - 5))
+    assert cache.update("hump(returns, 0.05)", fields)[1] == "recomputed"
+
+def test_persists_and_appends(fields, tmp_path):
+    root = str(tmp_path)
+    n = len(fields["returns"])
+    SignalCache(root, evaluate=evaluate_series_vectorized).refresh([ALPHA], head(fields, n - 300))
+    rows, ev = recording()
+    out = SignalCache(root, evaluate=ev).refresh([ALPHA], fields)
+    assert out[0]["how"] == "extended" and out[0]["rows"] == n and rows == [300 + 19]
+    ref = evaluate_series_vectorized(ALPHA, fields)
+    assert np.allclose(read_signal(root, ALPHA).to_numpy(), ref.to_numpy(), equal_nan=True)
+    assert SignalCache(root).update(ALPHA, fields)[1] == "reused"
+
+@pytest.mark.parametrize("alpha", ["ts_mean(close, 2+3)", "ts_corr(close, volume, 1*10)"])
+def test_folded_window_extension(fields, alpha):
+    cache = SignalCache(evaluate=evaluate_series_vectorized)
+    cache.update(alpha, head(fields, len(fields["close"]) - 5))
+    sig, how = cache.update(alpha, fields)
+    assert how == "extended"
+    ref = evaluate_series_vectorized(alpha, fields)
+    assert np.allclose(sig.to_numpy(), ref.to_numpy(), equal_nan=True)
+
+def test_concurrent_requests_for_one_alpha(fields, tmp_path):
+    from concurrent.futures import ThreadPoolExecutor
+    rows, ev = recording()
+    cache = SignalCache(str(tmp_path), evaluate=ev)
+    with ThreadPoolExecutor(4) as pool:
+        hows = [how for _, how in pool.map(lambda _: cache.update(ALPHA, fields), range(4))]
+    assert sorted(hows) == ["computed"] + ["reused"] * 3 and len(rows) == 1
+    ref = evaluate_series_vectorized(ALPHA, fields)
+    assert np.allclose(read_signal(str(tmp_path), ALPHA).to_numpy(), ref.to_numpy(), equal_nan=True)
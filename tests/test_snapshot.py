@@ -0,0 +1,40 @@
+import os
+import pandas as pd
+import pytest
+from engine.snapshot import write_snapshot, read_snapshot, read_manifest, is_fresh, load_csv_fields
+from engine.vectorized import evaluate_series_vectorized
+from dsl.parser import parse_alpha, get_parser, GRAMMAR
+from lark import Lark
+
+def test_round_trip(tmp_path):
+    fields = load_csv_fields("data")
+    sig = evaluate_series_vectorized("rank(ts_mean(returns,5))", fields)
+    write_snapshot(fields, str(tmp_path), {"a": sig})
+    f2, s2 = read_snapshot(str(tmp_path))
+    for n in fields:
+        pd.testing.assert_frame_equal(f2[n], fields[n], check_freq=False)
+    pd.testing.assert_frame_equal(s2["a"], sig, check_freq=False)
+    # engines run on the read-only memory-mapped frames
+    out = evaluate_series_vectorized("ts_corr(close, volume, 10)", f2)
+    ref = evaluate_series_vectorized("ts_corr(close, volume, 10)", fields)
+    pd.testing.assert_frame_equal(out, ref, check_freq=False)
+
+def test_stale_sources(tmp_path):
+    src = tmp_path / "returns.csv"
+    src.write_text("Date,A\n2024-01-02,0.1\n")
+    fields = {"returns": pd.read_csv(src, index_col=0, parse_dates=True)}
+    write_snapshot(fields, str(tmp_path / "snap"), sources={"returns": str(src)})
+    m = read_manifest(str(tmp_path / "snap"))
+    assert is_fresh(m, {"returns": str(src)})
+    src.write_text("Date,A\n2024-01-02,0.2\n2024-01-03,0.3\n")
+    assert not is_fresh(m, {"returns": str(src)})
+    assert read_manifest(str(tmp_path / "missing")) is None
+
+def test_cached_parser_matches(tmp_path):
+    cache = str(tmp_path / "grammar.cache")
+    Lark(GRAMMAR, start="start", parser="lalr", cache=cache)        # write
+    loaded = Lark(GRAMMAR, start="start", parser="lalr", cache=cache)
+    assert os.path.exists(cache)
+    src = "rank(ts_mean(returns,5) - -close * 2) >= 1"
+    assert loaded.parse(src) == get_parser().parse(src)
+    assert parse_alpha(src).op == ">="
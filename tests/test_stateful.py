@@ -0,0 +1,88 @@
+import numpy as np
+import pandas as pd
+import pytest
+from dsl.parser import parse_alpha
+from dsl.analyzer import analyze
+from dsl.registry import UNBOUNDED
+from engine.vectorized import evaluate_series_vectorized
+from engine.backtest_loop import evaluate_series
+from engine.backtest import run_backtest
+from engine.planner import plan
+
+@pytest.fixture(scope="module")
+def fields():
+    names = ["returns", "close", "volume"]
+    f = {n: pd.read_csv(f"data/{n}.csv", index_col=0, parse_dates=True) for n in names}
+    f["close"] = f["close"].mask(np.random.default_rng(0).random(f["close"].shape) < 0.2)
+    return f
+
+def _trade_when_ref(cond, x, exit):
+    # reference: the per-date rule, one symbol and date at a time
+    out = pd.DataFrame(np.nan, index=x.index, columns=x.columns)
+    for c in x.columns:
+        prev = np.nan
+        for t in x.index:
+            if exit.loc[t, c] > 0:
+                prev = np.nan
+            elif cond.loc[t, c] > 0:
+                prev = x.loc[t, c]
+            out.loc[t, c] = prev
+    return out
+
+def _hump_ref(x, h):
+    out, prev = x.copy(), pd.Series(np.nan, index=x.columns)
+    for t in x.index:
+        row = x.loc[t]
+        limit = h * row.abs().sum()
+        for c in x.columns:
+            if np.isnan(prev[c]) or abs(row[c] - prev[c]) > limit:
+                prev[c] = row[c]
+        out.loc[t] = prev
+    return out
+
+def test_trade_when_holds_between_events(fields):
+    ev = lambda a: evaluate_series_vectorized(a, fields)
+    out = ev("trade_when(volume > ts_mean(volume, 20), rank(returns), returns < -0.03)")
+    ref = _trade_when_ref(ev("volume > ts_mean(volume, 20)"), ev("rank(returns)"), ev("returns < -0.03"))
+    assert np.allclose(out.to_numpy(), ref.to_numpy(), equal_nan=True)
+
+def test_hump_and_backfill(fields):
+    x = evaluate_series_vectorized("rank(returns) - 0.5", fields)
+    out = evaluate_series_vectorized("hump(rank(returns) - 0.5, 0.05)", fields)
+    assert np.allclose(out.to_numpy(), _hump_ref(x, 0.05).to_numpy(), equal_nan=True)
+    out = evaluate_series_vectorized("ts_backfill(close, 3)", fields)
+    pd.testing.assert_frame_equal(out, fields["close"].ffill(limit=2), check_freq=False)
+
+def test_if_else(fields):
+    out = evaluate_series_vectorized("if_else(returns > 0, close, -1)", fields)
+    ref = np.where(fields["returns"] > 0, fields["close"], -1.0)
+    assert np.allclose(out.to_numpy(), ref, equal_nan=True)
+
+@pytest.mark.parametrize("alpha", ["ts_backfill(close, 4)", "if_else(returns, close, volume)"])
+def test_point_in_time_matches_panel(fields, alpha):
+    sub = {k: f.iloc[:80] for k, f in fields.items()}
+    vec = evaluate_series_vectorized(alpha, sub)
+    loop = evaluate_series(alpha, sub)
+    assert np.allclose(vec.to_numpy(), loop.to_numpy(), equal_nan=True)
+
+@pytest.mark.parametrize("alpha", ["trade_when(returns > 0, close, -1)", "hump(close, 0.01)",
+                                   "rank(trade_when(returns, close, -1))"])
+def test_per_date_engine_rejects_stateful(fields, alpha):
+    from fastapi import HTTPException
+    from app.main import evaluate, EvalBody
+    with pytest.raises(ValueError, match="evaluate_series_fast"):
+        evaluate_series(alpha, {k: f.iloc[:20] for k, f in fields.items()})
+    with pytest.raises(HTTPException) as e:
+        evaluate(EvalBody(alpha=alpha))
+    assert e.value.status_code == 400 and "/backtest" in e.value.detail
+    assert "loop" in plan(alpha, fields).unsupported
+
+def test_planning_and_turnover(fields):
+    assert analyze(parse_alpha("rank(trade_when(returns, close, -1))")).lookback == UNBOUNDED
+    assert analyze(parse_alpha("ts_backfill(close, 4)")).lookback == 3
+    p = plan("hump(close, 0.01)", fields)
+    assert p.engine == "vectorized" and "whole history" in p.unsupported["loop"]
+    rets = fields["returns"]
+    base = run_backtest(evaluate_series_vectorized("ts_mean(returns, 5)", fields), rets)
+    held = run_backtest(evaluate_series_vectorized("hump(ts_mean(returns, 5), 0.1)", fields), rets)
+    assert held["turnover"].mean() < base["turnover"].mean()
@@ -0,0 +1,64 @@
+import pandas as pd
+import pytest
+from dsl.parser import expand_template, template_params
+from engine.sweep import run_sweep
+from engine.vectorized import evaluate_series_vectorized
+from engine.backtest import run_backtest, summarize
+
+@pytest.fixture(scope="module")
+def fields():
+    names = ["returns", "close", "volume"]
+    return {n: pd.read_csv(f"data/{n}.csv", index_col=0, parse_dates=True) for n in names}
+
+def test_template_syntax():
+    assert template_params("f({a}, {b=1..3}, {a})") == {"a": None, "b": [1, 2, 3]}
+    assert template_params("{w=10..30:10}") == {"w": [10, 20, 30]}
+    assert template_params("{k=0.5,2}") == {"k": [0.5, 2]}
+    combos = expand_template("ts_mean(returns,{a}) - ts_mean(returns,{b})", {"a": [3, 5], "b": [10]})
+    assert [src for _, src in combos] == ["ts_mean(returns,3) - ts_mean(returns,10)",
+                                          "ts_mean(returns,5) - ts_mean(returns,10)"]
+    with pytest.raises(ValueError):
+        expand_template("ts_mean(returns,{a})")
+
+def test_template_limits_checked_before_expanding():
+    with pytest.raises(ValueError, match="4000000 combinations"):
+        expand_template("ts_mean(returns,{a=1..2000}) - ts_mean(returns,{b=1..2000})", max_combos=2000)
+    with pytest.raises(ValueError, match="more than"):
+        template_params("ts_mean(returns,{a=1..1000000000})")
+
+def test_sweep_shares_subexpressions(fields):
+    out = run_sweep("rank(ts_mean(returns,{a}) - ts_mean(returns,{b}))", fields,
+                    grid={"a": [3, 5, 10], "b": [10, 20]})
+    assert out["combinations"] == 6
+    # the 4 distinct ts_means are each used by several variants; differences and ranks are not
+    assert out["shared_subexpressions"] == 4
+    row = out["results"][1]
+    assert row["params"] == {"a": 3, "b": 20}
+    sig = evaluate_series_vectorized(row["alpha"], fields)
+    expected = summarize(run_backtest(sig, fields["returns"]), sig, fields["returns"])
+    assert row["sharpe"] == pytest.approx(expected["sharpe"])
+    assert row["ic"] == pytest.approx(expected["ic"])
+
+def test_shared_cache_keeps_only_shared_nodes(fields):
+    from engine.liveness import SharedCache
+    combos = [src for _, src in expand_template("rank(ts_mean(returns,{a}) - ts_mean(returns,{b}))",
+                                                  {"a": [3, 5], "b": [10, 20]})]
+    cache = SharedCache(combos)
+    assert {k[1] for k in cache.keep} == {"ts_mean"}
+    for src in combos:
+        sig = evaluate_series_vectorized(src, fields, cache=cache)
+        assert set(cache) <= cache.keep
+        pd.testing.assert_frame_equal(sig, evaluate_series_vectorized(src, fields))
+        cache.done(src)
+    assert not cache
+
+def test_sweep_reports_bad_variants(fields):
+    out = run_sweep("ts_mean(nope,{a})", fields, grid={"a": [5]})
+    assert "error" in out["results"][0]
+
+def test_sweep_runs_within_one_budget(fields):
+    from engine.planner import Budget, BudgetExceeded
+    with pytest.raises(BudgetExceeded):
+        run_sweep("ts_rank(close,{a})", fields, grid={"a": [5, 10]}, budget=Budget(bytes=1))
+    with pytest.raises(BudgetExceeded):
+        run_sweep("ts_mean(close,{a})", fields, grid={"a": [5, 10]}, budget=Budget(seconds=1e-9))
@@ -17,7 +17,19 @@ def fields():
     "rank(ts_mean(returns,5) - ts_mean(returns,20))",
     "zscore(decay_linear(returns,10))",
     "rank(ts_corr(close, volume, 20))",
-    "sdiv(ts_mean(returns,5), ts_std(returns,5))"
+    "sdiv(ts_mean(returns,5), ts_std(returns,5))",
+    "ts_min(close,10)",
+    "ts_max(close,10)",
+    "ts_argmin(close,10)",
+    "ts_argmax(close,10)",
+    "ts_delta(close,5)",
+    "ts_cov(returns, volume, 20)",
+    "ts_skew(returns,20)",
+    "ts_kurt(returns,20)",
+    "rank(ts_skew(close,10))",
+    "ts_zscore(close,20)",
+    "ts_beta(returns, close, 20)",
+    "ts_corr(close, volume, 5) - ts_std(close, 20)",
 ])
 def test_vectorized_matches_slow(fields, alpha):
     fast = evaluate_series_vectorized(alpha, fields)
@@ -29,3 +41,21 @@ def test_vectorized_matches_slow(fields, alpha):
     mask = ~(fast.isna() & slow.isna())
     quantile = diff[mask].stack().quantile(0.999)
     assert (np.isnan(quantile) or quantile < 1e-6)
+
+@pytest.fixture(scope="session")
+def gappy_fields(fields):
+    rng = np.random.default_rng(7)
+    return {k: f.mask(rng.random(f.shape) < 0.1) for k, f in fields.items()}
+
+@pytest.mark.parametrize("alpha", [
+    "ts_cov(returns, volume, 20)",
+    "ts_cov(close, close, 2)",
+    "ts_cov(returns, close, 5)",
+    "ts_beta(returns, close, 20)",
+    "ts_beta(returns, volume, 3)",
+])
+def test_pairwise_nan_parity(gappy_fields, alpha):
+    fast = evaluate_series_vectorized(alpha, gappy_fields)
+    slow = evaluate_series(alpha, gappy_fields)
+    assert (fast.isna() == slow.isna()).all().all()
+    assert np.allclose(fast.to_numpy(), slow.to_numpy(), rtol=1e-6, atol=1e-12, equal_nan=True)
@@ -76,32 +76,170 @@ let els = {};
 let els2 = {};
 
 // ----- Core actions -----
+// The backtest is fetched for a viewport (date range, symbol range, pixel size):
+// the server returns downsampled series and heatmap tiles, and zooming either
+// chart re-requests just the visible range at full detail.
+let btPayload = null;
+let btView = {};
+
+function chartSize(el, fallbackW, fallbackH) {
+  return { width: Math.round(el?.clientWidth || fallbackW), height: Math.round(el?.clientHeight || fallbackH) };
+}
+
 async function runBacktest() {
   const alpha = els.alpha?.value?.trim() || "";
-  const payload = {
+  btPayload = {
     alpha,
     top_q: parseFloat(els2.topQ?.value || "0.2"),
     bot_q: parseFloat(els2.botQ?.value || "0.2"),
     cost_bps: parseFloat(els2.costBps?.value || "0"),
     neutralize: true
   };
-  const res = await api("/backtest", { method: "POST", body: JSON.stringify(payload) });
+  btView = {};
+  await fetchBacktestView();
+}
+
+async function fetchBacktestView() {
+  if (!btPayload) return;
+  const { width, height } = chartSize(els2.heatmap, 800, 200);
+  const viewport = { ...btView, width, height };
+  const res = await api("/backtest", { method: "POST", body: JSON.stringify({ ...btPayload, viewport }) });
 
   // Equity curve
-  Plotly.newPlot(els2.equityChart, [{
-    x: res.dates, y: res.equity, mode: "lines", name: "Equity"
+  Plotly.react(els2.equityChart, [{
+    x: res.equity.dates, y: res.equity.values, mode: "lines", name: "Equity"
   }], { margin: { t: 20, r: 10, b: 40, l: 45 }, xaxis: { type: "date" }, yaxis: { zeroline: false } });
 
-  // Heatmap (signals)
-  Plotly.newPlot(els2.heatmap, [{
-    z: res.signals,
-    x: res.columns,
-    y: res.dates,
+  // Heatmap (signal tiles: colour = block mean, hover shows min/max)
+  const hm = res.heatmap;
+  const custom = hm.mean.map((row, i) => row.map((_, j) => [hm.min[i][j], hm.max[i][j], hm.date_end[i], hm.labels[j]]));
+  Plotly.react(els2.heatmap, [{
+    z: hm.mean,
+    x: hm.sym_start,
+    y: hm.dates,
+    customdata: custom,
+    hovertemplate: "%{customdata[3]}<br>%{y} → %{customdata[2]}<br>mean %{z:.4g}<br>min %{customdata[0]:.4g} / max %{customdata[1]:.4g}<extra></extra>",
     type: "heatmap",
     colorscale: "RdBu",
     reversescale: true,
     showscale: true
-  }], { margin: { t: 20, r: 10, b: 40, l: 60 }, yaxis: { autorange: "reversed" } });
+  }], {
+    margin: { t: 20, r: 10, b: 40, l: 60 },
+    yaxis: { autorange: "reversed", type: "date" },
+    xaxis: { tickvals: hm.sym_start, ticktext: hm.labels }
+  });
+  bindZoom();
+}
+
+// Zoom -> new viewport. Autorange (double click) resets that axis.
+function onRelayout(ev, isHeatmap) {
+  const next = { ...btView };
+  const dateAxis = isHeatmap ? "yaxis" : "xaxis";
+  if (ev[`${dateAxis}.autorange`]) { delete next.start; delete next.end; }
+  if (ev[`${dateAxis}.range[0]`] !== undefined) {
+    const [a, b] = [ev[`${dateAxis}.range[0]`], ev[`${dateAxis}.range[1]`]].map(d => String(d).slice(0, 10)).sort();
+    next.start = a; next.end = b;
+  }
+  if (isHeatmap && ev["xaxis.autorange"]) { delete next.sym_start; delete next.sym_end; }
+  if (isHeatmap && ev["xaxis.range[0]"] !== undefined) {
+    next.sym_start = Math.max(0, Math.floor(ev["xaxis.range[0]"]));
+    next.sym_end = Math.ceil(ev["xaxis.range[1]"]) + 1;
+  }
+  if (JSON.stringify(next) === JSON.stringify(btView)) return;
+  btView = next;
+  fetchBacktestView().catch(console.error);
+}
+
+function bindZoom() {
+  for (const [el, isHeatmap] of [[els2.equityChart, false], [els2.heatmap, true]]) {
+    if (!el || el._zoomBound) continue;
+    el.on("plotly_relayout", ev => onRelayout(ev, isHeatmap));
+    el._zoomBound = true;
+  }
+}
+
+// ----- Live channel -----
+// With "Live" on, every edit goes over /ws/live; the server debounces, cancels
+// superseded versions and streams parse -> cross_section -> series -> backtest.
+const Live = (() => {
+  let ws = null, latest = 0;
+
+  function url() {
+    const base = API_BASE || window.location.origin;
+    return base.replace(/^http/, "ws") + "/ws/live";
+  }
+
+  function message() {
+    const { width, height } = chartSize(els2.heatmap, 800, 200);
+    return {
+      alpha: els.alpha?.value || "",
+      top_q: parseFloat(els2.topQ?.value || "0.2"),
+      bot_q: parseFloat(els2.botQ?.value || "0.2"),
+      cost_bps: parseFloat(els2.costBps?.value || "0"),
+      neutralize: true,
+      viewport: { width, height }
+    };
+  }
+
+  function onMessage(ev) {
+    const m = JSON.parse(ev.data);
+    if (m.version < latest) return;     // stale
+    latest = m.version;
+    if (m.type === "parse") {
+      if (els.meta) els.meta.textContent = JSON.stringify(m, null, 2);
+    } else if (m.type === "cross_section") {
+      if (els.evalDate) els.evalDate.textContent = `Latest date: ${m.date}`;
+      renderTable(m.values);
+    } else if (m.type === "series") {
+      Plotly.react(els2.heatmap, [{
+        z: m.heatmap.mean, x: m.heatmap.sym_start, y: m.heatmap.dates,
+        type: "heatmap", colorscale: "RdBu", reversescale: true, showscale: true
+      }], {
+        margin: { t: 20, r: 10, b: 40, l: 60 },
+        yaxis: { autorange: "reversed", type: "date" },
+        xaxis: { tickvals: m.heatmap.sym_start, ticktext: m.heatmap.labels }
+      });
+    } else if (m.type === "backtest") {
+      Plotly.react(els2.equityChart, [{ x: m.equity.dates, y: m.equity.values, mode: "lines", name: "Equity" }],
+        { margin: { t: 20, r: 10, b: 40, l: 45 }, xaxis: { type: "date" }, yaxis: { zeroline: false } });
+    } else if (m.type === "error") {
+      if (els.meta) els.meta.textContent = `${m.stage} error: ${m.detail}`;
+    }
+  }
+
+  function send() {
+    if (!ws || ws.readyState !== WebSocket.OPEN) return;
+    ws.send(JSON.stringify(message()));
+  }
+
+  function start() {
+    if (ws) return;
+    ws = new WebSocket(url());
+    ws.onopen = send;
+    ws.onmessage = onMessage;
+    ws.onclose = () => {
+      ws = null;
+      // reconnect while live mode is on
+      if (document.getElementById("liveToggle")?.checked) setTimeout(start, 1000);
+    };
+  }
+
+  function stop() {
+    const w = ws;
+    ws = null;
+    if (w) { w.onclose = null; w.close(); }
+  }
+
+  return { start, stop, send };
+})();
+
+function bindLive() {
+  const toggle = document.getElementById("liveToggle");
+  if (!toggle) return;
+  toggle.addEventListener("change", () => (toggle.checked ? Live.start() : Live.stop()));
+  for (const el of [els.alpha, els2.topQ, els2.botQ, els2.costBps]) {
+    el?.addEventListener("input", () => { if (toggle.checked) Live.send(); });
+  }
 }
 
 async function showAST() {
@@ -260,6 +398,7 @@ function initApp() {
   console.log("[boot] API_BASE:", API_BASE || "(empty)");
   delegatedFallback();      // safety net
   waitAndBind();            // direct listeners (will show on the buttons)
+  bindLive();
 
   // initial loads (don’t block)
   loadFunctions().catch(console.error);